@@ -10,10 +10,14 @@ def run(context):
 
     except:
         futil.handle_error('run')
+    futil.flush_console()
 
 
 def stop(context):
     try:
+        # Cancels the background computations still running
+        futil.stop_jobs()
+
         # Remove all of the event handlers your app has created
         futil.clear_handlers()
 
@@ -21,4 +25,6 @@ def stop(context):
         commands.stop()
 
     except:
-        futil.handle_error('stop')
\ No newline at end of file
+        futil.handle_error('stop')
+    # Writes the pending log messages and stops the log thread
+    futil.close_log()
\ No newline at end of file
@@ -0,0 +1,197 @@
+import adsk.core
+import adsk.fusion
+import csv
+import math
+import numpy as np
+from ...lib import fusion360utils as futil
+from ...lib import nautic_core
+from ... import config
+from . import CMD_NAME
+
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# This defines the contents of the command dialog and connects to the command related events.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Created Event', args=(CMD_NAME,))
+
+    # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
+    inputs = args.command.commandInputs
+
+    # Création du champ de sélection de la surface
+    body_selection = inputs.addSelectionInput('hull_surf', 'Hull surface :','Choisir la surface de la carène')
+    body_selection.setSelectionLimits(1,1)
+    body_selection.addSelectionFilter('SurfaceBodies')
+
+    #Plage de déplacements: nb_displacements valeurs régulièrement réparties de weight_min à weight_max
+    inputs.addValueInput('weight_min', 'Min weight: ', "kg", adsk.core.ValueInput.createByString('500'))
+    inputs.addValueInput('weight_max', 'Max weight: ', "kg", adsk.core.ValueInput.createByString('2000'))
+    inputs.addIntegerSpinnerCommandInput('nb_displacements', 'Displacements:', 2, 50, 1, 10)
+
+    #Plage de gîte: de 0 à heel_max, par pas de heel_step
+    inputs.addValueInput('heel_max', 'Max heel: ', 'deg', adsk.core.ValueInput.createByString('180 deg'))
+    inputs.addValueInput('heel_step', 'Heel step: ', 'deg', adsk.core.ValueInput.createByString('5 deg'))
+
+    #Tolérance relative de chaque recherche d'équilibre
+    default_tolerance = adsk.core.ValueInput.createByReal(1e-6)
+    inputs.addValueInput('tolerance_input', 'Tolerance: ', '', default_tolerance)
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.executePreview, command_preview, local_handlers=local_handlers)
+    futil.add_handler(args.command.validateInputs, command_validate_input, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# This event handler is called when the user clicks the OK button in the command dialog or
+# is immediately called after the created event not command inputs were created for the dialog.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Execute Event', args=(CMD_NAME,))
+
+    inputs = args.command.commandInputs
+    hull_selection: adsk.core.SelectionCommandInput = inputs.itemById('hull_surf')
+    weight_min: adsk.core.ValueCommandInput = inputs.itemById('weight_min')
+    weight_max: adsk.core.ValueCommandInput = inputs.itemById('weight_max')
+    nb_displacements: adsk.core.IntegerSpinnerCommandInput = inputs.itemById('nb_displacements')
+    heel_max: adsk.core.ValueCommandInput = inputs.itemById('heel_max')
+    heel_step: adsk.core.ValueCommandInput = inputs.itemById('heel_step')
+    tolerance_input: adsk.core.ValueCommandInput = inputs.itemById('tolerance_input')
+    hull_body:adsk.fusion.BRepBody = hull_selection.selection(0).entity
+
+    #angles en radians (unités internes de Fusion), volumes en cm3
+    heels = nautic_core.heel_grid(heel_max.value, heel_step.value)
+    weights = np.linspace(weight_min.value, weight_max.value, nb_displacements.value)
+    volumes = weights/(config.WATER_DENSITY/1000)
+    tolerance = tolerance_input.value
+
+    #Chaque case (déplacement, gîte) est un équilibre à gîte imposée, de centre de gravité le pôle K
+    #(quille, dans l'axe, à l'abscisse du centre de carène droit). Les gîtes successives d'un même
+    #déplacement partent de la solution voisine; les séries sont réparties sur plusieurs processus
+    #qui partagent le même maillage.
+    with futil.timed('Cross_curves/tessellate'):
+        hull_mesh = futil.hull_mesh(hull_body)
+    cache = futil.result_cache()
+    def compute(job:futil.Job):
+        def progress(done, total, curves):
+            job.report(done, total, str(int(np.count_nonzero(~np.isnan(curves.kn))))+"/"+str(curves.kn.size)+" cases calculées")
+        def solve():
+            try:
+                return nautic_core.cross_curves(hull_mesh, volumes, heels, tolerance=tolerance, workers=config.PARALLEL_WORKERS,
+                                                executable=futil.python_executable(), progress=progress)
+            except (OSError, RuntimeError) as error:
+                #pas de processus possibles (interpréteur introuvable, pool cassé): calcul en série
+                futil.log('%s calcul en série: %s', args=(CMD_NAME, str(error)))
+                return nautic_core.cross_curves(hull_mesh, volumes, heels, tolerance=tolerance, workers=1, progress=progress)
+        with futil.timed('Cross_curves/solve'):
+            return cache.cached('cross_curves', hull_mesh, solve, volumes=volumes, heels=heels, tolerance=tolerance)
+    futil.run_job(CMD_NAME, compute, show_results, message="Courbes KN")
+
+
+#Table, tracé et résumé des courbes, sur le fil de Fusion une fois le calcul terminé.
+def show_results(curves:nautic_core.CrossCurves):
+    write_cross_curves(curves)
+    with futil.timed('Cross_curves/create entities'), futil.timeline_results("KN Curves"):
+        courbes_kn(curves)
+
+    msg="Courbes KN: "+str(len(curves.volumes))+" déplacements x "+str(len(curves.heels))+" gîtes."
+    msg+="<br>KN maxi = "+str(round(float(np.nanmax(curves.kn)),1))+" cm"
+    if curves.is_flooded.any():
+        msg+="<br>"+str(int(curves.is_flooded.sum()))+" case(s) avec envahissement (bord libre immergé)."
+    if not curves.converged.all():
+        msg+="<br>Attention: "+str(int((~curves.converged).sum()))+" case(s) sans convergence."
+    ui.messageBox(msg)
+
+
+# This event handler is called when the command needs to compute a new preview in the graphics window.
+def command_preview(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Preview Event', args=(CMD_NAME,))
+    inputs = args.command.commandInputs
+
+
+# This event handler is called when the user changes anything in the command dialog
+# allowing you to modify values of other inputs based on that change.
+def command_input_changed(args: adsk.core.InputChangedEventArgs):
+    changed_input = args.input
+    inputs = args.inputs
+
+    # General logging for debug.
+    futil.log('%s Input Changed Event fired from a change to %s', args=(CMD_NAME, changed_input.id))
+
+
+# This event handler is called when the user interacts with any of the inputs in the dialog
+# which allows you to verify that all of the inputs are valid and enables the OK button.
+def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
+    # General logging for debug.
+    futil.log('%s Validate Input Event', args=(CMD_NAME,))
+
+    inputs = args.inputs
+    weightMin = inputs.itemById('weight_min')
+    weightMax = inputs.itemById('weight_max')
+    heelMax = inputs.itemById('heel_max')
+    heelStep = inputs.itemById('heel_step')
+    toleranceInput = inputs.itemById('tolerance_input')
+    if (0 < weightMin.value < weightMax.value and toleranceInput.value > 0 and heelStep.value > 0
+            and 0 < heelMax.value <= math.pi + 1e-9):
+        args.areInputsValid = True
+    else:
+        args.areInputsValid = False
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Destroy Event', args=(CMD_NAME,))
+    futil.log('%s cache: %s', args=(CMD_NAME, futil.result_cache().stats()))
+
+    global local_handlers
+    local_handlers = []
+
+
+#Enregistre la table KN dans un fichier CSV choisi par l'utilisateur:
+#une ligne par déplacement, une colonne par gîte, KN en m.
+def write_cross_curves(curves:nautic_core.CrossCurves):
+    fileDlg = ui.createFileDialog()
+    fileDlg.title = 'Save the KN table'
+    fileDlg.filter = '*.csv'
+    if fileDlg.showSave() != adsk.core.DialogResults.DialogOK:
+        return
+    with open(fileDlg.filename, 'w', encoding="utf-8", newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(["Deplacement (t)", "LCG (m)"]+[str(round(math.degrees(heel),2)) for heel in curves.heels])
+        for i, volume in enumerate(curves.volumes):
+            displacement = volume*config.WATER_DENSITY/1000/1000 #en tonnes
+            writer.writerow([round(float(displacement), 4), round(float(curves.lcg[i])/100, 4)]
+                            +[round(float(kn)/100, 5) for kn in curves.kn[i]])
+
+
+#Trace une courbe KN par déplacement dans une esquisse: 1 cm de dessin par degré de gîte, KN à l'échelle 1.
+def courbes_kn(curves:nautic_core.CrossCurves):
+    rootComp = futil.root_component()
+    sketch = rootComp.sketches.add(rootComp.xYConstructionPlane)
+    sketch.name = "KN Curves"
+    text_height = max(1.0, math.degrees(float(curves.heels[-1]))/60)
+    for i, volume in enumerate(curves.volumes):
+        points = adsk.core.ObjectCollection.create()
+        for heel, kn in zip(curves.heels, curves.kn[i]):
+            points.add(adsk.core.Point3D.create(math.degrees(heel), float(kn), 0))
+        if points.count < 2:
+            continue
+        sketch.sketchCurves.sketchFittedSplines.add(points)
+        #étiquette au bout de la courbe: déplacement en tonnes
+        end = points.item(points.count-1)
+        displacement = volume*config.WATER_DENSITY/1000/1000
+        textInput = sketch.sketchTexts.createInput2(str(round(float(displacement),3))+" t", text_height)
+        textInput.setAsMultiLine(end, adsk.core.Point3D.create(end.x+8*text_height, end.y+2*text_height, 0),
+                                 adsk.core.HorizontalAlignments.LeftHorizontalAlignment,
+                                 adsk.core.VerticalAlignments.BottomVerticalAlignment, 0)
+        sketch.sketchTexts.add(textInput)
@@ -0,0 +1,24 @@
+# Définition de la commande: identité, emplacement et icônes du bouton.
+# Ce module est chargé au démarrage de l'add-in; il ne doit importer ni NumPy
+# ni le module entry, qui ne l'est qu'au premier lancement de la commande.
+import os
+from ... import config
+
+# TODO *** Specify the command identity information. ***
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_Devis_Poids'
+CMD_NAME = 'Devis de Poids'
+CMD_Description = 'Génère un listing des poids de l\'ensemble des corps du composant actif'
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = True
+
+# TODO *** Define the location where the command button will be created. ***
+# This is done by specifying the workspace, the tab, and the panel, and the 
+# command it will be inserted beside. Not providing the command to position it
+# will insert it at the end.
+WORKSPACE_ID = 'FusionSolidEnvironment' # => Espace de travail CONCEPTION
+PANEL_ID = 'NauticTools' #'SolidScriptsAddinsPanel' # => toolbarPanel
+COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
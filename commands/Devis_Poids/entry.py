@@ -1,92 +1,49 @@
 import adsk.core
-import os
+import adsk.fusion
+import numpy as np
 from ...lib import fusion360utils as futil
+from ...lib import nautic_core
 from ... import config
+from . import CMD_NAME
 app = adsk.core.Application.get()
 ui = app.userInterface
-design = app.activeProduct
-rootComp = design.rootComponent
 
-# TODO *** Specify the command identity information. ***
-CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_Devis_Poids'
-CMD_NAME = 'Devis de Poids'
-CMD_Description = 'Génère un listing des poids de l\'ensemble des corps du composant actif'
-
-# Specify that the command will be promoted to the panel.
-IS_PROMOTED = True
-
-# TODO *** Define the location where the command button will be created. ***
-# This is done by specifying the workspace, the tab, and the panel, and the 
-# command it will be inserted beside. Not providing the command to position it
-# will insert it at the end.
-WORKSPACE_ID = 'FusionSolidEnvironment' # => Espace de travail CONCEPTION
-PANEL_ID = 'NauticTools' #'SolidScriptsAddinsPanel' # => toolbarPanel
-COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
-
-# Resource location for command icons, here we assume a sub folder in this directory named "resources".
-ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+# Modes de sélection des solides
+MODE_SELECTION = 'Solides sélectionnés'
+MODE_ACTIVE_COMPONENT = 'Tous les corps du composant actif'
 
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
 
-# Executed when add-in is run.
-def start():
-    # Create a command Definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # ******** Add a button into the UI so the user can run the command. ********
-    # Get the target workspace the button will be created in.
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    # Get the SOLID tab.
-    solidTab = workspace.toolbarTabs.itemById('SolidTab')
-    # Get the panel the button will be created in.
-    panel = solidTab.toolbarPanels.itemById(PANEL_ID)
-    if not panel:
-        panel = solidTab.toolbarPanels.add(PANEL_ID, 'Nautic Tools', 'SelectPanel', False)
-    # Create the button command control in the UI after the specified existing command.
-    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command is promoted to the main toolbar. 
-    control.isPromoted = IS_PROMOTED
-
-
-# Executed when add-in is stopped.
-def stop():
-    # Get the various UI elements for this command
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-    command_control = panel.controls.itemById(CMD_ID)
-    command_definition = ui.commandDefinitions.itemById(CMD_ID)
-
-    # Delete the button command control
-    if command_control:
-        command_control.deleteMe()
-
-    # Delete the command definition
-    if command_definition:
-        command_definition.deleteMe()
-
-
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Created Event')
+    futil.log('%s Command Created Event', args=(CMD_NAME,))
+
+    # Suivi des modifications du modèle pour tenir l'arbre des poids à jour
+    global terminated_handler
+    if terminated_handler is None:
+        terminated_handler = futil.add_handler(ui.commandTerminated, command_terminated)
 
     # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
     inputs = args.command.commandInputs
 
     # TODO Define the dialog for your command by adding different inputs to the command.
+    # Mode de sélection: solides choisis un par un, ou tous les corps du composant actif
+    mode_input = inputs.addDropDownCommandInput('selection_mode', 'Mode :', adsk.core.DropDownStyles.TextListDropDownStyle)
+    mode_input.listItems.add(MODE_SELECTION, True)
+    mode_input.listItems.add(MODE_ACTIVE_COMPONENT, False)
+
     # Création du champ de sélection des solides
     body_selection = inputs.addSelectionInput('selection_corps', 'Solides :','Choisir un solide')
-    body_selection.setSelectionLimits(1,0)
+    body_selection.setSelectionLimits(0,0) #au moins un solide en mode sélection, voir command_validate_input
     body_selection.addSelectionFilter('SolidBodies')
 
+    # Rapport détaillé par groupe de poids, pont et zone, exporté en CSV
+    inputs.addBoolValueInput('group_report', 'Rapport par groupe (CSV)', True, '', False)
 
     # TODO Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
@@ -100,7 +57,7 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
 # is immediately called after the created event not command inputs were created for the dialog.
 def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Execute Event')
+    futil.log('%s Command Execute Event', args=(CMD_NAME,))
 
     # TODO ******************************** Your code here ********************************
 
@@ -108,24 +65,30 @@ def command_execute(args: adsk.core.CommandEventArgs):
     inputs = args.command.commandInputs
 
     # Calcul de la masse total et du CdG de l'ensemble
-    selection: adsk.core.CommandInput = inputs.itemById('selection_corps')
-    
-    solide=selection.selection(0).entity
-    masse_tot=solide.physicalProperties.mass # masse en kg
-    CdG_tot = solide.physicalProperties.centerOfMass
-
-    if selection.selectionCount > 1: #si plus d'un solide est sélectionné
-        for i in range(1,selection.selectionCount):
-            solide=selection.selection(i).entity
-            masse_temp=masse_tot
-            masse_tot +=solide.physicalProperties.mass # masse en kg
-            CdG_temp = CdG_tot
-            CdG_tot.x = (CdG_temp.x*masse_temp + solide.physicalProperties.centerOfMass.x*solide.physicalProperties.mass)/masse_tot
-            CdG_tot.y = (CdG_temp.y*masse_temp + solide.physicalProperties.centerOfMass.y*solide.physicalProperties.mass)/masse_tot
-            CdG_tot.z = (CdG_temp.z*masse_temp + solide.physicalProperties.centerOfMass.z*solide.physicalProperties.mass)/masse_tot
+    selection: adsk.core.SelectionCommandInput = inputs.itemById('selection_corps')
+    mode_input: adsk.core.DropDownCommandInput = inputs.itemById('selection_mode')
+    if mode_input.selectedItem.name == MODE_ACTIVE_COMPONENT:
+        #Arbre des poids: seuls les corps modifiés depuis le dernier calcul sont relus
+        tree = get_weight_tree()
+        active = adsk.fusion.Design.cast(app.activeProduct).activeOccurrence
+        active_key = active.fullPathName if active else None
+        devis = tree.summary(active_key)
+        keys, noms, masses, centres = tree.body_weights(active_key)
+        solides = [tree_bodies[key] for key in keys]
+    else:
+        solides = [selection.selection(i).entity for i in range(selection.selectionCount)]
+        #Une seule lecture des propriétés physiques par solide, puis somme sur les tableaux
+        masses, centres, inerties = body_properties(solides)
+        devis = nautic_core.weight_summary(masses, centres, inerties)
+    if devis.nb_bodies == 0:
+        ui.messageBox("Aucun solide à peser.")
+        return
+    masse_tot = devis.mass
+    CdG_tot = adsk.core.Point3D.create(*devis.center_of_gravity)
 
     #On met tout ça dans un Sketch pour y accéder plus tard si nécessaire
     # Create a new sketch on the xy plane.
+    rootComp = futil.root_component()
     sketches = rootComp.sketches;
     xyPlane = rootComp.xYConstructionPlane
     sketch = sketches.add(xyPlane)
@@ -139,13 +102,21 @@ def command_execute(args: adsk.core.CommandEventArgs):
 
     msg = "Calcul terminé.<br>Masse totale: "+str(round(masse_tot,2))+" kg<br> Position du CdG:<br>   - en X: "+str(round(CdG_tot.x,2)) \
         +"<br>   - en Y: "+str(round(CdG_tot.y,2))+"<br>   - en Z: "+str(round(CdG_tot.z,2))
+    msg += "<br>Inerties au CdG (kg.m2):<br>   - Ixx: "+str(round(devis.inertia[0,0]/1e4,2)) \
+        +"<br>   - Iyy: "+str(round(devis.inertia[1,1]/1e4,2))+"<br>   - Izz: "+str(round(devis.inertia[2,2]/1e4,2))
+    msg += "<br>("+str(devis.nb_bodies)+" corps)"
     ui.messageBox(msg)
 
+    group_report: adsk.core.BoolValueCommandInput = inputs.itemById('group_report')
+    if group_report.value:
+        table = weight_table(solides, masses, centres)
+        rapport_par_groupe(table)
+
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Preview Event')
+    futil.log('%s Command Preview Event', args=(CMD_NAME,))
     inputs = args.command.commandInputs
 
 
@@ -156,20 +127,24 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     inputs = args.inputs
 
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}')
+    futil.log('%s Input Changed Event fired from a change to %s', args=(CMD_NAME, changed_input.id))
+
+    if changed_input.id == 'selection_mode':
+        inputs.itemById('selection_corps').isVisible = changed_input.selectedItem.name == MODE_SELECTION
 
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Validate Input Event')
+    futil.log('%s Validate Input Event', args=(CMD_NAME,))
 
     inputs = args.inputs
     
     # Verify the validity of the input values. This controls if the OK button is enabled or not.
-    valueInput = inputs.itemById('value_input')
-    if valueInput.value >= 0:
+    modeInput = inputs.itemById('selection_mode')
+    selectionInput = inputs.itemById('selection_corps')
+    if modeInput.selectedItem.name == MODE_ACTIVE_COMPONENT or selectionInput.selectionCount > 0:
         args.areInputsValid = True
     else:
         args.areInputsValid = False
@@ -178,7 +153,217 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Destroy Event')
+    futil.log('%s Command Destroy Event', args=(CMD_NAME,))
 
     global local_handlers
     local_handlers = []
+
+
+#Lecture unique de physicalProperties par solide: masse (kg), CdG (cm) et tenseur
+#d'inertie autour de l'origine (kg.cm2), rangés dans des tableaux.
+def body_properties(bodies):
+    masses = np.empty(len(bodies))
+    centres = np.empty((len(bodies), 3))
+    moments = np.empty((len(bodies), 6))
+    for i, body in enumerate(bodies):
+        props = body.physicalProperties
+        masses[i] = props.mass
+        centres[i] = props.centerOfMass.asArray()
+        moments[i] = props.getXYZMomentsOfInertia()[1:]
+    xx, yy, zz, xy, yz, xz = moments.T
+    return masses, centres, nautic_core.inertia_tensor(xx, yy, zz, xy, yz, xz)
+
+
+#Arbre des poids du modèle (composant racine -> occurrences -> corps), conservé entre
+#deux exécutions. Clés: fullPathName des occurrences; (occurrence, identifiant) des corps.
+#L'identifiant d'un corps est tiré de son composant et de son nom (voir body_ids): il ne
+#change pas d'une lecture à l'autre, contrairement aux entityToken, et rien n'est écrit
+#dans le document.
+weight_tree = None
+tree_root_id = None
+tree_bodies = {}        #clé -> corps (proxy dans le contexte de la racine)
+native_keys = {}        #identifiant du corps natif -> clés de ses occurrences
+body_signatures = {}    #identifiant du corps natif -> signature bon marché
+component_states = {}   #id de composant -> (revisionId, nombre de corps)
+occurrence_transforms = {}  #fullPathName -> matrice de l'occurrence dans la racine
+terminated_handler = None
+
+
+# Appelé à l'arrêt de l'add-in, si la commande a été chargée.
+def stop():
+    global weight_tree, terminated_handler
+    if terminated_handler:
+        ui.commandTerminated.remove(terminated_handler)
+        terminated_handler = None
+    weight_tree = None
+
+
+def get_weight_tree():
+    global weight_tree
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    if weight_tree is None or tree_root_id != design.rootComponent.id:
+        build_weight_tree(design)
+    else:
+        count = weight_tree.refresh(fetch_body)
+        futil.log('%s arbre des poids: %d corps relus', args=(CMD_NAME, count))
+    return weight_tree
+
+
+def build_weight_tree(design:adsk.fusion.Design):
+    global weight_tree, tree_root_id
+    weight_tree = nautic_core.WeightTree(design.rootComponent.name)
+    tree_root_id = design.rootComponent.id
+    tree_bodies.clear()
+    native_keys.clear()
+    body_signatures.clear()
+    component_states.clear()
+    occurrence_transforms.clear()
+
+    for component in design.allComponents:
+        solides = [body for body in component.bRepBodies if body.isSolid]
+        for identifier, body in zip(body_ids(component.id, solides), solides):
+            body_signatures[identifier] = signature(body)
+        component_states[component.id] = (component.revisionId, component.bRepBodies.count)
+
+    root = design.rootComponent
+    stack = [(None, root.id, root.bRepBodies, root.occurrences)]
+    while stack:
+        parent, component_id, bodies, occurrences = stack.pop()
+        solides = [body for body in bodies if body.isSolid]
+        masses, centres, inerties = body_properties(solides)
+        identifiers = body_ids(component_id, solides)
+        for body, identifier, masse, centre, inertie in zip(solides, identifiers, masses, centres, inerties):
+            key = (parent, identifier)
+            weight_tree.set_body(key, masse, centre, inertie, body.name, parent)
+            tree_bodies[key] = body
+            native_keys.setdefault(identifier, []).append(key)
+        for occurrence in occurrences:
+            weight_tree.add_group(occurrence.fullPathName, occurrence.name, parent)
+            occurrence_transforms[occurrence.fullPathName] = tuple(occurrence.transform2.asArray())
+            stack.append((occurrence.fullPathName, occurrence.component.id, occurrence.bRepBodies,
+                          occurrence.childOccurrences))
+    futil.log('%s arbre des poids: %d corps lus', args=(CMD_NAME, len(tree_bodies)))
+
+
+def fetch_body(key):
+    body = tree_bodies.get(key)
+    if body is None or not body.isValid:
+        return None
+    masses, centres, inerties = body_properties([body])
+    return masses[0], centres[0], inerties[0]
+
+
+#Identifiants des corps solides d'un composant, dans l'ordre du composant (les corps d'une
+#occurrence le suivent aussi): id du composant et nom du corps, suivi de son rang parmi
+#les corps du même nom. Renommer un corps change son identifiant: l'arbre est reconstruit.
+def body_ids(component_id:str, solides):
+    identifiers = []
+    counts = {}
+    for body in solides:
+        identifier = component_id+'/'+body.name
+        rank = counts.get(identifier, 0)
+        counts[identifier] = rank+1
+        identifiers.append(identifier+'#'+str(rank) if rank else identifier)
+    return identifiers
+
+
+#Signature d'un corps, beaucoup moins coûteuse à lire que ses propriétés physiques.
+def signature(body:adsk.fusion.BRepBody):
+    box = body.boundingBox
+    material = body.material.name if body.material else ''
+    return (tuple(box.minPoint.asArray()), tuple(box.maxPoint.asArray()), body.faces.count, material)
+
+
+#Après chaque commande, dans tout l'assemblage:
+# - seuls les corps des composants dont le revisionId a changé (composants modifiés) sont
+#   comparés à leur signature; ceux qui ont changé sont marqués à relire, dans toutes leurs
+#   occurrences;
+# - une occurrence déplacée (matrice dans la racine changée) fait relire les corps sous elle.
+#Le coût est celui d'une lecture par composant et par occurrence, plus les corps des
+#composants modifiés. Un corps, une occurrence ajoutés ou supprimés changent la structure:
+#l'arbre sera reconstruit au prochain calcul. Le total est mis à jour aussitôt, en ne
+#remontant que les branches des corps modifiés.
+def command_terminated(args: adsk.core.ApplicationCommandEventArgs):
+    global weight_tree
+    if weight_tree is None or args.terminationReason != adsk.core.CommandTerminationReasons.CompletedTerminationReason:
+        return
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    if not design or design.rootComponent.id != tree_root_id:
+        return
+
+    occurrences = design.rootComponent.allOccurrences
+    if occurrences.count != len(occurrence_transforms):
+        weight_tree = None
+        return
+    moved = []
+    for occurrence in occurrences:
+        path = occurrence.fullPathName
+        transform = tuple(occurrence.transform2.asArray())
+        if path not in occurrence_transforms:
+            weight_tree = None
+            return
+        if transform != occurrence_transforms[path]:
+            occurrence_transforms[path] = transform
+            moved.append(path)
+
+    for component in design.allComponents:
+        state = component_states.get(component.id)
+        if state is not None and state[0] == component.revisionId:
+            continue
+        if state is None or component.bRepBodies.count != state[1]:
+            weight_tree = None
+            return
+        solides = [body for body in component.bRepBodies if body.isSolid]
+        for identifier, body in zip(body_ids(component.id, solides), solides):
+            if identifier not in body_signatures:
+                weight_tree = None
+                return
+            current = signature(body)
+            if current != body_signatures[identifier]:
+                body_signatures[identifier] = current
+                for key in native_keys.get(identifier, ()):
+                    weight_tree.mark_dirty(key)
+        component_states[component.id] = (component.revisionId, state[1])
+
+    for path in moved:
+        for key in weight_tree.bodies(path):
+            weight_tree.mark_dirty(key)
+    if weight_tree.dirty:
+        weight_tree.refresh(fetch_body)
+        devis = weight_tree.summary()
+        futil.log('%s masse totale: %.2f kg, CdG: %s', args=(CMD_NAME, devis.mass, devis.center_of_gravity))
+
+
+#Table des poids: un corps par ligne, avec son groupe de poids, son pont et sa zone.
+#Les attributs NauticTools/weight_group et NauticTools/deck du corps priment sur
+#les règles de config.py.
+def weight_table(solides, masses, centres):
+    groupes, ponts = [], []
+    for body in solides:
+        native = body.nativeObject or body
+        attribute = native.attributes.itemByName('NauticTools', 'weight_group')
+        groupes.append(attribute.value if attribute else nautic_core.classify(body.name, config.WEIGHT_GROUP_RULES))
+        attribute = native.attributes.itemByName('NauticTools', 'deck')
+        ponts.append(attribute.value if attribute else None)
+    table = nautic_core.WeightTable([body.name for body in solides], masses, centres, groupes,
+                                    deck_heights=config.DECK_HEIGHTS, zone_limits=config.ZONE_LIMITS)
+    if any(pont is not None for pont in ponts):
+        decks = [pont if pont is not None else deck for pont, deck in zip(ponts, table.decks)]
+        table = nautic_core.WeightTable(table.names, masses, centres, groupes, decks=decks,
+                                        zone_limits=config.ZONE_LIMITS)
+    return table
+
+
+def rapport_par_groupe(table:nautic_core.WeightTable):
+    codes, masses, centres = table.group_totals(level=1)
+    msg = "Répartition par groupe de poids:"
+    for code, masse, centre in zip(codes, masses, centres):
+        msg += "<br>   - "+str(code)+"00: "+str(round(float(masse),2))+" kg, X="+str(round(float(centre[0]),1))
+    ui.messageBox(msg)
+
+    fileDlg = ui.createFileDialog()
+    fileDlg.title = 'Save the weight table'
+    fileDlg.filter = '*.csv'
+    if fileDlg.showSave() != adsk.core.DialogResults.DialogOK:
+        return
+    table.to_csv(fileDlg.filename)
@@ -1,88 +1,42 @@
 import adsk.core
 import adsk.fusion
-import os
+import csv
+import dataclasses
+import threading
+import time
 from ...lib import fusion360utils as futil
+from ...lib import nautic_core
 from ... import config
+from . import CMD_ID, CMD_NAME
 
 
 app = adsk.core.Application.get()
 ui = app.userInterface
-design = app.activeProduct
-rootComp = design.rootComponent
-sketches = rootComp.sketches
-planes = rootComp.constructionPlanes
-bodies = rootComp.bRepBodies
-
-# TODO *** Specify the command identity information. ***
-CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_Disp_calc'
-CMD_NAME = 'Calculer déplacement'
-CMD_Description = 'Calcule le déplacement de carène en fonction du tirant d\'eau'
-
-# Specify that the command will be promoted to the panel.
-IS_PROMOTED = False
-
-# TODO *** Define the location where the command button will be created. ***
-# This is done by specifying the workspace, the tab, and the panel, and the 
-# command it will be inserted beside. Not providing the command to position it
-# will insert it at the end.
-WORKSPACE_ID = 'FusionSolidEnvironment' # => Espace de travail CONCEPTION
-PANEL_ID = 'NauticTools' #'SolidScriptsAddinsPanel' # => toolbarPanel
-COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
-
-# Resource location for command icons, here we assume a sub folder in this directory named "resources".
-ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
-
-# Executed when add-in is run.
-def start():
-    # Create a command Definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # ******** Add a button into the UI so the user can run the command. ********
-    # Get the target workspace the button will be created in.
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    # Get the SOLID tab.
-    solidTab = workspace.toolbarTabs.itemById('SolidTab')
-    # Get the panel the button will be created in.
-    panel = solidTab.toolbarPanels.itemById(PANEL_ID)
-    if not panel:
-        panel = solidTab.toolbarPanels.add(PANEL_ID, 'Nautic Tools', 'SelectPanel', False)
-    # Create the button command control in the UI after the specified existing command.
-    control = panel.controls.addCommand(cmd_def)#, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command is promoted to the main toolbar. 
-    control.isPromoted = IS_PROMOTED
-
-
-# Executed when add-in is stopped.
-def stop():
-    # Get the various UI elements for this command
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-    command_control = panel.controls.itemById(CMD_ID)
-    command_definition = ui.commandDefinitions.itemById(CMD_ID)
-
-    # Delete the button command control
-    if command_control:
-        command_control.deleteMe()
-
-    # Delete the command definition
-    if command_definition:
-        command_definition.deleteMe()
+#Aperçu en direct: flottaison et résultats recalculés quand le tirant d'eau ou le nombre de sections change.
+#Les valeurs (balayage des flottaisons sur le maillage en cache) suivent chaque frappe; la courbe
+#des aires n'est lancée qu'après PREVIEW_DELAY secondes sans changement, en arrière-plan, et
+#l'aperçu est relancé quand elle est prête.
+PREVIEW_DELAY = 0.25
+PREVIEW_EVENT_ID = f'{CMD_ID}_preview'
+PREVIEW_INPUTS = ('hull_surf', 'draft_input', 'nbsections', 'area_tolerance', 'curves_mode')
+preview_hull = None         #(entityToken du corps, WaterlineSweep de son maillage)
+preview_graphics = None     #groupe de graphismes de la flottaison (hors timeline)
+preview_command = None
+preview_timer = None
+preview_job = None          #(clé de cache, Job) de la courbe des aires en cours de calcul
+last_change = 0.0
 
 
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Created Event')
+    futil.log('%s Command Created Event', args=(CMD_NAME,))
 
     # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
     inputs = args.command.commandInputs
@@ -99,9 +53,28 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     inputs.addValueInput('draft_input', 'Draft value: ', defaultLengthUnits, default_value)
 
     #Add slider for selection of number of sections for the areas curves
-    sliderinput = inputs.addIntegerSliderCommandInput('nbsections', "Sections:", 5, 30)
+    sliderinput = inputs.addIntegerSliderCommandInput('nbsections', "Sections:", 5, 250)
     sliderinput.valueOne = 10 #sets default value to 10 sections
 
+    #Tolérance relative de la courbe des aires: les sections sont resserrées là où l'aire varie vite
+    #(nombre de sections ci-dessus = maximum). 0: sections régulièrement espacées.
+    default_tolerance = adsk.core.ValueInput.createByReal(1e-3)
+    inputs.addValueInput('area_tolerance', 'Area tolerance: ', '', default_tolerance)
+
+    #Mode courbes hydrostatiques: la valeur de tirant d'eau devient le tirant d'eau maxi
+    inputs.addBoolValueInput('curves_mode', 'Hydrostatic curves', True, '', False)
+    nb_drafts_input = inputs.addIntegerSpinnerCommandInput('nb_drafts', 'Drafts:', 2, 500, 1, 50)
+    nb_drafts_input.isVisible = False
+
+    #Résultats de l'aperçu, mis à jour pendant la saisie
+    inputs.addTextBoxCommandInput('preview_text', 'Preview', '', 5, True)
+
+    #Calcul complet de l'aperçu, déclenché par un minuteur une fois la saisie terminée
+    global preview_command
+    preview_command = args.command
+    preview_event = app.registerCustomEvent(PREVIEW_EVENT_ID)
+    futil.add_handler(preview_event, preview_timer_elapsed, local_handlers=local_handlers)
+
     # TODO Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
     futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
@@ -114,7 +87,7 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
 # is immediately called after the created event not command inputs were created for the dialog.
 def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Execute Event')
+    futil.log('%s Command Execute Event', args=(CMD_NAME,))
 
     # TODO ******************************** Your code here ********************************
     # Get a reference to your command's inputs.
@@ -125,99 +98,220 @@ def command_execute(args: adsk.core.CommandEventArgs):
     recup_object:adsk.fusion.BRepBody = recup_selection.selection(0).entity
     sliderinput:adsk.core.IntegerSliderCommandInput = inputs.itemById('nbsections')
     nb_sections = sliderinput.valueOne #we take value from slider
+    area_tolerance = section_tolerance(inputs)
+    curves_mode: adsk.core.BoolValueCommandInput = inputs.itemById('curves_mode')
+    nb_drafts_input: adsk.core.IntegerSpinnerCommandInput = inputs.itemById('nb_drafts')
 
-    #Create a plane at the waterline position
+    #Maillage de la carène (une seule tessellation, aucune feature dans la timeline, repris du cache)
+    with futil.timed('Disp_calc/tessellate'):
+        hull_mesh = hull_sweep(recup_object).mesh
     z_min_cm=recup_object.boundingBox.minPoint.z
-    offset = z_min_cm+value_draft_cm.value
-    # Add construction plane by offset
-    planeInput = planes.createInput()
-    offsetValue = adsk.core.ValueInput.createByReal(offset)
-    planeInput.setByOffset(rootComp.xYConstructionPlane, offsetValue)
-    planeOne = planes.add(planeInput)
-    planeOne.name = "Waterline"
-
-    #Create the surface at the waterline:
-    sketch = sketches.add(planeOne)
-    courbes_intersection = sketch.intersectWithSketchPlane([recup_object])
-    if sketch.profiles.count == 0:
+
+    #Les calculs se font en arrière-plan (Fusion reste disponible, barre de progression
+    #avec bouton Annuler); seuls les résultats sont créés sur le fil de Fusion.
+    cache = futil.result_cache()
+    if curves_mode.value:
+        #Table hydrostatique sur toute la plage de tirants d'eau, en une seule passe
+        drafts = [value_draft_cm.value*(i+1)/nb_drafts_input.value for i in range(nb_drafts_input.value)]
+        z_waterlines = [z_min_cm+draft for draft in drafts]
+        def compute_table(job:futil.Job):
+            with futil.timed('Disp_calc/solve'):
+                return cache.cached('hydrostatic_table', hull_mesh,
+                                    lambda: nautic_core.hydrostatic_table(hull_mesh, z_waterlines,
+                                                                          density=config.WATER_DENSITY/1000),
+                                    z_waterlines=z_waterlines, density=config.WATER_DENSITY)
+        futil.run_job(CMD_NAME, compute_table, show_hydrostatic_table, message="Table hydrostatique")
+        return
+
+    z_waterline = z_min_cm+value_draft_cm.value
+    def compute(job:futil.Job):
+        job.report(0, 2, "Hydrostatique")
+        with futil.timed('Disp_calc/solve'):
+            hydro = cache.cached('hydrostatics', hull_mesh,
+                                 lambda: nautic_core.hydrostatics(hull_mesh, z_waterline), z_waterline=z_waterline)
+        if hydro.is_flooded or hydro.waterplane_area == 0 or round(hydro.volume,0) == 0:
+            return hydro, None
+        #Les aires sont calculées sur le maillage, sans créer de plan ni d'esquisse.
+        job.report(1, 2, "Courbe des aires")
+        with futil.timed('Disp_calc/slice'):
+            courbe = cache.cached('area_curve', hull_mesh,
+                                  lambda: nautic_core.area_curve(hull_mesh, z_waterline, nb_sections, area_tolerance,
+                                                                 progress=lambda done, total: job.check()),
+                                  z_waterline=z_waterline, nb_sections=nb_sections, tolerance=area_tolerance)
+        return hydro, courbe
+    futil.run_job(CMD_NAME, compute, lambda result: show_results(recup_object, *result), total=2)
+
+
+#Résultats d'un tirant d'eau, sur le fil de Fusion une fois le calcul terminé.
+def show_results(recup_object:adsk.fusion.BRepBody, hydro:nautic_core.Hydrostatics, courbe:nautic_core.AreaCurve):
+    if hydro.is_flooded:
         ui.messageBox("La surface prend l'eau à cet enfoncement. Réduisez le tirant d'eau.")
-        sketch.deleteMe()
-        planeOne.deleteMe()
         return
-    patches = rootComp.features.patchFeatures
-    patchInput = patches.createInput(sketch.profiles.item(0), adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    patch = patches.add(patchInput)
-    surf_intersect_waterline = patch.bodies.item(0)
-    surf_intersect_waterline.name="surface_waterline"
-    # Verify that there is intersection with the waterline plane, and stop if not.
-    if not courbes_intersection:
+    if hydro.waterplane_area == 0:
         ui.messageBox('The hull does not intersect with surface, please provide a different draft value.')
         return
-    #creation d'une copie temporaire de la carène
-    tempHullCopy = recup_object.copyToComponent(rootComp) #BRepBody
-    tempHullCopy.name="tempHullCopy"
-    #Ensuite on crée un split body feature pour diviser le corps en deux
-    splitBodyFeats = rootComp.features.splitBodyFeatures
-    splitBodyInput = splitBodyFeats.createInput(tempHullCopy, planeOne,True)
-    splitBodyFeat = splitBodyFeats.add(splitBodyInput)    
-    if not splitBodyFeat:
-        ui.messageBox('split failed')
-        return
-    #et on ne garde que la partie sous l'eau
-    for i in range(bodies.count):
-        temp_surf=bodies.item(i)
-        if "tempHullCopy" in temp_surf.name: #it is one of the newly created objects
-            if round(temp_surf.boundingBox.minPoint.z,8) == round(z_min_cm,8):#If the lower one, we keep it.
-                wet_surf= temp_surf
-                wet_surf.name="Underwater_part"
-            else:
-                temp_surf.name="deleteMe"
-                i-=1
-                removeFeat = rootComp.features.removeFeatures.add(temp_surf)
-
-
-    #Enfin on crée un solide correspondant à la partie sous l'eau de la coque (volume déplacé)
-    # Define tolerance with 1 mm = 0.1cm.
-    tolerance = adsk.core.ValueInput.createByReal(0.1)
-    #add surfaces to object collection
-    surfaces = adsk.core.ObjectCollection.create()
-    surfaces.add(surf_intersect_waterline)
-    surfaces.add(wet_surf)
-    stitches = rootComp.features.stitchFeatures
-    stitchInput = stitches.createInput(surfaces, tolerance, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    
-    # Create a stitch feature.
-    
-    stitch = stitches.add(stitchInput)
-    volume_deplace = stitch.bodies.item(0)
-    volume_deplace.name="Volume déplacé"
-    if round(volume_deplace.volume,0)==0:
+    if round(hydro.volume,0)==0:
         ui.messageBox("La carene est manifestement percée, bouchez le trou avant de mettre à l'eau.")
-        stitch.deleteMe()
-        splitBodyFeat.deleteMe()
-        wet_surf.deleteMe()
-        patch.deleteMe()
-        sketch.deleteMe()
-        planeOne.deleteMe()
         return
-    deplacement = volume_deplace.volume/1000
 
-    #appel à la fonction de calcul des paramètres hydrostatiques sur un volume donné
-    #display_hydrostatics(volume_deplace)
+    #Longueur et bau à la flottaison exacts: section de la surface par le plan de flottaison,
+    #faite en mémoire (B-Rep temporaire), sans rien ajouter à la timeline.
+    if recup_object.isValid:
+        with futil.timed('Disp_calc/slice'):
+            size = futil.waterline_size(recup_object, hydro.z_waterline)
+        if size:
+            hydro = dataclasses.replace(hydro, lwl=size[0], bwl=size[1])
+
+    #appel à la fonction d'affichage des paramètres hydrostatiques
+    display_hydrostatics(hydro)
     
-    #appel à la fonction de calcul de la courbe des aires
-    courbe_des_aires(volume_deplace,nb_sections)
+    #appel à la fonction de tracé de la courbe des aires
+    courbe_des_aires(courbe,hydro)
 
     #End of program:
     msg="End of program"
     ui.messageBox(msg)
 
 
+#Résultats du mode courbes hydrostatiques, sur le fil de Fusion une fois le calcul terminé.
+def show_hydrostatic_table(table:nautic_core.HydrostaticTable):
+    if table.is_flooded.any():
+        ui.messageBox("La surface prend l'eau avant le tirant d'eau maxi. Réduisez le tirant d'eau.")
+        return
+    write_hydrostatic_table(table)
+    with futil.timed('Disp_calc/create entities'), futil.timeline_results("Hydrostatic Curves"):
+        courbes_hydrostatiques(table)
+    msg="Courbes hydrostatiques: "+str(len(table.draft))+" tirants d'eau calculés."
+    ui.messageBox(msg)
+
+
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Preview Event')
+    futil.log('%s Command Preview Event', args=(CMD_NAME,))
     inputs = args.command.commandInputs
+    preview_text: adsk.core.TextBoxCommandInput = inputs.itemById('preview_text')
+    recup_selection: adsk.core.SelectionCommandInput = inputs.itemById('hull_surf')
+    curves_mode: adsk.core.BoolValueCommandInput = inputs.itemById('curves_mode')
+    clear_preview_graphics()
+    if curves_mode.value or recup_selection.selectionCount == 0:
+        preview_text.formattedText = ''
+        return
+    recup_object:adsk.fusion.BRepBody = recup_selection.selection(0).entity
+    value_draft_cm: adsk.core.ValueCommandInput = inputs.itemById('draft_input')
+    sliderinput:adsk.core.IntegerSliderCommandInput = inputs.itemById('nbsections')
+
+    with futil.timed('Disp_calc/preview'):
+        sweep = hull_sweep(recup_object)
+        z_waterline = recup_object.boundingBox.minPoint.z+value_draft_cm.value
+        hydro = sweep.hydrostatics(z_waterline)
+        if hydro.volume <= 0:
+            preview_text.formattedText = "La carène n'est pas immergée à ce tirant d'eau."
+            return
+        show_waterline(sweep.waterline_segments(z_waterline))
+
+        msg="Deplacement = "+str(round(hydro.volume*config.WATER_DENSITY/1000))+" kg"
+        msg+="<br>LCB = "+str(round(hydro.center_of_buoyancy[0],1))+" cm"
+        msg+="<br>Surface flottaison = "+str(round(hydro.waterplane_area/10000,3))+" m2"
+        msg+="<br>BMt = "+str(round(hydro.bmt/100,3))+" m, BMl = "+str(round(hydro.bml/100,2))+" m"
+        if hydro.is_flooded:
+            msg+="<br>La surface prend l'eau à cet enfoncement."
+        else:
+            courbe = None
+            if time.perf_counter()-last_change >= PREVIEW_DELAY:
+                #saisie terminée: courbe des aires, hors du fil de Fusion
+                courbe = preview_area_curve(sweep.mesh, z_waterline, sliderinput.valueOne, section_tolerance(inputs))
+            if courbe:
+                msg+="<br>Section max = "+str(round(courbe.max_section.area,1))+" cm2 @ x = "+str(round(courbe.max_section.position,1))+" cm"
+            else:
+                msg+="<br>Section max = ..."
+    preview_text.formattedText = msg
+
+
+#Courbe des aires de l'aperçu si elle est en cache; sinon elle est calculée en arrière-plan (et gardée
+#en cache pour le calcul final), l'aperçu étant relancé quand elle est prête. Renvoie None en attendant.
+def preview_area_curve(mesh:nautic_core.HullMesh, z_waterline, nb_sections, area_tolerance):
+    global preview_job
+    cache = futil.result_cache()
+    parameters = dict(z_waterline=z_waterline, nb_sections=nb_sections, tolerance=area_tolerance)
+    key = cache.key(nautic_core.mesh_digest(mesh), 'area_curve', parameters)
+    if preview_job and preview_job[0] == key:
+        return None
+    courbe = cache.get(key)
+    if courbe is not None:
+        return courbe
+    if preview_job:
+        preview_job[1].cancel()
+    def compute(job:futil.Job):
+        #un aperçu remplacé par un autre s'arrête entre deux passes de coupes
+        with futil.timed('Disp_calc/preview area curve'):
+            return cache.cached('area_curve', mesh,
+                                lambda: nautic_core.area_curve(mesh, z_waterline, nb_sections, area_tolerance,
+                                                               progress=lambda done, total: job.check()),
+                                **parameters)
+    def done(result):
+        global preview_job
+        if preview_job and preview_job[0] == key:
+            preview_job = None
+            if preview_command:
+                preview_command.doExecutePreview()
+    def failed(error):
+        global preview_job
+        if preview_job and preview_job[0] == key:
+            preview_job = None
+        futil.log('%s aperçu: %s', adsk.core.LogLevels.WarningLogLevel, args=(CMD_NAME, str(error)))
+    preview_job = (key, futil.run_job(f'{CMD_NAME} preview', compute, done, on_error=failed, progress=False))
+    return None
+
+
+#Tolérance de la courbe des aires saisie, None pour des sections régulièrement espacées.
+def section_tolerance(inputs:adsk.core.CommandInputs):
+    tolerance_input: adsk.core.ValueCommandInput = inputs.itemById('area_tolerance')
+    return tolerance_input.value if tolerance_input.value > 0 else None
+
+
+#Maillage de la carène et balayage des flottaisons, gardés tant que le même corps est sélectionné.
+def hull_sweep(body:adsk.fusion.BRepBody) -> nautic_core.WaterlineSweep:
+    global preview_hull
+    if preview_hull is None or preview_hull[0] != body.entityToken:
+        preview_hull = (body.entityToken, nautic_core.WaterlineSweep(futil.hull_mesh(body)))
+    return preview_hull[1]
+
+
+#Trace la flottaison en graphismes personnalisés: rien n'est ajouté à la timeline.
+def show_waterline(segments):
+    global preview_graphics
+    if len(segments) == 0:
+        return
+    preview_graphics = futil.root_component().customGraphicsGroups.add()
+    coordinates = adsk.fusion.CustomGraphicsCoordinates.create(segments.ravel().tolist())
+    lines = preview_graphics.addLines(coordinates, [], False)
+    lines.color = adsk.fusion.CustomGraphicsSolidColorEffect.create(adsk.core.Color.create(0, 120, 255, 255))
+    lines.weight = 2
+
+
+def clear_preview_graphics():
+    global preview_graphics
+    if preview_graphics and preview_graphics.isValid:
+        preview_graphics.deleteMe()
+    preview_graphics = None
+
+
+#Relance l'aperçu après PREVIEW_DELAY secondes sans changement (minuteur redémarré à chaque saisie).
+def schedule_full_preview():
+    global preview_timer, last_change
+    last_change = time.perf_counter()
+    if preview_timer:
+        preview_timer.cancel()
+    preview_timer = threading.Timer(PREVIEW_DELAY, app.fireCustomEvent, (PREVIEW_EVENT_ID,))
+    preview_timer.daemon = True
+    preview_timer.start()
+
+
+#Appelé sur le fil de Fusion quand le minuteur expire.
+def preview_timer_elapsed(args: adsk.core.CustomEventArgs):
+    if preview_command and time.perf_counter()-last_change >= PREVIEW_DELAY:
+        preview_command.doExecutePreview()
 
 
 # This event handler is called when the user changes anything in the command dialog
@@ -227,20 +321,27 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     inputs = args.inputs
 
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}')
+    futil.log('%s Input Changed Event fired from a change to %s', args=(CMD_NAME, changed_input.id))
+
+    if changed_input.id == 'curves_mode':
+        inputs.itemById('nb_drafts').isVisible = changed_input.value
+        inputs.itemById('preview_text').isVisible = not changed_input.value
+    if changed_input.id in PREVIEW_INPUTS:
+        schedule_full_preview()
 
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Validate Input Event')
+    futil.log('%s Validate Input Event', args=(CMD_NAME,))
 
     inputs = args.inputs
     
     # Verify the validity of the input values. This controls if the OK button is enabled or not.
     valueInput = inputs.itemById('draft_input')
-    if valueInput.value >= 0:
+    toleranceInput = inputs.itemById('area_tolerance')
+    if valueInput.value >= 0 and toleranceInput.value >= 0:
         args.areInputsValid = True
     else:
         args.areInputsValid = False
@@ -249,164 +350,154 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Destroy Event')
-
-    global local_handlers
+    futil.log('%s Command Destroy Event', args=(CMD_NAME,))
+    futil.log('%s cache: %s', args=(CMD_NAME, futil.result_cache().stats()))
+
+    global local_handlers, preview_hull, preview_command, preview_timer, preview_job
+    if preview_timer:
+        preview_timer.cancel()
+    if preview_job:
+        preview_job[1].cancel()
+    app.unregisterCustomEvent(PREVIEW_EVENT_ID)
+    clear_preview_graphics()
+    preview_hull = preview_command = preview_timer = preview_job = None
     local_handlers = []
 
 
-#Fonction de calcul et affichage des paramètres hydrostatiques
-#prend comme input le volume immergé de la carène uniquement.
-def display_hydrostatics(body:adsk.fusion.BRepBody):
-    disp_vol = body.volume
-    water_density = 1.025/1000 #kg/cm3
+#Fonction d'affichage des paramètres hydrostatiques
+#prend comme input le résultat du calcul sur le maillage de la carène.
+def display_hydrostatics(hydro:nautic_core.Hydrostatics):
+    disp_vol = hydro.volume
+    water_density = config.WATER_DENSITY/1000 #kg/cm3
     disp_weight = disp_vol*water_density
     
-    #Find waterplane
-    ref_vector = adsk.core.Vector3D.create(0,0,1)
-    for face in body.faces:
-        point = adsk.core.Point2D.create(0.5,0.5)
-        normal_vector = face.evaluator.getNormalAtParameter(point)[1]
-        if ref_vector.angleTo(normal_vector)<0.01:
-            #Face du plan de flottaison trouvée, on la stocke.
-            waterplane = face
-            break
-    waterplane_area = waterplane.area
-    LWL = waterplane.boundingBox.maxPoint.x - waterplane.boundingBox.minPoint.x #Length at waterline
-    beam_WL = waterplane.boundingBox.maxPoint.y - waterplane.boundingBox.minPoint.y #Beam at waterline
-    wetted_area = body.area - waterplane_area #surface mouillée en cm2
+    LWL = hydro.lwl #Length at waterline
+    beam_WL = hydro.bwl #Beam at waterline
+    wetted_area = hydro.wetted_area #surface mouillée en cm2
 
     #centre de flottaison
-    CoB = body.physicalProperties.centerOfMass #Point3D object for center of buoyancy
+    CoB = hydro.center_of_buoyancy #(x, y, z) of center of buoyancy
     #Position of CoB from Midship
-    x_midship = (waterplane.boundingBox.maxPoint.x + waterplane.boundingBox.minPoint.x)/2
-    pos_CoB_pct = (CoB.x - x_midship)*100/x_midship
+    x_midship = (hydro.immersed_max[0] + hydro.immersed_min[0])/2
+    pos_CoB_pct = (CoB[0] - x_midship)*100/x_midship
 
 
     msg="Paramètres hydro statiques:"
     msg+="<br>Déplacement = "+str(round(disp_weight))+" kg"
     msg+="<br>Longueur Flottaison = "+str(round(LWL/100,3))+" m"
     msg+="<br>Bau maxi flottaison = "+str(round(beam_WL/100,3))+" m"
+    msg+="<br>Surface flottaison = "+str(round(hydro.waterplane_area/10000,3))+" m2"
     msg+="<br>Surface mouillée = "+str(round(wetted_area/10000,3))+" m2"
     msg+="<br>Position Longi du centre de flottaison = "+str(round(pos_CoB_pct,2))+" %"
+    #propriétés de la flottaison, intégrées sur les triangles coupés à la flottaison
+    msg+="<br>LCF = "+str(round(hydro.center_of_flotation[0]/100,3))+" m"
+    msg+="<br>It = "+str(round(hydro.it/1e8,4))+" m4, Il = "+str(round(hydro.il/1e8,3))+" m4"
+    msg+="<br>BMt = "+str(round(hydro.bmt/100,3))+" m, BMl = "+str(round(hydro.bml/100,2))+" m"
+    msg+="<br>KMt = "+str(round((CoB[2]-hydro.immersed_min[2]+hydro.bmt)/100,3))+" m (depuis le bas de la carène)"
     ui.messageBox(msg)
 
-def courbe_des_aires(body:adsk.fusion.BRepBody, sections:int):
-    # Le but est de couper la partie immergée de la carène en plusieurs sections,et pour chacune d'elle
-    # de déterminer l'aire de la section. Ensuite on stocke tout et on trace la courbe.
-    NOMBRE_SECTIONS=sections
-    LWL=body.boundingBox.maxPoint.x-body.boundingBox.minPoint.x
-    start_x = body.boundingBox.minPoint.x
-    planeInput = planes.createInput() #crée objet planeInput pour pouvoir créer des plans.
-    aires=[0 for i in range(NOMBRE_SECTIONS+1) ]
-    pos_x = [0 for i in range(NOMBRE_SECTIONS+1) ]
-    offset_z = body.boundingBox.maxPoint.z #pour aligner la courbe des aires sur la waterline
-    for i in range(NOMBRE_SECTIONS+1):
-        pos_x[i]=start_x+i*LWL/NOMBRE_SECTIONS #position de la section courante
-        #crée un plan décalé à cette position
-        offsetValue = adsk.core.ValueInput.createByReal(pos_x[i])
-        planeInput.setByOffset(rootComp.yZConstructionPlane, offsetValue)
-        planecurrent = planes.add(planeInput)
-        planecurrent.name = "Section @ "+str(round(pos_x[i],1))+" cm"
-        #crée un sketch sur ce plan
-        sketch = sketches.add(planecurrent)
-        sketch.name = "Section @ "+str(round(pos_x[i],1))+" cm"
-        # crée l'intersection du corps étudié avec ce plan
-        sketch.intersectWithSketchPlane([body])
-        #récupère son aire
-        if sketch.sketchCurves.count == 0:
-            #TODO: problème identifié, certaines sections ne donnent pas des loops...bizare...mais à résoudre.
-            aires[i]=0
-        else:
-            if sketch.profiles.count==0:
-                #cas particulier où ça ne crée pas un profile (ça devrait tt le tps, mais ça arrive que non)
-                #on recrée une surface avec les courbes du sketch...
-                patches = rootComp.features.patchFeatures
-                patchInput = patches.createInput(sketch.sketchCurves.item(0), adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-                patch = patches.add(patchInput)
-                face=patch.faces.item(0)
-                aires[i]= face.area
-                patch.deleteMe()
-            else:
-                for j in range(sketch.profiles.count): #boucle sur toutes les surfaces du sketch (1 seule normalement)
-                    profile_current=sketch.profiles.item(j)
-                    aires[i]+=round(profile_current.areaProperties().area,2) #en cm^2
-        #efface ce qu'on a créé
-        sketch.deleteMe()
-        planecurrent.deleteMe()
-
-    #trouve la section proche de la section max et les deux qui les entoure:
-    sec=[(0,0),(0,0),(0,0),(0,0),(0,0)] #(aire, pos_x) tuples.
-    for i in range(1,NOMBRE_SECTIONS-1):
-        if (aires[i+1]>aires[i]) and (aires[i+1]>aires[i+2]):
-            sec[0]=(aires[i], pos_x[i])
-            sec[2] = (aires[i+1], pos_x[i+1])
-            sec[4] = (aires[i+2], pos_x[i+2])
-            break
-    #a partir de ces sections encadrantes, on va chercher plus finement
-    precision=0.05 #seuil pour considérer qu'on a la section max.
-    section_max(body,sec,precision)
+#Colonnes de la table hydrostatique: (titre, attribut de HydrostaticTable, facteur d'unité)
+#Le maillage est en cm et la densité en kg/cm3.
+HYDRO_COLUMNS = [
+    ("T (m)", 'draft', 1/100),
+    ("Deplacement (t)", 'displacement', 1/1000),
+    ("LCB (m)", 'lcb', 1/100),
+    ("KB (m)", 'kb', 1/100),
+    ("Awp (m2)", 'waterplane_area', 1/10000),
+    ("LCF (m)", 'lcf', 1/100),
+    ("BMt (m)", 'bmt', 1/100),
+    ("BMl (m)", 'bml', 1/100),
+    ("TPC (t/cm)", 'tpc', 1/1000),
+    ("MCT1cm (t.m/cm)", 'mct', 1/100000),
+    ("Cb", 'cb', 1),
+    ("Cp", 'cp', 1),
+    ("Cwp", 'cwp', 1),
+]
+
+#Enregistre la table hydrostatique dans un fichier CSV choisi par l'utilisateur.
+def write_hydrostatic_table(table:nautic_core.HydrostaticTable):
+    fileDlg = ui.createFileDialog()
+    fileDlg.title = 'Save the hydrostatic table'
+    fileDlg.filter = '*.csv'
+    if fileDlg.showSave() != adsk.core.DialogResults.DialogOK:
+        return
+    with open(fileDlg.filename, 'w', encoding="utf-8", newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow([column[0] for column in HYDRO_COLUMNS])
+        for i in range(len(table.draft)):
+            writer.writerow([round(float(getattr(table, attr)[i])*factor, 6) for _, attr, factor in HYDRO_COLUMNS])
+
+#Trace les courbes hydrostatiques dans un sketch: tirant d'eau en ordonnée (aligné sur la carène),
+#chaque grandeur en abscisse, ramenée à la longueur de la carène.
+def courbes_hydrostatiques(table:nautic_core.HydrostaticTable):
+    start_x = float(table.lcb[-1] - table.lwl[-1]/2)
+    width = float(table.lwl[-1])
+    rootComp = futil.root_component()
+    sketch = rootComp.sketches.add(rootComp.xZConstructionPlane)
+    sketch.name = "Hydrostatic Curves"
+    for title, attr, factor in HYDRO_COLUMNS[1:]:
+        values = getattr(table, attr)
+        scale = max(abs(float(v)) for v in values)
+        if scale == 0:
+            continue
+        points = adsk.core.ObjectCollection.create()
+        for value, z in zip(values, table.z_waterline):
+            #Attention: coordinates of point in the local coordinate system of the sketch
+            points.add(adsk.core.Point3D.create(start_x+float(value)/scale*width, -float(z), 0))
+        sketch.sketchCurves.sketchFittedSplines.add(points)
+        #étiquette en haut de la courbe avec la valeur maxi
+        top = points.item(points.count-1)
+        text_height = width/100
+        textInput = sketch.sketchTexts.createInput2(title+" (max "+str(round(scale*factor,3))+")", text_height)
+        textInput.setAsMultiLine(top, adsk.core.Point3D.create(top.x+width/5, top.y-2*text_height, 0),
+                                 adsk.core.HorizontalAlignments.LeftHorizontalAlignment,
+                                 adsk.core.VerticalAlignments.BottomVerticalAlignment, 0)
+        sketch.sketchTexts.add(textInput)
+
+def courbe_des_aires(courbe:nautic_core.AreaCurve, hydro:nautic_core.Hydrostatics):
+    # La partie immergée de la carène est coupée en plusieurs sections, et pour chacune d'elle
+    # l'aire de la section est déterminée (calcul en arrière-plan). On trace ici la courbe.
+    pos_x = courbe.stations.tolist() #position des sections
+    aires = courbe.areas.tolist() #en cm^2
+
+    #section max sur la courbe des aires, affinée par quelques coupes du maillage
+    section = courbe.max_section
+    msg="section max = "+str(round(section.area,2))+" cm2 (± "+str(round(section.area_error,4))+")."
+    msg+="<br> @ x = "+str(round(section.position,2))+" cm (± "+str(round(section.position_error,3))+")."
+    #contrôle: volume sous la courbe des aires comparé au volume du maillage
+    if courbe.volume is not None and hydro.volume > 0:
+        ecart = (courbe.volume-hydro.volume)/hydro.volume*100
+        msg+="<br>Volume sous la courbe ("+str(len(pos_x))+" sections) = "+str(round(courbe.volume/1e6,4))+" m3"
+        msg+=", écart avec la carène "+f"{ecart:+.3f}"+" %"
+    ui.messageBox(msg)
 
     #crée un sketch pour tracer la courbe des aires:
-    pos_y=(body.boundingBox.maxPoint.y+body.boundingBox.minPoint.y)/2
+    #plan et esquisse regroupés dans la timeline, supprimés en cas d'erreur
+    with futil.timed('Disp_calc/create entities'), futil.timeline_results("Areas Curve"):
+        trace_courbe_des_aires(pos_x, aires, hydro)
+
+    msg="Calcul de la courbe des aires terminé."
+    ui.messageBox(msg)
+
+#Esquisse de la courbe des aires, sur un plan vertical passant par le milieu de la flottaison.
+def trace_courbe_des_aires(pos_x:list, aires:list, hydro:nautic_core.Hydrostatics):
+    offset_z = hydro.z_waterline #pour aligner la courbe des aires sur la waterline
+    pos_y=(hydro.immersed_max[1]+hydro.immersed_min[1])/2
+    rootComp = futil.root_component()
+    planes = rootComp.constructionPlanes
+    planeInput = planes.createInput() #crée objet planeInput pour pouvoir créer des plans.
     offsetValue = adsk.core.ValueInput.createByReal(pos_y)
     planeInput.setByOffset(rootComp.xZConstructionPlane, offsetValue)
     planecurrent = planes.add(planeInput)
     planecurrent.name = "Areas Curve"
-    sketch = sketches.add(planecurrent)
+    sketch = rootComp.sketches.add(planecurrent)
     sketch.name = "Areas Curve"
     sketchPoints = sketch.sketchPoints
     points = adsk.core.ObjectCollection.create()
-    for i in range(NOMBRE_SECTIONS+1):
+    for i in range(len(pos_x)):
         #crée un point3D avec la pos_X en abscisse et l'aire en ordonnée
         #Attention: coordinates of point in the local coordinate system of the sketch
         point = adsk.core.Point3D.create(pos_x[i], -aires[i]/10-offset_z,0) #Z=0 to create in the plane.
         sketchPoints.add(point)
         points.add(point)
     spline = sketch.sketchCurves.sketchFittedSplines.add(points)
-
-    msg="Calcul de la courbe des aires terminé."
-    ui.messageBox(msg)
-
-def section_max(body:adsk.fusion.BRepBody,sec,precision:float):
-    start_x = body.boundingBox.minPoint.x
-    trigger=(body.boundingBox.maxPoint.x-body.boundingBox.minPoint.x)*precision
-    planeInput = planes.createInput()
-    counter=0
-    while (abs(sec[4][1]-sec[0][1]) > trigger) and (counter < 100):
-        counter+=1
-        #récupère section entre chaque section inf,bau et sup
-        sec[1] = get_mid_sect(body, sec[0], sec[2], planeInput)
-        sec[3] = get_mid_sect(body, sec[2], sec[4], planeInput)
-        for i in range(3):
-            if (sec[i+1][0]>sec[i][0]) and (sec[i+1][0]>sec[i+2][0]):
-                tmp1 = sec[i]
-                tmp2 = sec[i+1]
-                tmp3 = sec[i+2]                
-                sec[0] = tmp1
-                sec[1] = (0,0)
-                sec[2] = tmp2
-                sec[3] = (0,0)
-                sec[4] = tmp3
-                break
-    msg="section max = "+str(round(sec[2][0],2))+" cm2."
-    msg+="<br> @ x = "+str(round(sec[2][1],2))+" cm."
-    ui.messageBox(msg)
-
-def get_mid_sect(body, tuple_inf, tuple_sup, planeInput):
-    pos_x=(tuple_inf[1]+tuple_sup[1])/2 #position de la section courante
-    #crée un plan décalé à cette position
-    offsetValue = adsk.core.ValueInput.createByReal(pos_x)
-    planeInput.setByOffset(rootComp.yZConstructionPlane, offsetValue)
-    planecurrent = planes.add(planeInput)
-    #crée un sketch sur ce plan
-    sketch = sketches.add(planecurrent)
-    #crée l'intersection du corps étudié avec ce plan
-    sketchEntities = sketch.intersectWithSketchPlane([body])
-    aire=0
-    for j in range(sketch.profiles.count): #boucle sur toutes les surfaces du sketch (1 seule normalement)
-        profile_current=sketch.profiles.item(j)
-        aire +=profile_current.areaProperties().area
-    sketch.deleteMe()
-    planecurrent.deleteMe() 
-    return (aire,pos_x)
\ No newline at end of file
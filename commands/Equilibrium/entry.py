@@ -1,88 +1,25 @@
 import adsk.core
 import adsk.fusion
-import os
+import math
 from ...lib import fusion360utils as futil
+from ...lib import nautic_core
 from ... import config
+from . import CMD_NAME
 
 
 app = adsk.core.Application.get()
 ui = app.userInterface
-design = app.activeProduct
-rootComp = design.rootComponent
-sketches = rootComp.sketches
-planes = rootComp.constructionPlanes
-bodies = rootComp.bRepBodies
-
-# TODO *** Specify the command identity information. ***
-CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_Equilibrium'
-CMD_NAME = 'Trouver Equilibre 2D'
-CMD_Description = "Pour un CdG donné, calcul le tirant d'eau et l'assiette de la coque"
-
-# Specify that the command will be promoted to the panel.
-IS_PROMOTED = True
-
-# TODO *** Define the location where the command button will be created. ***
-# This is done by specifying the workspace, the tab, and the panel, and the 
-# command it will be inserted beside. Not providing the command to position it
-# will insert it at the end.
-WORKSPACE_ID = 'FusionSolidEnvironment' # => Espace de travail CONCEPTION
-PANEL_ID = 'NauticTools' #'SolidScriptsAddinsPanel' # => toolbarPanel
-COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
-
-# Resource location for command icons, here we assume a sub folder in this directory named "resources".
-ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
 
-# Executed when add-in is run.
-def start():
-    # Create a command Definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # ******** Add a button into the UI so the user can run the command. ********
-    # Get the target workspace the button will be created in.
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    # Get the SOLID tab.
-    solidTab = workspace.toolbarTabs.itemById('SolidTab')
-    # Get the panel the button will be created in.
-    panel = solidTab.toolbarPanels.itemById(PANEL_ID)
-    if not panel:
-        panel = solidTab.toolbarPanels.add(PANEL_ID, 'Nautic Tools', 'SelectPanel', False)
-    # Create the button command control in the UI after the specified existing command.
-    control = panel.controls.addCommand(cmd_def)#, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command is promoted to the main toolbar. 
-    control.isPromoted = IS_PROMOTED
-
-
-# Executed when add-in is stopped.
-def stop():
-    # Get the various UI elements for this command
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-    command_control = panel.controls.itemById(CMD_ID)
-    command_definition = ui.commandDefinitions.itemById(CMD_ID)
-
-    # Delete the button command control
-    if command_control:
-        command_control.deleteMe()
-
-    # Delete the command definition
-    if command_definition:
-        command_definition.deleteMe()
-
-
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Created Event')
+    futil.log('%s Command Created Event', args=(CMD_NAME,))
 
     # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
     inputs = args.command.commandInputs
@@ -102,6 +39,10 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     cog_selection.setSelectionLimits(1,1)
     cog_selection.addSelectionFilter('SketchPoints')
 
+    #Tolérance relative sur le déplacement pour la recherche du tirant d'eau
+    default_tolerance = adsk.core.ValueInput.createByReal(1e-6)
+    inputs.addValueInput('tolerance_input', 'Tolerance: ', '', default_tolerance)
+
     # TODO Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
     futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
@@ -114,7 +55,7 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
 # is immediately called after the created event not command inputs were created for the dialog.
 def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Execute Event')
+    futil.log('%s Command Execute Event', args=(CMD_NAME,))
 
     # TODO ******************************** Your code here ********************************
     # Get a reference to your command's inputs.
@@ -130,35 +71,67 @@ def command_execute(args: adsk.core.CommandEventArgs):
     cog_3Dpoint = cog_point.worldGeometry
     # ui.messageBox("x: "+str(cog_3Dpoint.x)+"<br>y: "+str(cog_3Dpoint.y)+"<br>z: "+str(cog_3Dpoint.z))
     
-    #Create a plane at the waterline position
+    tolerance_input: adsk.core.ValueCommandInput = inputs.itemById('tolerance_input')
+    
+    #Maillage de la carène, puis recherche du tirant d'eau (Newton sur le volume,
+    #la surface de flottaison donnant la dérivée dV/dT) sur ce maillage.
+    with futil.timed('Equilibrium/tessellate'):
+        hull_mesh = futil.hull_mesh(hull_body)
     z_min_cm=hull_body.boundingBox.minPoint.z
-    #valeur en cm du pas de départ pour trouver le déplacement, on commence par 10% de la hauteur de la coque.
-    step_cm = 0.1*abs(hull_body.boundingBox.maxPoint.z-hull_body.boundingBox.minPoint.z)
-
-    plane_position = z_min_cm
-    planeInput = planes.createInput()
-    displacement=0
-    threshold = 0.01 #seuil limite pour considérer qu'on a trouvé la bonne waterline
-    loop=0
-    while (abs(displacement-weight_value)/weight_value > threshold) and (loop<10):
-        loop+=1
-        if (displacement==-1) or (displacement>weight_value):
-            #dans ce cas on divise le step par 2 et on revient un cran en arrière
-            step_cm=step_cm/2
-            plane_position-=step_cm
-        else:
-            #sinon on passe au step suivant
-            plane_position+=step_cm
-        offsetValue = adsk.core.ValueInput.createByReal(plane_position)
-        planeInput.setByOffset(rootComp.xYConstructionPlane, offsetValue)
-        planecurrent = planes.add(planeInput)
-        displacement = get_displ(hull_body,planecurrent)
-        planecurrent.deleteMe()
-    #en sortie de cette boucle on a plane_position pour le bon déplacement
+    target_volume = weight_value/(config.WATER_DENSITY/1000) #en cm3
+    tolerance = tolerance_input.value
+    cog = (cog_3Dpoint.x, cog_3Dpoint.y, cog_3Dpoint.z)
+
+    #Les deux recherches se font en arrière-plan (barre de progression avec bouton Annuler),
+    #les résultats sont affichés sur le fil de Fusion.
+    cache = futil.result_cache()
+    def compute(job:futil.Job):
+        job.report(0, 2, "Tirant d'eau")
+        with futil.timed('Equilibrium/solve'):
+            solution = cache.cached('solve_draft', hull_mesh,
+                                    lambda: nautic_core.solve_draft(hull_mesh, target_volume, tolerance),
+                                    volume=target_volume, tolerance=tolerance)
+        if solution.hydrostatics.is_flooded:
+            return solution, None
+        #Position d'équilibre libre: enfoncement, gîte et assiette pour que le centre de carène
+        #soit à la verticale du CdG. La carène est tournée autour du CdG, sur le maillage.
+        job.report(1, 2, "Position d'équilibre")
+        with futil.timed('Equilibrium/solve floating position'):
+            position = cache.cached('solve_floating_position', hull_mesh,
+                                    lambda: nautic_core.solve_floating_position(hull_mesh, target_volume, cog, tolerance,
+                                                                                start=(solution.z_waterline, 0, 0)),
+                                    volume=target_volume, center_of_gravity=cog, tolerance=tolerance)
+        return solution, position
+    futil.run_job(CMD_NAME, compute, lambda result: show_results(z_min_cm, *result), total=2)
+
+
+#Affichage des résultats, sur le fil de Fusion une fois le calcul terminé.
+def show_results(z_min_cm:float, solution:nautic_core.DraftSolution, position:nautic_core.FloatingPosition):
+    if solution.hydrostatics.is_flooded:
+        ui.messageBox("La carène prend l'eau avant d'atteindre ce déplacement.")
+        return
     #on peut calculer le tirant d'eau associé et l'afficher
-    draft_cm = plane_position-z_min_cm
+    displacement = solution.hydrostatics.volume/1000*config.WATER_DENSITY
+    draft_cm = solution.z_waterline-z_min_cm
     msg="Pour un déplacement de "+str(round(displacement,0))+" kg,"
     msg+="<br> le tirant d'eau sera de "+str(round(draft_cm,1))+" cm."
+    msg+="<br>("+str(solution.iterations)+" itérations, écart relatif "+f"{solution.residual:.1e}"+")"
+    if not solution.converged:
+        msg+="<br>Attention: la recherche n'a pas convergé."
+    ui.messageBox(msg)
+
+    if position.hydrostatics.is_flooded:
+        ui.messageBox("La carène prend l'eau dans sa position d'équilibre.")
+        return
+    msg="Position d'équilibre:"
+    msg+="<br>Gîte = "+str(round(math.degrees(position.heel),2))+" ° (positif: bord -Y enfoncé)"
+    msg+="<br>Assiette = "+str(round(math.degrees(position.trim),2))+" ° (positif: extrémité +X enfoncée)"
+    msg+="<br>Tirant d'eau maxi = "+str(round(position.hydrostatics.draft,1))+" cm"
+    msg+="<br>Moments résiduels = "+f"{position.heeling_moment/1000*config.WATER_DENSITY:.2e}"
+    msg+=" / "+f"{position.trimming_moment/1000*config.WATER_DENSITY:.2e}"+" kg.cm"
+    msg+="<br>("+str(position.iterations)+" itérations)"
+    if not position.converged:
+        msg+="<br>Attention: la recherche n'a pas convergé."
     ui.messageBox(msg)
 
     #End of program:
@@ -169,7 +142,7 @@ def command_execute(args: adsk.core.CommandEventArgs):
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Preview Event')
+    futil.log('%s Command Preview Event', args=(CMD_NAME,))
     inputs = args.command.commandInputs
 
 
@@ -180,20 +153,21 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     inputs = args.inputs
 
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}')
+    futil.log('%s Input Changed Event fired from a change to %s', args=(CMD_NAME, changed_input.id))
 
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Validate Input Event')
+    futil.log('%s Validate Input Event', args=(CMD_NAME,))
 
     inputs = args.inputs
     
     # Verify the validity of the input values. This controls if the OK button is enabled or not.
-    valueInput = inputs.itemById('draft_input')
-    if valueInput.value >= 0:
+    weightInput = inputs.itemById('weight_input')
+    toleranceInput = inputs.itemById('tolerance_input')
+    if weightInput.value > 0 and toleranceInput.value > 0:
         args.areInputsValid = True
     else:
         args.areInputsValid = False
@@ -202,71 +176,8 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Destroy Event')
+    futil.log('%s Command Destroy Event', args=(CMD_NAME,))
+    futil.log('%s cache: %s', args=(CMD_NAME, futil.result_cache().stats()))
 
     global local_handlers
     local_handlers = []
-
-
-#Fonction de calcul et affichage des paramètres hydrostatiques
-#prend comme input le volume immergé de la carène uniquement.
-def get_displ(body:adsk.fusion.BRepBody, plane:adsk.fusion.ConstructionPlane):
-    #retourne le poids déplacé, ou -1 si entrée d'eau à cette hauteur.
-    #crée l'intersection entre la coque et le plan:
-    sketch = sketches.add(plane)
-    sketch.intersectWithSketchPlane([body])
-    #vérifie si à cet enfoncement ça prend l'eau ou pas
-    if sketch.profiles.count == 0:
-        return -1
-    #si on arrive là c'est que ça ne prend pas l'eau, on crée la surface waterplane_surf.
-    patches = rootComp.features.patchFeatures
-    patchInput = patches.createInput(sketch.profiles.item(0), adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    patch = patches.add(patchInput)
-    waterplane_surf = patch.bodies.item(0)
-
-    list_bodies_before_split=[bodies.item(i) for i in range(bodies.count)]
-    z_min = round(body.boundingBox.minPoint.z,2)
-
-    #Ensuite coupe la coque par le plan pour récupérer la partie immergée
-    splitBodyFeats = rootComp.features.splitBodyFeatures
-    splitBodyInput = splitBodyFeats.createInput(body, plane,True)
-    splitBodyFeat = splitBodyFeats.add(splitBodyInput)    
-    if not splitBodyFeat:
-        ui.messageBox('split failed')
-        return -1
-    
-    #et on ne garde que la partie sous l'eau
-    for i in range(bodies.count):
-        if (bodies.item(i)==body) or (bodies.item(i) not in list_bodies_before_split):
-            if round(bodies.item(i).boundingBox.minPoint.z,2) == z_min:#If the lower one, we keep it.
-                wet_surf= bodies.item(i)
-                break
-    
-    #Enfin on crée un solide correspondant à la partie sous l'eau de la coque (volume déplacé)
-    # Define tolerance with 1 mm = 0.1cm.
-    tolerance = adsk.core.ValueInput.createByReal(0.1)
-    #add surfaces to object collection
-    surfaces = adsk.core.ObjectCollection.create()
-    surfaces.add(waterplane_surf)
-    surfaces.add(wet_surf)
-    # Create a stitch feature.
-    stitches = rootComp.features.stitchFeatures
-    stitchInput = stitches.createInput(surfaces, tolerance, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    stitch = stitches.add(stitchInput)
-    # récupère le volume immergé
-    volume_deplace = stitch.bodies.item(0)
-    if round(volume_deplace.volume,0)==0:
-        ui.messageBox("La carene est manifestement percée, bouchez le trou avant de mettre à l'eau.")
-
-    #stocke la valeur demandée
-    deplacement = volume_deplace.volume/1000*config.WATER_DENSITY
-    
-    #nettoyage
-    stitch.deleteMe()
-    splitBodyFeat.deleteMe()
-    patch.deleteMe()
-    sketch.deleteMe()
-    
-    #renvoie la valeur demandée
-    return deplacement
-    #fin de la fonction
\ No newline at end of file
@@ -0,0 +1,178 @@
+import adsk.core
+import adsk.fusion
+import math
+from ...lib import fusion360utils as futil
+from ...lib import nautic_core
+from ... import config
+from . import CMD_NAME
+
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# This defines the contents of the command dialog and connects to the command related events.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Created Event', args=(CMD_NAME,))
+
+    # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
+    inputs = args.command.commandInputs
+
+    # Création du champ de sélection de la surface
+    body_selection = inputs.addSelectionInput('hull_surf', 'Hull surface :','Choisir la surface de la carène')
+    body_selection.setSelectionLimits(1,1)
+    body_selection.addSelectionFilter('SurfaceBodies')
+
+    default_value = adsk.core.ValueInput.createByString('1500')
+    inputs.addValueInput('weight_input', 'Weight value: ', "kg", default_value)
+
+    #Add selection of CoG point (vertex, or sketch point generated by Devis_poids)
+    cog_selection = inputs.addSelectionInput('cog_point', 'CoG point (sketchpoint) :','Choisir le point du CdG')
+    cog_selection.setSelectionLimits(1,1)
+    cog_selection.addSelectionFilter('SketchPoints')
+
+    #Plage de gîte: de 0 à heel_max, par pas de heel_step
+    inputs.addValueInput('heel_max', 'Max heel: ', 'deg', adsk.core.ValueInput.createByString('180 deg'))
+    inputs.addValueInput('heel_step', 'Heel step: ', 'deg', adsk.core.ValueInput.createByString('5 deg'))
+
+    #Tolérance relative de chaque recherche d'équilibre
+    default_tolerance = adsk.core.ValueInput.createByReal(1e-6)
+    inputs.addValueInput('tolerance_input', 'Tolerance: ', '', default_tolerance)
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.executePreview, command_preview, local_handlers=local_handlers)
+    futil.add_handler(args.command.validateInputs, command_validate_input, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# This event handler is called when the user clicks the OK button in the command dialog or 
+# is immediately called after the created event not command inputs were created for the dialog.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Execute Event', args=(CMD_NAME,))
+
+    inputs = args.command.commandInputs
+    hull_selection: adsk.core.SelectionCommandInput = inputs.itemById('hull_surf')
+    weight_input: adsk.core.ValueCommandInput = inputs.itemById('weight_input')
+    cog_selection: adsk.core.SelectionCommandInput = inputs.itemById('cog_point')
+    heel_max: adsk.core.ValueCommandInput = inputs.itemById('heel_max')
+    heel_step: adsk.core.ValueCommandInput = inputs.itemById('heel_step')
+    tolerance_input: adsk.core.ValueCommandInput = inputs.itemById('tolerance_input')
+    hull_body:adsk.fusion.BRepBody = hull_selection.selection(0).entity
+    cog_3Dpoint = cog_selection.selection(0).entity.worldGeometry
+    cog = (cog_3Dpoint.x, cog_3Dpoint.y, cog_3Dpoint.z)
+
+    #angles en radians (unités internes de Fusion)
+    heels = nautic_core.heel_grid(heel_max.value, heel_step.value)
+
+    #Pour chaque gîte, enfoncement et assiette sont recalculés (Newton sur le maillage).
+    #Les gîtes sont réparties sur plusieurs processus qui partagent le même maillage.
+    with futil.timed('GZ_curve/tessellate'):
+        hull_mesh = futil.hull_mesh(hull_body)
+    target_volume = weight_input.value/(config.WATER_DENSITY/1000) #en cm3
+    tolerance = tolerance_input.value
+    cache = futil.result_cache()
+    #Calcul en arrière-plan: la barre de progression avance à chaque gîte résolue,
+    #Annuler arrête le calcul (les gîtes pas encore commencées sont abandonnées).
+    def compute(job:futil.Job):
+        def progress(done, total):
+            job.report(done, total)
+        def solve():
+            try:
+                return nautic_core.gz_curve(hull_mesh, target_volume, cog, heels, tolerance,
+                                            config.PARALLEL_WORKERS, futil.python_executable(), progress)
+            except (OSError, RuntimeError) as error:
+                #pas de processus possibles (interpréteur introuvable, pool cassé): calcul en série
+                futil.log('%s calcul en série: %s', args=(CMD_NAME, str(error)))
+                return nautic_core.gz_curve(hull_mesh, target_volume, cog, heels, tolerance, workers=1,
+                                            progress=progress)
+        with futil.timed('GZ_curve/solve'):
+            return cache.cached('gz_curve', hull_mesh, solve, volume=target_volume, center_of_gravity=cog,
+                                heels=heels, tolerance=tolerance)
+    futil.run_job(CMD_NAME, compute, show_results, total=len(heels), message="Gîtes calculées")
+
+
+#Tracé et résumé de la courbe, sur le fil de Fusion une fois le calcul terminé.
+def show_results(curve:nautic_core.RightingArmCurve):
+    with futil.timed('GZ_curve/create entities'), futil.timeline_results("GZ Curve"):
+        courbe_gz(curve)
+
+    #Résumé de la courbe, limitée aux gîtes sans envahissement
+    msg="Courbe GZ: "+str(len(curve.heels))+" gîtes calculées."
+    if curve.max_gz:
+        heel, gz = curve.max_gz
+        msg+="<br>GZ maxi = "+str(round(gz,2))+" cm à "+str(round(math.degrees(heel),1))+" °"
+    if curve.flooding_angle is not None:
+        msg+="<br>Envahissement à partir de "+str(round(math.degrees(curve.flooding_angle),1))+" °"
+    if curve.vanishing_angle is not None:
+        msg+="<br>Angle de chavirement ~ "+str(round(math.degrees(curve.vanishing_angle),1))+" °"
+    if not curve.converged.all():
+        msg+="<br>Attention: "+str(int((~curve.converged).sum()))+" gîte(s) sans convergence."
+    ui.messageBox(msg)
+
+
+# This event handler is called when the command needs to compute a new preview in the graphics window.
+def command_preview(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Preview Event', args=(CMD_NAME,))
+    inputs = args.command.commandInputs
+
+
+# This event handler is called when the user changes anything in the command dialog
+# allowing you to modify values of other inputs based on that change.
+def command_input_changed(args: adsk.core.InputChangedEventArgs):
+    changed_input = args.input
+    inputs = args.inputs
+
+    # General logging for debug.
+    futil.log('%s Input Changed Event fired from a change to %s', args=(CMD_NAME, changed_input.id))
+
+
+# This event handler is called when the user interacts with any of the inputs in the dialog
+# which allows you to verify that all of the inputs are valid and enables the OK button.
+def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
+    # General logging for debug.
+    futil.log('%s Validate Input Event', args=(CMD_NAME,))
+
+    inputs = args.inputs
+    weightInput = inputs.itemById('weight_input')
+    heelMax = inputs.itemById('heel_max')
+    heelStep = inputs.itemById('heel_step')
+    toleranceInput = inputs.itemById('tolerance_input')
+    if (weightInput.value > 0 and toleranceInput.value > 0 and heelStep.value > 0
+            and 0 < heelMax.value <= math.pi + 1e-9):
+        args.areInputsValid = True
+    else:
+        args.areInputsValid = False
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Destroy Event', args=(CMD_NAME,))
+    futil.log('%s cache: %s', args=(CMD_NAME, futil.result_cache().stats()))
+
+    global local_handlers
+    local_handlers = []
+
+
+#Trace GZ en fonction de la gîte dans une esquisse: 1 cm de dessin par degré, GZ à l'échelle 10.
+def courbe_gz(curve:nautic_core.RightingArmCurve):
+    rootComp = futil.root_component()
+    sketch = rootComp.sketches.add(rootComp.xYConstructionPlane)
+    sketch.name = "GZ Curve"
+    points = adsk.core.ObjectCollection.create()
+    for heel, gz in zip(curve.heels, curve.gz):
+        points.add(adsk.core.Point3D.create(math.degrees(heel), 10*float(gz), 0))
+    #axe GZ = 0, de 0 à la dernière gîte
+    sketch.sketchCurves.sketchLines.addByTwoPoints(adsk.core.Point3D.create(0, 0, 0),
+                                                   adsk.core.Point3D.create(math.degrees(curve.heels[-1]), 0, 0))
+    sketch.sketchCurves.sketchFittedSplines.add(points)
+
@@ -1,104 +1,50 @@
 import adsk.core
-import os
+import time
 from ...lib import fusion360utils as futil
+from ...lib import nautic_core
 from ... import config
-import csv
+from . import CMD_NAME
 
 
 app = adsk.core.Application.get()
 ui = app.userInterface
-design = app.activeProduct
-rootComp = design.rootComponent
-sketches = rootComp.sketches;
-
-# Set styles of file dialog.
-fileDlg = ui.createFileDialog()
-fileDlg.isMultiSelectEnabled = False
-fileDlg.title = 'Select your points file'
-fileDlg.filter = '*.csv'
- 
-
-# TODO *** Specify the command identity information. ***
-CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_Import_Points'
-CMD_NAME = 'Importer des points'
-CMD_Description = 'Importe un tableau de cotes réunis dans une liste de points au format CSV'
-
-# Specify that the command will be promoted to the panel.
-IS_PROMOTED = False
-
-# TODO *** Define the location where the command button will be created. ***
-# This is done by specifying the workspace, the tab, and the panel, and the 
-# command it will be inserted beside. Not providing the command to position it
-# will insert it at the end.
-WORKSPACE_ID = 'FusionSolidEnvironment' # => Espace de travail CONCEPTION
-PANEL_ID = 'NauticTools' #'SolidScriptsAddinsPanel' # => toolbarPanel
-COMMAND_BESIDE_ID = 'ScriptsManagerCommand'
-
-# Resource location for command icons, here we assume a sub folder in this directory named "resources".
-ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
-
-# Executed when add-in is run.
-def start():
-    # Create a command Definition.
-    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
-
-    # Define an event handler for the command created event. It will be called when the button is clicked.
-    futil.add_handler(cmd_def.commandCreated, command_created)
-
-    # ******** Add a button into the UI so the user can run the command. ********
-    # Get the target workspace the button will be created in.
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    # Get the SOLID tab.
-    solidTab = workspace.toolbarTabs.itemById('SolidTab')
-    # Get the panel the button will be created in.
-    panel = solidTab.toolbarPanels.itemById(PANEL_ID)
-    if not panel:
-        panel = solidTab.toolbarPanels.add(PANEL_ID, 'Nautic Tools', 'SelectPanel', False)
-    # Create the button command control in the UI after the specified existing command.
-    control = panel.controls.addCommand(cmd_def)#, COMMAND_BESIDE_ID, False)
-
-    # Specify if the command is promoted to the main toolbar. 
-    control.isPromoted = IS_PROMOTED
-
-
-# Executed when add-in is stopped.
-def stop():
-    # Get the various UI elements for this command
-    workspace = ui.workspaces.itemById(WORKSPACE_ID)
-    panel = workspace.toolbarPanels.itemById(PANEL_ID)
-    command_control = panel.controls.itemById(CMD_ID)
-    command_definition = ui.commandDefinitions.itemById(CMD_ID)
-
-    # Delete the button command control
-    if command_control:
-        command_control.deleteMe()
-
-    # Delete the command definition
-    if command_definition:
-        command_definition.deleteMe()
+#Règles d'intégration le long de X proposées pour les hydrostatiques du tableau de cotes
+INTEGRATION_RULES = {'Simpson': 'simpson', 'Trapèzes': 'trapezoid'}
 
 
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
 def command_created(args: adsk.core.CommandCreatedEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Created Event')
+    futil.log('%s Command Created Event', args=(CMD_NAME,))
 
     # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
     inputs = args.command.commandInputs
 
-    # TODO Define the dialog for your command by adding different inputs to the command.
-    #No command inputs created for this function, go directly to command_execute function.
-    
+    #Toutes les stations dans une seule esquisse (points en 3D), ou une esquisse par station
+    inputs.addBoolValueInput('single_sketch', 'Single 3D sketch', True, '', False)
+    #Nombre de stations créées entre deux rafraîchissements de l'interface
+    inputs.addIntegerSpinnerCommandInput('batch_size', 'Stations per batch', 1, 1000, 1, 20)
+
+    #Hydrostatiques calculées directement sur le tableau de cotes, sans créer d'esquisse
+    inputs.addBoolValueInput('hydro_mode', 'Hydrostatics only', True, '', False)
+    draft_input = inputs.addValueInput('draft_input', 'Draft: ', 'cm', adsk.core.ValueInput.createByString('50'))
+    draft_input.isVisible = False
+    half_input = inputs.addBoolValueInput('half_breadths', 'Half-breadths (one side)', True, '', True)
+    half_input.isVisible = False
+    rule_input = inputs.addDropDownCommandInput('integration_rule', 'Integration rule', adsk.core.DropDownStyles.TextListDropDownStyle)
+    for i, name in enumerate(INTEGRATION_RULES):
+        rule_input.listItems.add(name, i == 0)
+    rule_input.isVisible = False
 
     # TODO Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
-    # futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
     # futil.add_handler(args.command.executePreview, command_preview, local_handlers=local_handlers)
     # futil.add_handler(args.command.validateInputs, command_validate_input, local_handlers=local_handlers)
     # futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
@@ -108,12 +54,18 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
 # is immediately called after the created event not command inputs were created for the dialog.
 def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Execute Event')
+    futil.log('%s Command Execute Event', args=(CMD_NAME,))
 
     # TODO ******************************** Your code here ********************************
     # Get a reference to your command's inputs.
     inputs = args.command.commandInputs
 
+    # Set styles of file dialog.
+    fileDlg = ui.createFileDialog()
+    fileDlg.isMultiSelectEnabled = False
+    fileDlg.title = 'Select your points file'
+    fileDlg.filter = '*.csv'
+
     # Show file open dialog
     dlgResult = fileDlg.showOpen()
     if dlgResult == adsk.core.DialogResults.DialogOK:
@@ -122,69 +74,135 @@ def command_execute(args: adsk.core.CommandEventArgs):
     else:
         return       
     
-    #Processing the selected file
-    listing=[]
-    with open(fileDlg.filename, 'r',encoding="utf-8") as f:
-        f.readline() #skip first line containing headers
-        curr_line=1 #tracking the file current line number
-        while True:
-            text = f.readline()
-            curr_line+=1
-            if text:
-                if text.find("\n")>=0:
-                    text = text.replace('\n','')
-                try:
-                    listing.append([float(text.split(';')[0]),float(text.split(';')[1]),float(text.split(';')[2])])
-                except:
-                    msg='Error at line '+str(curr_line)+':<br>'+text+'<br>'
-                    msg+='Make sure coordinates have 0.00 format separated by ";" character.'
-                    ui.messageBox(msg)
-                    return
-            else:
-                break
-    #listing is a list containing the 3 coordinates of each point.
-    #Now, lets create group of points per X coordinate
-    grouped_points={}
-    for point in listing:
-        x_coord=point[0]
-        if x_coord in grouped_points.keys():
-            grouped_points[x_coord].append(point)
+    single_sketch: adsk.core.BoolValueCommandInput = inputs.itemById('single_sketch')
+    batch_size: adsk.core.IntegerSpinnerCommandInput = inputs.itemById('batch_size')
+
+    #Processing the selected file: lecture par blocs, les lignes fautives sont signalées
+    #sans arrêter l'import. Séparateurs ";", "," ou tabulation, virgule décimale acceptée.
+    start_time = time.perf_counter()
+    table = nautic_core.read_offsets(fileDlg.filename)
+    timings = [('Read file', time.perf_counter()-start_time)]
+    if table.nb_errors:
+        msg=str(table.nb_errors)+' line(s) could not be read and were skipped:<br>'
+        for error in table.errors[:10]:
+            msg+='Line '+str(error.line)+': '+error.text+' ('+error.message+')<br>'
+        if table.nb_errors > 10:
+            msg+='...<br>'
+        msg+='Make sure each line holds the 3 coordinates x, y, z separated by ";".'
+        ui.messageBox(msg)
+    if len(table.points) == 0:
+        return
+
+    hydro_mode: adsk.core.BoolValueCommandInput = inputs.itemById('hydro_mode')
+    if hydro_mode.value:
+        draft_input: adsk.core.ValueCommandInput = inputs.itemById('draft_input')
+        half_breadths: adsk.core.BoolValueCommandInput = inputs.itemById('half_breadths')
+        rule_input: adsk.core.DropDownCommandInput = inputs.itemById('integration_rule')
+        display_offset_hydrostatics(table, draft_input.value, half_breadths.value,
+                                    INTEGRATION_RULES[rule_input.selectedItem.name])
+        return
+
+    #Création des esquisses: calcul des esquisses différé pendant l'ajout des points,
+    #un seul Point3D réutilisé, et stations traitées par paquets.
+    #Plans et esquisses regroupés dans la timeline; un import interrompu par une erreur ne laisse rien.
+    with futil.timeline_results("Offset import"):
+        if single_sketch.value:
+            timings += import_single_sketch(table)
         else:
-            grouped_points[x_coord]=[point]
-    #Now, lets create a list of groups with X in ascending order:
-    groups = list(grouped_points.keys())
-    groups.sort()
-
-    #Now, let's create a sketch for each group of points
-    for x in groups:
-        # Create a new sketch on the offsetted yz plane.
-        # Get construction planes
-        planes = rootComp.constructionPlanes
-        # Create construction plane input
-        planeInput = planes.createInput()
-        # Add construction plane by offset
-        offsetValue = adsk.core.ValueInput.createByReal(x)
-        planeInput.setByOffset(rootComp.yZConstructionPlane, offsetValue)
-        planeOne = planes.add(planeInput)
-        planeOne.name = "X="+str(x)
-        sketch = sketches.add(planeOne)
-        sketch.name = "Points at X="+str(x)
-        # Get sketch points
-        sketchPoints = sketch.sketchPoints
-        # Create sketch point
-        for coord in grouped_points[x]:#go through each point of the group at x.
-            #Attention: coordinates of point in the local coordinate system of the sketch
-            point = adsk.core.Point3D.create(-coord[2], coord[1],0) #Z=0 to create in the plane.
-            # ui.messageBox(str(coord[0])+" / "+str(coord[1])+" / "+str(coord[2]))
-            somepoint = sketchPoints.add(point)
-    #Conclusion message:
-    ui.messageBox('Import successful!<br>'+str(len(listing))+' points imported in total.')
+            timings += import_station_sketches(table, batch_size.value)
+
+    msg='Import successful!<br>'+str(len(table.points))+' points imported in total'
+    msg+=' ('+str(len(table.stations))+' stations).'
+    for stage, duration in timings:
+        futil.log('%s %s: %.2f s', args=(CMD_NAME, stage, duration))
+        msg+='<br>'+stage+': '+str(round(duration,2))+' s'
+    ui.messageBox(msg)
+
+
+#Premiers résultats hydrostatiques, intégrés sur les sections du tableau de cotes
+#(les points de chaque station doivent se suivre le long du contour).
+def display_offset_hydrostatics(table:nautic_core.OffsetTable, draft:float, half_breadths:bool, rule:str):
+    z_keel = float(table.points[:, 2].min())
+    hydro = nautic_core.offset_hydrostatics(table, [z_keel+draft], half_breadths,
+                                            density=config.WATER_DENSITY/1000, rule=rule)
+    if hydro.volume[0] <= 0:
+        ui.messageBox("Aucune section immergée à ce tirant d'eau.")
+        return
+    areas = hydro.section_areas[0]
+    i_max = int(areas.argmax())
+    msg="Hydrostatiques du tableau de cotes ("+str(len(table.stations))+" stations):"
+    msg+="<br>Tirant d'eau = "+str(round(draft,1))+" cm"
+    msg+="<br>Deplacement = "+str(round(float(hydro.displacement[0]),1))+" kg"
+    msg+="<br>Volume = "+str(round(float(hydro.volume[0])/1e6,4))+" m3"
+    msg+="<br>LCB = "+str(round(float(hydro.lcb[0]),1))+" cm"
+    msg+="<br>KB = "+str(round(float(hydro.kb[0]),1))+" cm"
+    msg+="<br>Surface de flottaison = "+str(round(float(hydro.waterplane_area[0])/1e4,3))+" m2"
+    msg+="<br>LCF = "+str(round(float(hydro.lcf[0]),1))+" cm"
+    msg+="<br>Section max = "+str(round(float(areas[i_max]),1))+" cm2 @ x = "+str(round(float(hydro.stations[i_max]),1))+" cm"
+    ui.messageBox(msg)
+    for x, area in zip(hydro.stations.tolist(), areas.tolist()):
+        futil.log('%s section X=%s: %.2f cm2', args=(CMD_NAME, x, area))
+
+
+#Une esquisse par station, sur un plan décalé du plan YZ.
+def import_station_sketches(table:nautic_core.OffsetTable, batch_size:int):
+    rootComp = futil.root_component()
+    sketches = rootComp.sketches
+    planes = rootComp.constructionPlanes
+    point = adsk.core.Point3D.create(0, 0, 0)
+    planes_time = points_time = 0.0
+    for batch in range(0, len(table.stations), batch_size):
+        stations = range(batch, min(batch+batch_size, len(table.stations)))
+        t = time.perf_counter()
+        batch_sketches = []
+        for i in stations:
+            x = float(table.stations[i])
+            planeInput = planes.createInput()
+            planeInput.setByOffset(rootComp.yZConstructionPlane, adsk.core.ValueInput.createByReal(x))
+            planeOne = planes.add(planeInput)
+            planeOne.name = "X="+str(x)
+            sketch = sketches.add(planeOne)
+            sketch.name = "Points at X="+str(x)
+            batch_sketches.append(sketch)
+        planes_time += time.perf_counter()-t
+
+        t = time.perf_counter()
+        for i, sketch in zip(stations, batch_sketches):
+            sketch.isComputeDeferred = True
+            sketchPoints = sketch.sketchPoints
+            for y, z in table.station(i)[:, 1:].tolist():
+                #Attention: coordinates of point in the local coordinate system of the sketch
+                point.x, point.y = -z, y #Z=0 to create in the plane.
+                sketchPoints.add(point)
+            sketch.isComputeDeferred = False
+        points_time += time.perf_counter()-t
+        adsk.doEvents() #l'interface reste réactive entre deux paquets
+    return [('Planes and sketches', planes_time), ('Sketch points', points_time)]
+
+
+#Tous les points dans une même esquisse, sur le plan XY: coordonnées du modèle.
+def import_single_sketch(table:nautic_core.OffsetTable):
+    t = time.perf_counter()
+    rootComp = futil.root_component()
+    sketch = rootComp.sketches.add(rootComp.xYConstructionPlane)
+    sketch.name = "Offset points"
+    sketch_time = time.perf_counter()-t
+
+    t = time.perf_counter()
+    sketch.isComputeDeferred = True
+    sketchPoints = sketch.sketchPoints
+    point = adsk.core.Point3D.create(0, 0, 0)
+    for x, y, z in table.points.tolist():
+        point.x, point.y, point.z = x, y, z
+        sketchPoints.add(point)
+    sketch.isComputeDeferred = False
+    return [('Sketch', sketch_time), ('Sketch points', time.perf_counter()-t)]
 
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Preview Event')
+    futil.log('%s Command Preview Event', args=(CMD_NAME,))
     inputs = args.command.commandInputs
 
 
@@ -195,14 +213,21 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     inputs = args.inputs
 
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {changed_input.id}')
+    futil.log('%s Input Changed Event fired from a change to %s', args=(CMD_NAME, changed_input.id))
+
+    if changed_input.id == 'hydro_mode':
+        inputs.itemById('draft_input').isVisible = changed_input.value
+        inputs.itemById('half_breadths').isVisible = changed_input.value
+        inputs.itemById('integration_rule').isVisible = changed_input.value
+        inputs.itemById('single_sketch').isVisible = not changed_input.value
+        inputs.itemById('batch_size').isVisible = not changed_input.value
 
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
 def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Validate Input Event')
+    futil.log('%s Validate Input Event', args=(CMD_NAME,))
 
     inputs = args.inputs
     
@@ -217,7 +242,7 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
-    futil.log(f'{CMD_NAME} Command Destroy Event')
+    futil.log('%s Command Destroy Event', args=(CMD_NAME,))
 
     global local_handlers
     local_handlers = []
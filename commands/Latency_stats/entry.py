@@ -0,0 +1,93 @@
+import adsk.core
+from ...lib import fusion360utils as futil
+from ... import config
+from . import CMD_NAME
+
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+#Actions proposées par la commande
+ACTION_DUMP = 'Afficher'
+ACTION_CLEAR = 'Effacer'
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# This defines the contents of the command dialog and connects to the command related events.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Created Event', args=(CMD_NAME,))
+
+    # https://help.autodesk.com/view/fusion360/ENU/?contextId=CommandInputs
+    inputs = args.command.commandInputs
+
+    #Afficher les statistiques (et les écrire dans la fenêtre Text Command), ou les remettre à zéro
+    action_input = inputs.addDropDownCommandInput('action', 'Action', adsk.core.DropDownStyles.TextListDropDownStyle)
+    action_input.listItems.add(ACTION_DUMP, True)
+    action_input.listItems.add(ACTION_CLEAR, False)
+    inputs.addBoolValueInput('clear_after', 'Clear after showing', True, '', False)
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# This event handler is called when the user clicks the OK button in the command dialog or 
+# is immediately called after the created event not command inputs were created for the dialog.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Execute Event', args=(CMD_NAME,))
+
+    inputs = args.command.commandInputs
+    action_input: adsk.core.DropDownCommandInput = inputs.itemById('action')
+    clear_after: adsk.core.BoolValueCommandInput = inputs.itemById('clear_after')
+
+    if action_input.selectedItem.name == ACTION_CLEAR:
+        futil.clear_latency()
+        ui.messageBox("Statistiques de temps effacées.")
+        return
+
+    if not config.LATENCY_STATS:
+        ui.messageBox("Les durées ne sont pas mesurées: mettre LATENCY_STATS à True dans config.py.")
+        return
+    summary = futil.latency_summary()
+    if not summary:
+        ui.messageBox("Aucune durée mesurée pour l'instant.")
+        return
+    #Tableau complet dans la fenêtre Text Command, les plus gros postes dans la boîte de dialogue
+    futil.log('%s (ms)\n%s', force_console=True, args=(CMD_NAME, futil.latency_report()))
+    msg="Durées en ms (médiane / 90% / maxi, nombre d'appels):"
+    for name, stats in list(summary.items())[:15]:
+        msg+="<br>"+name+": "+str(round(stats['p50']*1000,1))+" / "+str(round(stats['p90']*1000,1))
+        msg+=" / "+str(round(stats['max']*1000,1))+" ("+str(stats['count'])+")"
+    if len(summary) > 15:
+        msg+="<br>... tableau complet dans la fenêtre Text Command."
+    ui.messageBox(msg)
+    if clear_after.value:
+        futil.clear_latency()
+
+
+# This event handler is called when the user changes anything in the command dialog
+# allowing you to modify values of other inputs based on that change.
+def command_input_changed(args: adsk.core.InputChangedEventArgs):
+    changed_input = args.input
+    inputs = args.inputs
+
+    # General logging for debug.
+    futil.log('%s Input Changed Event fired from a change to %s', args=(CMD_NAME, changed_input.id))
+
+    if changed_input.id == 'action':
+        inputs.itemById('clear_after').isVisible = changed_input.selectedItem.name == ACTION_DUMP
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log('%s Command Destroy Event', args=(CMD_NAME,))
+
+    global local_handlers
+    local_handlers = []
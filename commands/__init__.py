@@ -1,32 +1,38 @@
 # Here you define the commands that will be added to your add-in.
 
-# TODO Import the modules corresponding to the commands you created.
+# TODO Import the packages corresponding to the commands you created.
 # If you want to add an additional command, duplicate one of the existing directories and import it here.
-# You need to use aliases (import "entry" as "my_module") assuming you have the default module named "entry".
-from .Devis_Poids import entry as Devis_Poids
-from .Import_Points import entry as Import_Points
-from .Disp_calc import entry as Disp_calc
-from .Equilibrium import entry as Equilibrium
+# Only the package (command definition) is imported at startup: its "entry" module,
+# and NumPy with it, is loaded by LazyCommand the first time the command is run.
+from .lazy_command import LazyCommand
+from . import Devis_Poids
+from . import Import_Points
+from . import Disp_calc
+from . import Equilibrium
+from . import GZ_curve
+from . import Cross_curves
+from . import Latency_stats
 
-# TODO add your imported modules to this list.
+# TODO add your command packages to this list.
 # Fusion will automatically call the start() and stop() functions.
 commands = [
-    Devis_Poids,
-    Import_Points,
-    Disp_calc,
-    Equilibrium
+    LazyCommand(Devis_Poids),
+    LazyCommand(Import_Points),
+    LazyCommand(Disp_calc),
+    LazyCommand(Equilibrium),
+    LazyCommand(GZ_curve),
+    LazyCommand(Cross_curves),
+    LazyCommand(Latency_stats)
 ]
 
 
-# Assumes you defined a "start" function in each of your modules.
 # The start function will be run when the add-in is started.
 def start():
     for command in commands:
         command.start()
 
 
-# Assumes you defined a "stop" function in each of your modules.
 # The stop function will be run when the add-in is stopped.
 def stop():
     for command in commands:
-        command.stop()
\ No newline at end of file
+        command.stop()
@@ -0,0 +1,82 @@
+# Bouton de commande dont le module entry n'est importé qu'au premier clic.
+# Au démarrage de l'add-in, seule la définition (identité, emplacement, icônes)
+# est lue: NumPy, nautic_core et le code de la commande restent non chargés.
+import importlib
+import time
+import adsk.core
+from ..lib import fusion360utils as futil
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+class LazyCommand:
+    """Registers the button of a command and loads its entry module on first use.
+
+    Arguments:
+    definition -- The command package, defining CMD_ID, CMD_NAME, CMD_Description,
+                  IS_PROMOTED, WORKSPACE_ID, PANEL_ID, COMMAND_BESIDE_ID and ICON_FOLDER.
+                  Its entry module must define command_created(args), and may define
+                  stop() to release what the command holds when the add-in stops.
+    """
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.entry = None
+
+    def start(self):
+        definition = self.definition
+        start_time = time.perf_counter()
+        # Create a command Definition.
+        cmd_def = ui.commandDefinitions.addButtonDefinition(definition.CMD_ID, definition.CMD_NAME,
+                                                            definition.CMD_Description, definition.ICON_FOLDER)
+
+        # Define an event handler for the command created event. It will be called when the button is clicked.
+        short_name = definition.__name__.rsplit('.', 1)[-1]
+        futil.add_handler(cmd_def.commandCreated, self.command_created, name=f'{short_name}.command_created')
+
+        # ******** Add a button into the UI so the user can run the command. ********
+        # Get the target workspace the button will be created in.
+        workspace = ui.workspaces.itemById(definition.WORKSPACE_ID)
+        # Get the SOLID tab.
+        solidTab = workspace.toolbarTabs.itemById('SolidTab')
+        # Get the panel the button will be created in.
+        panel = solidTab.toolbarPanels.itemById(definition.PANEL_ID)
+        if not panel:
+            panel = solidTab.toolbarPanels.add(definition.PANEL_ID, 'Nautic Tools', 'SelectPanel', False)
+        # Create the button command control in the UI after the specified existing command.
+        if definition.COMMAND_BESIDE_ID:
+            control = panel.controls.addCommand(cmd_def, definition.COMMAND_BESIDE_ID, False)
+        else:
+            control = panel.controls.addCommand(cmd_def)
+
+        # Specify if the command is promoted to the main toolbar.
+        control.isPromoted = definition.IS_PROMOTED
+        futil.log('%s registered in %.1f ms', args=(definition.CMD_NAME, (time.perf_counter()-start_time)*1000))
+
+    def command_created(self, args: adsk.core.CommandCreatedEventArgs):
+        if self.entry is None:
+            start_time = time.perf_counter()
+            self.entry = importlib.import_module('.entry', self.definition.__name__)
+            futil.log('%s loaded in %.1f ms', args=(self.definition.CMD_NAME, (time.perf_counter()-start_time)*1000))
+        self.entry.command_created(args)
+
+    def stop(self):
+        definition = self.definition
+        # Get the various UI elements for this command
+        workspace = ui.workspaces.itemById(definition.WORKSPACE_ID)
+        panel = workspace.toolbarPanels.itemById(definition.PANEL_ID)
+        command_control = panel.controls.itemById(definition.CMD_ID) if panel else None
+        command_definition = ui.commandDefinitions.itemById(definition.CMD_ID)
+
+        # Delete the button command control
+        if command_control:
+            command_control.deleteMe()
+
+        # Delete the command definition
+        if command_definition:
+            command_definition.deleteMe()
+
+        # Libération de ce que la commande garde entre deux lancements (gestionnaires, arbre des poids...)
+        if self.entry is not None and hasattr(self.entry, 'stop'):
+            self.entry.stop()
@@ -17,6 +17,30 @@ DEBUG = True
 ADDIN_NAME = os.path.basename(os.path.dirname(__file__))
 COMPANY_NAME = 'ACME'
 WATER_DENSITY = 1.025 #densité eau de mer
+MESH_TOLERANCE = 0.01 #écart maxi en cm entre le maillage de la carène et la surface
+PARALLEL_WORKERS = None #nombre de processus pour les calculs répartis (None: nombre de processeurs, 1: pas de processus)
+PYTHON_EXECUTABLE = None #interpréteur Python des processus (None: celui fourni avec Fusion 360)
+CACHE_FOLDER = os.path.join(os.path.dirname(__file__), 'cache') #résultats de calcul conservés entre les sessions
+CACHE_MAX_BYTES = 64*1024*1024 #taille maxi du cache sur disque
+LATENCY_STATS = True #mesure la durée de chaque gestionnaire d'événement et phase de calcul (commande Statistiques de temps)
+LATENCY_BUFFER_SIZE = 256 #nombre de durées conservées par gestionnaire ou phase, pour les percentiles
+LOG_LEVEL = 'info' #niveau mini des messages écrits: 'error', 'warning' ou 'info'
+LOG_FILE = os.path.join(os.path.dirname(__file__), 'logs', f'{ADDIN_NAME}.log') #journal tournant de l'add-in
+LOG_MAX_BYTES = 1024*1024 #taille du journal avant rotation
+LOG_BACKUP_COUNT = 3 #nombre d'anciens journaux conservés
+
+# Devis de poids: groupes de poids (codes SWBS ou codes maison). L'attribut
+# NauticTools/weight_group d'un corps prime; sinon la première règle (expression
+# régulière sur le nom du corps) qui correspond donne le groupe.
+WEIGHT_GROUP_RULES = [
+    (r'coque|hull|bordé|varangue|membrure|cloison|pont|deck', '100'),
+    (r'moteur|engine|hélice|propeller|arbre|shaft', '200'),
+    (r'batterie|battery|câble|cable|tableau élec', '300'),
+    (r'réservoir|tank|pompe|pump|vanne|valve', '500'),
+    (r'mobilier|furniture|couchette|banquette|aménagement', '600'),
+]
+DECK_HEIGHTS = [] #hauteurs (cm) des ponts, croissantes; l'attribut NauticTools/deck prime
+ZONE_LIMITS = [] #abscisses (cm) des limites des zones longitudinales (cloisons), croissantes
 
 # Palettes
 sample_palette_id = f'{COMPANY_NAME}_{ADDIN_NAME}_palette_id'
\ No newline at end of file
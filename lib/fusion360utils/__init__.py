@@ -1,2 +1,6 @@
 from .general_utils import *
 from .event_utils import *
+from .mesh_utils import *
+from .timing_utils import *
+from .timeline_utils import *
+from .job_utils import *
@@ -10,10 +10,12 @@
 #  UNINTERRUPTED OR ERROR FREE.
 
 import sys
+import time
 from typing import Callable
 
 import adsk.core
-from .general_utils import handle_error
+from .general_utils import handle_error, flush_console
+from . import timing_utils
 
 
 # Global Variable to hold Event Handlers
@@ -73,6 +75,9 @@ def _create_handler(
 
 
 def _define_handler(handler_type, callback, name: str = None):
+    # Statistiques de temps sous le nom de la commande et de la fonction appelée
+    # (Disp_calc.command_execute), plus parlant que le type du gestionnaire.
+    label = name or _callback_name(callback)
     name = name or handler_type.__name__
 
     class Handler(handler_type):
@@ -80,9 +85,21 @@ def _define_handler(handler_type, callback, name: str = None):
             super().__init__()
 
         def notify(self, args):
+            start = time.perf_counter() if timing_utils.LATENCY_STATS else None
             try:
                 callback(args)
             except:
                 handle_error(name)
+            finally:
+                if start is not None:
+                    timing_utils.record_latency(label, time.perf_counter() - start)
+                # messages du gestionnaire vers la fenêtre Text Command, en une fois
+                flush_console()
 
     return Handler
+
+
+def _callback_name(callback: Callable):
+    parts = [part for part in getattr(callback, '__module__', '').split('.') if part != 'entry']
+    function = getattr(callback, '__name__', type(callback).__name__)
+    return f'{parts[-1]}.{function}' if parts else function
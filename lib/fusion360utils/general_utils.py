@@ -10,8 +10,12 @@
 #  UNINTERRUPTED OR ERROR FREE.
 
 import os
+import queue
+import threading
+import time
 import traceback
 import adsk.core
+import adsk.fusion
 
 app = adsk.core.Application.get()
 ui = app.userInterface
@@ -23,27 +27,172 @@ try:
 except:
     DEBUG = False
 
+# Attempt to read the log settings from parent config.
+try:
+    LOG_LEVEL = config.LOG_LEVEL
+    LOG_FILE = config.LOG_FILE
+    LOG_MAX_BYTES = config.LOG_MAX_BYTES
+    LOG_BACKUP_COUNT = config.LOG_BACKUP_COUNT
+except:
+    LOG_LEVEL = 'info'
+    LOG_FILE = None
+    LOG_MAX_BYTES = 1024 * 1024
+    LOG_BACKUP_COUNT = 3
+
+# Rang de chaque niveau: un message est gardé si son rang ne dépasse pas celui de LOG_LEVEL.
+_LEVEL_RANKS = {
+    adsk.core.LogLevels.ErrorLogLevel: 0,
+    adsk.core.LogLevels.WarningLogLevel: 1,
+    adsk.core.LogLevels.InfoLogLevel: 2,
+}
+_LEVEL_NAMES = {0: 'ERROR', 1: 'WARNING', 2: 'INFO'}
+_threshold = {'error': 0, 'warning': 1, 'info': 2}.get(LOG_LEVEL, 2)
 
-def log(message: str, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False):
+# Messages en attente: écrits par paquets dans le fichier (et la sortie standard)
+# par un fil dédié; ceux de la fenêtre Text Command le sont par flush_console,
+# sur le fil de Fusion, à la fin de chaque gestionnaire d'événement. Les deux
+# files peuvent être remplies depuis n'importe quel fil (travaux en arrière-plan).
+_queue = queue.SimpleQueue()
+_console = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+_STOP = object()
+
+
+def log(message: str, level: adsk.core.LogLevels = adsk.core.LogLevels.InfoLogLevel, force_console: bool = False,
+        *, args: tuple = ()):
     """Utility function to easily handle logging in your app.
 
+    The level is checked first and nothing else is done for a filtered
+    message. The message is formatted, written to the log file and printed
+    later, in batches, by a background thread; errors also go straight to the
+    Fusion log file.
+
     Arguments:
-    message -- The message to log.
+    message -- The message to log. Either a string, formatted with args
+               (message % args) only when written, or a function without
+               arguments returning the string, called only if the message
+               passes the level filter.
     level -- The logging severity level.
     force_console -- Forces the message to be written to the Text Command window. 
+    args -- Values for the %-formatting of message. They must be plain Python
+            values, as the formatting happens outside Fusion's thread.
     """    
-    # Always print to console, only seen through IDE.
-    print(message)  
+    rank = _LEVEL_RANKS.get(level, 2)
+    if rank > _threshold and not force_console:
+        return
+    if callable(message):
+        message = message()
+    record = (time.time(), rank, level, message, args)
+    _start_writer()
+    _queue.put(record)
 
     # Log all errors to Fusion log file.
     if level == adsk.core.LogLevels.ErrorLogLevel:
         log_type = adsk.core.LogTypes.FileLogType
-        app.log(message, level, log_type)
+        app.log(_format(message, args), level, log_type)
 
     # If config.DEBUG is True write all log messages to the console.
     if DEBUG or force_console:
-        log_type = adsk.core.LogTypes.ConsoleLogType
-        app.log(message, level, log_type)
+        _console.put(record)
+
+
+def flush_console():
+    """Writes the pending messages to the Text Command window, one call per run of same-level messages.
+
+    Must be called from Fusion's thread: event handlers created with
+    add_handler call it when they return, so the messages of background jobs
+    appear at the next progress event of the job at the latest.
+    """
+    records = []
+    while True:
+        try:
+            records.append(_console.get_nowait())
+        except queue.Empty:
+            break
+    log_type = adsk.core.LogTypes.ConsoleLogType
+    start = 0
+    for end in range(1, len(records) + 1):
+        if end == len(records) or records[end][2] != records[start][2]:
+            app.log('\n'.join(_format(record[3], record[4]) for record in records[start:end]),
+                    records[start][2], log_type)
+            start = end
+
+
+def close_log(timeout: float = 2.0):
+    """Writes every pending message and stops the log thread. Called when the add-in stops."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        _queue.put(_STOP)
+        writer.join(timeout)
+    flush_console()
+
+
+def _start_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name='NauticTools log', daemon=True)
+                _writer.start()
+
+
+def _write_loop():
+    # Attend un message, puis prend tous ceux déjà en file: une écriture par paquet.
+    while True:
+        records = [_queue.get()]
+        while len(records) < 1000:
+            try:
+                records.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        lines = []
+        for record in records:
+            if record is _STOP:
+                continue
+            stamp, rank, _, message, args = record
+            lines.append(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stamp))
+                         + f'.{int(stamp * 1000) % 1000:03d} {_LEVEL_NAMES[rank]:<7} {_format(message, args)}')
+        if lines:
+            text = '\n'.join(lines)
+            # Always print to console, only seen through IDE.
+            print(text)
+            _write_file(text + '\n')
+        if _STOP in records:
+            return
+
+
+def _format(message, args):
+    if not args:
+        return str(message)
+    try:
+        return str(message) % args
+    except (TypeError, ValueError):
+        return f'{message} {args!r}'
+
+
+def _write_file(text: str):
+    # Fichier tournant: LOG_FILE, LOG_FILE.1 ... LOG_FILE.<LOG_BACKUP_COUNT>
+    if not LOG_FILE:
+        return
+    try:
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+        with open(LOG_FILE, 'a', encoding='utf-8') as file:
+            file.write(text)
+            size = file.tell()
+        if size > LOG_MAX_BYTES:
+            for i in range(LOG_BACKUP_COUNT - 1, 0, -1):
+                if os.path.exists(f'{LOG_FILE}.{i}'):
+                    os.replace(f'{LOG_FILE}.{i}', f'{LOG_FILE}.{i + 1}')
+            if LOG_BACKUP_COUNT > 0:
+                os.replace(LOG_FILE, f'{LOG_FILE}.1')
+            else:
+                os.remove(LOG_FILE)
+    except OSError:
+        # disque plein ou dossier protégé: les messages restent dans la console
+        pass
 
 
 def handle_error(name: str, show_message_box: bool = False):
@@ -57,8 +206,13 @@ def handle_error(name: str, show_message_box: bool = False):
     """    
 
     log('===== Error =====', adsk.core.LogLevels.ErrorLogLevel)
-    log(f'{name}\n{traceback.format_exc()}', adsk.core.LogLevels.ErrorLogLevel)
+    log('%s\n%s', adsk.core.LogLevels.ErrorLogLevel, args=(name, traceback.format_exc()))
 
     # If desired you could show an error as a message box.
     if show_message_box:
         ui.messageBox(f'{name}\n{traceback.format_exc()}')
+
+
+def root_component() -> adsk.fusion.Component:
+    """The root component of the active design, read when needed rather than at import time."""
+    return adsk.fusion.Design.cast(app.activeProduct).rootComponent
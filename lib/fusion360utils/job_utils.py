@@ -0,0 +1,246 @@
+import itertools
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Callable
+
+import adsk.core
+
+from .general_utils import app, ui, log, handle_error, flush_console
+from .event_utils import add_handler
+from .timing_utils import record_latency
+
+# Attempt to read the add-in name and the Python interpreter from parent config.
+try:
+    from ... import config
+    JOB_EVENT_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_jobs'
+    PYTHON_EXECUTABLE = config.PYTHON_EXECUTABLE
+except:
+    JOB_EVENT_ID = 'fusion360utils_jobs'
+    PYTHON_EXECUTABLE = None
+
+# Intervalle (s) des mises à jour de la barre de progression et de la lecture
+# du bouton Annuler, et délai (s) avant l'affichage de la barre: les calculs
+# plus courts se terminent sans l'afficher.
+PROGRESS_INTERVAL = 0.2
+PROGRESS_DELAY = 1
+
+
+class JobCancelled(Exception):
+    """Raised by Job.report() and Job.check() once the job has been cancelled."""
+
+
+class Job:
+    """A computation running on a worker thread, and its progress.
+
+    The computation receives the Job and calls report() between its stages,
+    or between the items of a loop. Cancellation is cooperative: once the user
+    has pressed Cancel, the next report() or check() raises JobCancelled and
+    the computation stops there.
+
+    Arguments:
+    name -- Name of the job, shown as the title of the progress dialog.
+    total -- Number of steps, 0 if unknown.
+    """
+
+    def __init__(self, name: str, total: int = 0):
+        self.name = name
+        self.done = 0
+        self.total = total
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.traceback = ''
+        self.start = time.perf_counter()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    def cancel(self):
+        """Asks the computation to stop at its next report() or check()."""
+        self._cancelled.set()
+
+    def check(self):
+        """Raises JobCancelled if the job has been cancelled."""
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+
+    def report(self, done: int, total: int = None, message: str = None):
+        """Records the progress of the computation, then checks for cancellation.
+
+        Arguments:
+        done -- Number of steps completed.
+        total -- New number of steps, if it has changed.
+        message -- New text of the progress dialog, if it has changed.
+        """
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message
+        self.check()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits for the end of the computation; True if it has ended."""
+        return self._finished.wait(timeout)
+
+
+# Travaux en cours: identifiant -> (job, on_done, on_error, on_cancel, dialogue de progression)
+_jobs = {}
+_ids = itertools.count(1)
+_event = None
+
+
+def run_job(name: str, compute: Callable, on_done: Callable, *, on_error: Callable = None,
+            on_cancel: Callable = None, total: int = 0, message: str = '', progress: bool = True) -> Job:
+    """Runs a computation in the background and hands its result back to Fusion's thread.
+
+    compute(job) runs on a worker thread: it must only do numeric work (it may
+    use a process pool itself) and never call the Fusion API. Meanwhile Fusion
+    stays responsive; a progress dialog, updated through a custom event, shows
+    job.report() and lets the user cancel. When compute returns, on_done(result)
+    is called on Fusion's thread, where the results can be created in the design.
+
+    Arguments:
+    name -- Name of the job, title of the progress dialog.
+    compute -- Function called as compute(job), returning the result.
+    on_done -- Function called as on_done(result) on Fusion's thread.
+    on_error -- Optional function called as on_error(error) if compute raised.
+                By default the error is logged and shown in a message box.
+    on_cancel -- Optional function called without arguments if the job was cancelled.
+    total -- Number of steps of the progress dialog, 0 if unknown.
+    message -- Text of the progress dialog.
+    progress -- False to run without a progress dialog.
+
+    :returns:
+        The Job, which can be cancelled by the caller as well.
+    """
+    _register_event()
+    job = Job(name, total)
+    job.message = message or name
+    dialog = None
+    if progress:
+        dialog = ui.createProgressDialog()
+        dialog.isCancelButtonShown = True
+        dialog.cancelButtonText = 'Annuler'
+        dialog.show(name, _dialog_message(job), 0, max(total, 1), PROGRESS_DELAY)
+    job_id = str(next(_ids))
+    _jobs[job_id] = (job, on_done, on_error, on_cancel, dialog)
+    threading.Thread(target=_work, args=(job, compute), name=f'{name} job', daemon=True).start()
+    threading.Thread(target=_tick, args=(job, job_id), name=f'{name} progress', daemon=True).start()
+    log('%s: job started', args=(name,))
+    return job
+
+
+def stop_jobs():
+    """Cancels the running jobs and removes the custom event; to be called when the add-in stops.
+
+    The results of the cancelled jobs are discarded.
+    """
+    global _event
+    for job, _, _, _, dialog in _jobs.values():
+        job.cancel()
+        if dialog:
+            dialog.hide()
+    _jobs.clear()
+    if _event is not None:
+        app.unregisterCustomEvent(JOB_EVENT_ID)
+        _event = None
+
+
+def python_executable():
+    """Python interpreter to start worker processes with.
+
+    Inside Fusion 360, sys.executable is not a Python interpreter: the one
+    shipped with Fusion is used, unless config.PYTHON_EXECUTABLE is set.
+    """
+    if PYTHON_EXECUTABLE:
+        return PYTHON_EXECUTABLE
+    for name in ('python.exe', os.path.join('bin', 'python3'), os.path.join('bin', 'python')):
+        path = os.path.join(sys.prefix, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _register_event():
+    global _event
+    if _event is None:
+        _event = app.registerCustomEvent(JOB_EVENT_ID)
+        add_handler(_event, _job_event, name='jobs')
+
+
+def _work(job: Job, compute):
+    # fil de travail: aucun appel à l'API de Fusion ici
+    try:
+        job.result = compute(job)
+    except BaseException as error:
+        job.error = error
+        job.traceback = traceback.format_exc()
+    finally:
+        job._finished.set()
+
+
+def _tick(job: Job, job_id: str):
+    # réveille régulièrement le fil de Fusion (progression, bouton Annuler) tant que le travail
+    # est suivi et pas annulé, puis une dernière fois à la fin s'il est encore suivi: après
+    # stop_jobs (travail retiré, événement supprimé), plus rien n'est envoyé
+    while job_id in _jobs and not job.cancelled and not job.wait(PROGRESS_INTERVAL):
+        app.fireCustomEvent(JOB_EVENT_ID, job_id)
+    # annulé: le calcul s'arrête à son prochain check()
+    job.wait()
+    if job_id in _jobs:
+        app.fireCustomEvent(JOB_EVENT_ID, job_id)
+
+
+def _dialog_message(job: Job):
+    return f'{job.message} (%p%)' if job.total else job.message
+
+
+def _job_event(args: adsk.core.CustomEventArgs):
+    # sur le fil de Fusion
+    entry = _jobs.get(args.additionalInfo)
+    if entry is None:
+        return
+    job, on_done, on_error, on_cancel, dialog = entry
+    if dialog and dialog.wasCancelled:
+        job.cancel()
+    if not job.finished:
+        if dialog:
+            dialog.maximumValue = max(job.total, 1)
+            dialog.progressValue = min(job.done, max(job.total, 1))
+            dialog.message = _dialog_message(job)
+        return
+
+    del _jobs[args.additionalInfo]
+    if dialog:
+        dialog.hide()
+    record_latency(f'{job.name}/job', time.perf_counter() - job.start)
+    # messages du calcul affichés avant les boîtes de dialogue des fonctions de retour
+    flush_console()
+    if job.cancelled:
+        # résultat abandonné, même si le calcul a eu le temps de se terminer
+        log('%s: job cancelled', args=(job.name,))
+        if on_cancel:
+            on_cancel()
+    elif job.error is not None:
+        log('%s: job failed\n%s', adsk.core.LogLevels.ErrorLogLevel, args=(job.name, job.traceback))
+        if on_error:
+            on_error(job.error)
+        else:
+            ui.messageBox(f'{job.name}: {job.error}')
+    else:
+        log('%s: job done in %.2f s', args=(job.name, time.perf_counter() - job.start))
+        try:
+            on_done(job.result)
+        except:
+            handle_error(job.name, True)
@@ -0,0 +1,55 @@
+import adsk.core
+import adsk.fusion
+
+# nautic_core (NumPy) n'est importé qu'au premier calcul, pas au démarrage de l'add-in.
+
+
+def body_mesh(body: adsk.fusion.BRepBody, surface_tolerance: float = 0.01):
+    """Tessellates a body once and returns its triangles as flat lists.
+
+    Arguments:
+    body -- The body (solid or surface) to tessellate.
+    surface_tolerance -- Maximum distance between the mesh and the surface, in cm.
+
+    :returns:
+        (coordinates, indices): the flat list of node coordinates (x0, y0, z0, x1, ...)
+        and the flat list of node indices, three per triangle.
+    """
+    calculator = body.meshManager.createMeshCalculator()
+    calculator.surfaceTolerance = surface_tolerance
+    mesh = calculator.calculate()
+    return mesh.nodeCoordinatesAsDouble, mesh.nodeIndices
+
+
+def waterline_size(body: adsk.fusion.BRepBody, z_waterline: float):
+    """Exact length and beam of the waterline of a hull.
+
+    The body is cut by the plane Z = z_waterline in memory (temporary B-Rep):
+    nothing is added to the design or its timeline.
+
+    :returns:
+        (length, beam) of the waterline curves, or None if the plane misses the hull.
+    """
+    plane = adsk.core.Plane.create(adsk.core.Point3D.create(0, 0, z_waterline), adsk.core.Vector3D.create(0, 0, 1))
+    waterline = adsk.fusion.TemporaryBRepManager.get().planeIntersection(body, plane)
+    if waterline is None:
+        return None
+    box = waterline.boundingBox
+    return box.maxPoint.x - box.minPoint.x, box.maxPoint.y - box.minPoint.y
+
+
+def result_cache() -> 'nautic_core.ResultCache':
+    """The cache of calculation results of the add-in, stored under its folder."""
+    from .. import nautic_core
+    from ... import config
+    return nautic_core.shared_cache(config.CACHE_FOLDER, max_bytes=config.CACHE_MAX_BYTES)
+
+
+def hull_mesh(body: adsk.fusion.BRepBody) -> 'nautic_core.HullMesh':
+    """Tessellates a hull body (at config.MESH_TOLERANCE) into a nautic_core mesh.
+
+    The welded mesh is taken from the result cache while the tessellation is unchanged.
+    """
+    from ... import config
+    coordinates, indices = body_mesh(body, config.MESH_TOLERANCE)
+    return result_cache().mesh(coordinates, indices, mesh_tolerance=config.MESH_TOLERANCE)
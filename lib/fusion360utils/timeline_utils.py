@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+import adsk.fusion
+
+from .general_utils import app, log
+
+
+@contextmanager
+def timeline_results(name: str):
+    """Context manager around the creation of the results of a command.
+
+    The timeline features created inside the block (planes, sketches, bodies)
+    are gathered in a single timeline group called name. If the block raises,
+    they are all deleted before the error is passed on, so a failed command
+    leaves nothing behind. Without a timeline (direct design), the block just runs.
+    """
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    timeline = design.timeline if design and design.designType == adsk.fusion.DesignTypes.ParametricDesignType else None
+    start = timeline.markerPosition if timeline else 0
+    try:
+        yield
+    except:
+        if timeline:
+            # suppression des features créées, de la dernière à la première
+            for index in range(timeline.markerPosition - 1, start - 1, -1):
+                entity = timeline.item(index).entity
+                if entity is not None and entity.isValid:
+                    entity.deleteMe()
+            log('%s: results removed after an error', args=(name,))
+        raise
+    if timeline and timeline.markerPosition - start > 1:
+        group = timeline.timelineGroups.add(start, timeline.markerPosition - 1)
+        group.name = name
@@ -0,0 +1,130 @@
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+# Attempt to read the latency settings from parent config.
+try:
+    from ... import config
+    LATENCY_STATS = config.LATENCY_STATS
+    LATENCY_BUFFER_SIZE = config.LATENCY_BUFFER_SIZE
+except:
+    LATENCY_STATS = False
+    LATENCY_BUFFER_SIZE = 256
+
+
+class LatencyBuffer:
+    """Durations of the last calls of one event handler or phase, in a ring buffer.
+
+    Only the last `size` durations are kept for the percentiles; the count,
+    the total and the maximum cover every call since the last clear.
+
+    Arguments:
+    size -- Number of durations kept.
+    """
+
+    def __init__(self, size: int = 256):
+        self._samples = array('d', bytes(8 * max(1, size)))
+        self._next = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self._samples[self._next] = seconds
+        self._next = (self._next + 1) % len(self._samples)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def samples(self):
+        """The durations still in the buffer, oldest first."""
+        if self.count < len(self._samples):
+            return self._samples[:self.count].tolist()
+        return (self._samples[self._next:] + self._samples[:self._next]).tolist()
+
+    def summary(self) -> dict:
+        """Count, total and max since the last clear; mean and percentiles of the buffered durations."""
+        samples = sorted(self.samples())
+        if not samples:
+            return {'count': 0, 'total': 0.0, 'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': sum(samples) / len(samples),
+            'p50': _percentile(samples, 50),
+            'p90': _percentile(samples, 90),
+            'p99': _percentile(samples, 99),
+            'max': self.max,
+        }
+
+
+def _percentile(ordered, percent):
+    # rang le plus proche, sur une liste triée non vide
+    rank = max(0, min(len(ordered) - 1, -(-len(ordered) * percent // 100) - 1))
+    return ordered[rank]
+
+
+# Un tampon par gestionnaire d'événement ou phase de calcul; les calculs de
+# fond et le fil de l'interface peuvent y écrire en même temps.
+_buffers = {}
+_lock = threading.Lock()
+
+
+def record_latency(name: str, seconds: float):
+    """Adds a duration to the statistics of an event handler or a phase.
+
+    Arguments:
+    name -- Name of the handler or phase, such as 'Disp_calc/solve'.
+    seconds -- The measured duration.
+    """
+    with _lock:
+        buffer = _buffers.get(name)
+        if buffer is None:
+            buffer = _buffers[name] = LatencyBuffer(LATENCY_BUFFER_SIZE)
+        buffer.add(seconds)
+
+
+@contextmanager
+def timed(name: str):
+    """Context manager recording the duration of the enclosed block under a name.
+
+    Nothing is measured when config.LATENCY_STATS is False.
+
+    Arguments:
+    name -- Name of the phase, such as 'Disp_calc/tessellate'.
+    """
+    if not LATENCY_STATS:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_latency(name, time.perf_counter() - start)
+
+
+def latency_summary() -> dict:
+    """Summary of every handler and phase measured, slowest total first.
+
+    :returns:
+        A dictionary name -> LatencyBuffer.summary(), durations in seconds.
+    """
+    with _lock:
+        summaries = {name: buffer.summary() for name, buffer in _buffers.items()}
+    return dict(sorted(summaries.items(), key=lambda item: -item[1]['total']))
+
+
+def latency_report() -> str:
+    """The latency summary as a text table, durations in milliseconds."""
+    lines = [f'{"name":<40} {"count":>6} {"total":>10} {"p50":>9} {"p90":>9} {"p99":>9} {"max":>9}']
+    for name, s in latency_summary().items():
+        lines.append(f'{name:<40} {s["count"]:>6} {s["total"] * 1000:>10.1f} {s["p50"] * 1000:>9.2f} '
+                     f'{s["p90"] * 1000:>9.2f} {s["p99"] * 1000:>9.2f} {s["max"] * 1000:>9.2f}')
+    return '\n'.join(lines)
+
+
+def clear_latency():
+    """Forgets every measured duration."""
+    with _lock:
+        _buffers.clear()
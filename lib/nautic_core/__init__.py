@@ -0,0 +1,16 @@
+# Calculs d'architecture navale indépendants de Fusion 360.
+# Ce paquet ne doit jamais importer adsk : il est utilisé par les commandes
+# de l'add-in, mais doit aussi pouvoir être testé et exécuté hors de Fusion.
+# Seule dépendance: NumPy. Hors de Fusion, ajouter le dossier lib au sys.path
+# puis `import nautic_core` (calculs en lot, mesures de performance...).
+from .mesh import *
+from .clipping import *
+from .sections import *
+from .hydrostatics import *
+from .equilibrium import *
+from .offsets import *
+from .weights import *
+from .parallel import *
+from .cache import *
+from .stability import *
+from .reference_hulls import *
@@ -0,0 +1,276 @@
+# Mesures de vitesse et de précision des calculs, hors de Fusion 360.
+# Depuis le dossier lib:
+#   python -m nautic_core.benchmark --resolutions 20 40 80 --output bench.json
+# Le rapport JSON peut être comparé d'une version à l'autre pour suivre les régressions.
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .equilibrium import solve_draft, solve_floating_position
+from .hydrostatics import hydrostatic_table, hydrostatics
+from .reference_hulls import ReferenceHull, box_barge, series60_like, wigley_hull
+from .sections import area_curve
+from .stability import cross_curves, gz_curve
+
+__all__ = ['ENGINES', 'REFERENCE_HULLS', 'measure', 'run_benchmarks', 'main']
+
+REFERENCE_HULLS = {'box': box_barge, 'wigley': wigley_hull, 'series60': series60_like}
+# entrées de 'errors' qui sont des nombres (d'itérations, de stations), pas des écarts
+_COUNTS = ('not_converged', 'stations')
+
+
+def measure(function, repeat: int = 3):
+    """Times function() and measures the memory it allocates.
+
+    The timed runs come first, without tracing; one more run under
+    tracemalloc gives the peak of memory allocated (NumPy arrays included).
+
+    :returns:
+        (last result, best wall time, mean wall time, peak memory in bytes)
+    """
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, min(times), sum(times) / len(times), peak
+
+
+def _relative(value, reference):
+    return abs(value - reference) / abs(reference) if reference else abs(value)
+
+
+def _hydrostatics(hull: ReferenceHull, mesh, settings):
+    ref = hull.hydrostatics()
+    run = lambda: hydrostatics(mesh, hull.draft)
+    hydro, best, mean, peak = measure(run, settings['repeat'])
+    errors = {
+        'volume': _relative(hydro.volume, ref.volume),
+        'lcb': abs(hydro.center_of_buoyancy[0] - ref.center_of_buoyancy[0]) / hull.length,
+        'kb': _relative(hydro.center_of_buoyancy[2], ref.center_of_buoyancy[2]),
+        'waterplane_area': _relative(hydro.waterplane_area, ref.waterplane_area),
+        'bmt': _relative(hydro.bmt, ref.bmt),
+        'bml': _relative(hydro.bml, ref.bml),
+    }
+    return best, mean, peak, len(mesh.triangles) / best, 'triangles/s', errors
+
+
+def _hydrostatic_table(hull: ReferenceHull, mesh, settings):
+    z = np.linspace(0.1, 1.0, settings['waterlines']) * hull.draft
+    table, best, mean, peak = measure(lambda: hydrostatic_table(mesh, z), settings['repeat'])
+    refs = [hull.hydrostatics(t) for t in z]
+    errors = {
+        'volume': max(_relative(v, ref.volume) for v, ref in zip(table.volume, refs)),
+        'kb': max(_relative(kb, ref.center_of_buoyancy[2]) for kb, ref in zip(table.kb, refs)),
+        'waterplane_area': max(_relative(a, ref.waterplane_area) for a, ref in zip(table.waterplane_area, refs)),
+        'bmt': max(_relative(bmt, ref.bmt) for bmt, ref in zip(table.bmt, refs)),
+    }
+    return best, mean, peak, len(z) / best, 'waterlines/s', errors
+
+
+def _equilibrium(hull: ReferenceHull, mesh, settings):
+    ref = hull.hydrostatics()
+    cog = (ref.center_of_buoyancy[0], 0.0, ref.center_of_buoyancy[2] + 0.8 * ref.bmt)
+
+    def run():
+        return (solve_draft(mesh, ref.volume, settings['tolerance']),
+                solve_floating_position(mesh, ref.volume, cog, settings['tolerance']))
+    (draft, position), best, mean, peak = measure(run, settings['repeat'])
+    errors = {
+        'draft': abs(draft.z_waterline - hull.draft) / hull.draft,
+        'free_floating_draft': abs(position.z_waterline - hull.draft) / hull.draft,
+        'trim': abs(position.trim),
+        'heel': abs(position.heel),
+    }
+    evaluations = draft.iterations + position.iterations + 1
+    return best, mean, peak, evaluations / best, 'solves/s', errors
+
+
+def _sections(hull: ReferenceHull, mesh, settings):
+    run = lambda: area_curve(mesh, hull.draft, settings['sections'])
+    curve, best, mean, peak = measure(run, settings['repeat'])
+    ref = hull.hydrostatics()
+    # les stations extrêmes sont sur les bouts de la carène (tableau du caisson): non comparées
+    exact = hull.section_areas(curve.stations[1:-1])
+    errors = {
+        'section_area': float(np.abs(curve.areas[1:-1] - exact).max()) / ref.max_section_area,
+        'max_section_area': _relative(curve.max_section.area, ref.max_section_area),
+        'volume': _relative(curve.volume, ref.volume),
+    }
+    return best, mean, peak, (settings['sections'] + 1) / best, 'sections/s', errors
+
+
+def _adaptive_sections(hull: ReferenceHull, mesh, settings):
+    # même budget de coupes que 'sections', stations placées selon l'erreur
+    run = lambda: area_curve(mesh, hull.draft, settings['sections'], tolerance=settings['area_tolerance'])
+    curve, best, mean, peak = measure(run, settings['repeat'])
+    ref = hull.hydrostatics()
+    exact = hull.section_areas(curve.stations[1:-1])
+    errors = {
+        'section_area': float(np.abs(curve.areas[1:-1] - exact).max()) / ref.max_section_area,
+        'max_section_area': _relative(curve.max_section.area, ref.max_section_area),
+        'volume': _relative(curve.volume, ref.volume),
+        'stations': len(curve.stations),
+    }
+    return best, mean, peak, len(curve.stations) / best, 'sections/s', errors
+
+
+def _gz(hull: ReferenceHull, mesh, settings):
+    ref = hull.hydrostatics()
+    z_cog = ref.center_of_buoyancy[2] + 0.8 * ref.bmt
+    heels = np.radians(np.arange(settings['heel_step'], settings['heel_max'] + 1e-9, settings['heel_step']))
+    run = lambda: gz_curve(mesh, ref.volume, (ref.center_of_buoyancy[0], 0.0, z_cog), heels,
+                           settings['tolerance'], workers=settings['workers'])
+    curve, best, mean, peak = measure(run, settings['repeat'])
+    errors = {}
+    exact = [hull.righting_arm(heel, z_cog) for heel in heels]
+    compared = [abs(gz - value) for gz, value in zip(curve.gz, exact) if value is not None]
+    if compared:
+        # écart rapporté à la largeur: le GZ exact s'annule en position droite
+        errors['gz'] = max(compared) / hull.beam
+    errors['not_converged'] = int(np.count_nonzero(~curve.converged))
+    return best, mean, peak, len(heels) / best, 'heels/s', errors
+
+
+def _cross_curves(hull: ReferenceHull, mesh, settings):
+    ref = hull.hydrostatics()
+    volumes = ref.volume * np.linspace(0.6, 1.0, settings['displacements'])
+    heels = np.radians(np.arange(0.0, settings['heel_max'] + 1e-9, settings['heel_step']))
+    run = lambda: cross_curves(mesh, volumes, heels, tolerance=settings['tolerance'], workers=settings['workers'])
+    curves, best, mean, peak = measure(run, settings['repeat'])
+    errors = {}
+    # KN exact: GZ d'un centre de gravité à la quille (z = 0), connu pour le caisson
+    # seulement, dont le tirant d'eau est proportionnel au volume
+    compared = []
+    for i, volume in enumerate(volumes):
+        for j, heel in enumerate(heels):
+            exact = hull.righting_arm(heel, 0.0, ref.z_waterline * volume / ref.volume)
+            if exact is not None:
+                compared.append(abs(curves.kn[i, j] - exact))
+    if compared:
+        errors['kn'] = max(compared) / hull.beam
+    errors['not_converged'] = int(np.count_nonzero(~curves.converged))
+    return best, mean, peak, curves.kn.size / best, 'cells/s', errors
+
+
+ENGINES = {
+    'hydrostatics': _hydrostatics,
+    'hydrostatic_table': _hydrostatic_table,
+    'equilibrium': _equilibrium,
+    'sections': _sections,
+    'adaptive_sections': _adaptive_sections,
+    'gz': _gz,
+    'cross_curves': _cross_curves,
+}
+
+
+def run_benchmarks(hulls=tuple(REFERENCE_HULLS), resolutions=(20, 40, 80), engines=tuple(ENGINES),
+                   repeat: int = 3, workers: int = 1, waterlines: int = 50, sections: int = 20,
+                   heel_step: float = 10.0, heel_max: float = 60.0, tolerance: float = 1e-6,
+                   area_tolerance: float = 1e-3, displacements: int = 3, progress=None) -> dict:
+    """Runs every engine on every reference hull at every mesh resolution.
+
+    Arguments:
+    hulls -- Names of the reference hulls, see REFERENCE_HULLS.
+    resolutions -- Numbers of stations of the meshes (nb_stations of ReferenceHull.mesh).
+    engines -- Names of the engines, see ENGINES.
+    repeat -- Number of timed runs of each measure; the best one is the wall time.
+    workers -- Processes of the GZ and cross curves (1 keeps every run in this process).
+    waterlines -- Number of waterlines of the hydrostatic table.
+    sections -- Number of intervals of the sectional-area curve (maximum number for the adaptive one).
+    heel_step, heel_max -- Heel angles of the GZ curve, in degrees.
+    tolerance -- Relative tolerance of the equilibrium solvers.
+    area_tolerance -- Relative tolerance of the adaptive sectional-area curve.
+    displacements -- Number of displacements of the cross curves (60 to 100 % of the design one).
+    progress -- Optional function called with each result as it is measured.
+
+    :returns:
+        The report, a dictionary ready for json.dump: the environment, the
+        settings and one result per (hull, resolution, engine). Errors are
+        relative to the exact values of the reference hull, trim and heel
+        are in radians; the GZ entry also counts the heels that did not converge,
+        the adaptive sections entry the stations it used.
+    """
+    settings = {'hulls': list(hulls), 'resolutions': list(resolutions), 'engines': list(engines),
+                'repeat': repeat, 'workers': workers, 'waterlines': waterlines, 'sections': sections,
+                'heel_step': heel_step, 'heel_max': heel_max, 'tolerance': tolerance,
+                'area_tolerance': area_tolerance, 'displacements': displacements}
+    results = []
+    for name in hulls:
+        hull = REFERENCE_HULLS[name]()
+        for resolution in resolutions:
+            mesh, mesh_time, _, _ = measure(lambda: hull.mesh(resolution), 1)
+            for engine in engines:
+                best, mean, peak, throughput, unit, errors = ENGINES[engine](hull, mesh, settings)
+                result = {
+                    'hull': name,
+                    'resolution': resolution,
+                    'triangles': len(mesh.triangles),
+                    'engine': engine,
+                    'wall_time': best,
+                    'mean_time': mean,
+                    'peak_memory': peak,
+                    'throughput': throughput,
+                    'throughput_unit': unit,
+                    'errors': {key: float(value) for key, value in errors.items()},
+                    'mesh_time': mesh_time,
+                }
+                results.append(result)
+                if progress:
+                    progress(result)
+    return {
+        'environment': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'settings': settings,
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nautic_core.benchmark',
+                                     description='Speed and accuracy of the nautic_core engines on analytic hulls.')
+    parser.add_argument('--hulls', nargs='+', choices=list(REFERENCE_HULLS), default=list(REFERENCE_HULLS))
+    parser.add_argument('--resolutions', nargs='+', type=int, default=[20, 40, 80])
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', help='JSON report file (standard output by default)')
+    args = parser.parse_args(argv)
+
+    def progress(result):
+        error = max((value for key, value in result['errors'].items() if key not in _COUNTS), default=0.0)
+        print(f"{result['hull']:>9} {result['resolution']:>5} {result['engine']:>18} "
+              f"{result['wall_time'] * 1000:10.2f} ms {result['peak_memory'] / 1e6:8.2f} MB "
+              f"max error {error:.2e}", file=sys.stderr)
+
+    report = run_benchmarks(args.hulls, args.resolutions, args.engines, args.repeat, args.workers,
+                            progress=progress)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
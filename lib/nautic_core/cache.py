@@ -0,0 +1,250 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .mesh import HullMesh
+
+__all__ = ['CACHE_VERSION', 'ResultCache', 'mesh_digest', 'shared_cache']
+
+# Version des résultats mis en cache, incluse dans chaque adresse: à augmenter
+# dès qu'un calcul change de résultat ou de format (algorithme, champs d'une
+# dataclass...), pour que le cache disque d'une version précédente de l'add-in
+# ne soit plus relu.
+CACHE_VERSION = 1
+
+# Fraction de max_bytes occupée par le cache disque après un nettoyage.
+TRIM_RATIO = 0.75
+
+
+def mesh_digest(mesh: HullMesh) -> str:
+    """Hash of the mesh geometry (node coordinates and triangles), computed once per mesh.
+
+    Two tessellations of the same hull with the same settings give the same
+    digest, whatever the document or the session.
+    """
+    if mesh._digest is None:
+        h = hashlib.sha256()
+        h.update(np.ascontiguousarray(mesh.vertices).tobytes())
+        h.update(np.ascontiguousarray(mesh.triangles).tobytes())
+        mesh._digest = h.hexdigest()
+    return mesh._digest
+
+
+class ResultCache:
+    """Content-addressed cache of computation results.
+
+    An entry is addressed by the digest of the mesh, the name of the
+    computation and its parameters: a result is reused whenever the same hull
+    geometry is queried again, even after the add-in has been restarted. The
+    most recent entries are kept in memory (LRU); with a folder, every entry is
+    also written to disk, meshes excepted. The size of the disk store is tracked as entries are
+    written: beyond max_bytes, the least recently used files are deleted down
+    to TRIM_RATIO x max_bytes.
+
+    Float parameters are rounded to `resolution` before hashing, so that
+    queries differing only by rounding noise share their entry. The address
+    also holds CACHE_VERSION: results written by another version of the
+    computations are never returned, and a file that cannot be unpickled
+    (a class changed since) is a miss.
+
+    The cache can be used from several threads (background jobs): two threads
+    missing the same entry at once both compute it, the last one is kept.
+
+    Arguments:
+    folder -- Folder of the disk store, None to keep the cache in memory only.
+    max_entries -- Number of results kept in memory.
+    max_bytes -- Maximum size of the disk store, in bytes.
+    resolution -- Quantum of the float parameters.
+    """
+
+    def __init__(self, folder: str = None, max_entries: int = 256, max_bytes: int = 64 << 20,
+                 resolution: float = 1e-6):
+        self.folder = folder
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.resolution = resolution
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_bytes = 0
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+            self._disk_bytes = sum(stat.st_size for stat in self._disk_entries().values())
+
+    def key(self, digest: str, name: str, parameters: dict) -> str:
+        """Address of a result: hash of the cache version, the geometry digest, the computation and its parameters."""
+        h = hashlib.sha256()
+        h.update(f'v{CACHE_VERSION}|'.encode())
+        h.update(digest.encode())
+        h.update(name.encode())
+        for parameter in sorted(parameters):
+            h.update(f'|{parameter}={self._quantized(parameters[parameter])!r}'.encode())
+        return h.hexdigest()
+
+    def get(self, key: str, default=None, disk: bool = True):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        if self.folder and disk:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as file:
+                    value = pickle.load(file)
+            except Exception:
+                # fichier absent, tronqué, ou écrit avec des classes qui ont changé depuis
+                pass
+            else:
+                try:
+                    os.utime(path)
+                except OSError:
+                    # fichier supprimé ou protégé entre-temps: le résultat lu reste valable
+                    pass
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._remember(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key: str, value, disk: bool = True):
+        self._remember(key, value)
+        if self.folder and disk:
+            path = self._path(key)
+            temporary = path + '.tmp'
+            try:
+                with open(temporary, 'wb') as file:
+                    pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+                size = os.path.getsize(temporary)
+                try:
+                    size -= os.path.getsize(path)
+                except OSError:
+                    pass
+                os.replace(temporary, path)
+            except OSError:
+                # disque plein ou dossier protégé: le cache reste en mémoire
+                return
+            # taille du dossier tenue à jour en mémoire: il n'est relu qu'au-delà de max_bytes
+            with self._lock:
+                self._disk_bytes += size
+                if self._disk_bytes > self.max_bytes:
+                    self._trim_disk()
+
+    def cached(self, name: str, mesh_or_digest, compute, **parameters):
+        """Returns compute() for these parameters, from the cache when possible.
+
+        Arguments:
+        name -- Name of the computation, part of the address.
+        mesh_or_digest -- The HullMesh the result depends on, or its digest.
+        compute -- Function without arguments computing the result on a miss.
+        parameters -- Everything else the result depends on (draft, heel, density...).
+        """
+        digest = mesh_or_digest if isinstance(mesh_or_digest, str) else mesh_digest(mesh_or_digest)
+        key = self.key(digest, name, parameters)
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def mesh(self, coordinates, indices, **parameters) -> HullMesh:
+        """HullMesh.from_flat(coordinates, indices), reused when the tessellation is unchanged.
+
+        Meshes are only kept in memory: they are large and quick to weld
+        again, and on disk they would push the computed results out of
+        max_bytes.
+
+        Arguments:
+        coordinates, indices -- Flat tessellation, see HullMesh.from_flat.
+        parameters -- Tessellation settings (tolerance...), part of the address.
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        indices = np.asarray(indices, dtype=np.int64)
+        h = hashlib.sha256()
+        h.update(coordinates.tobytes())
+        h.update(indices.tobytes())
+        key = self.key(h.hexdigest(), 'mesh', parameters)
+        mesh = self.get(key, disk=False)
+        if mesh is None:
+            mesh = _digested(HullMesh.from_flat(coordinates, indices))
+            self.put(key, mesh, disk=False)
+        return mesh
+
+    def stats(self) -> dict:
+        """Hit and miss counters, and the number of results in memory."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0, 'entries': len(self._memory)}
+
+    def clear(self):
+        """Empties the memory and the disk store, and resets the counters."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if self.folder:
+            for path in self._disk_entries():
+                os.remove(path)
+            with self._lock:
+                self._disk_bytes = 0
+
+    def _quantized(self, value):
+        if isinstance(value, (float, np.floating)):
+            return round(float(value) / self.resolution)
+        if isinstance(value, (tuple, list, np.ndarray)):
+            return tuple(self._quantized(v) for v in np.asarray(value).tolist())
+        return value
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + '.pkl')
+
+    def _disk_entries(self):
+        # fichiers du cache disque: chemin -> stat
+        return {entry.path: entry.stat() for entry in os.scandir(self.folder) if entry.name.endswith('.pkl')}
+
+    def _trim_disk(self):
+        # suppression des fichiers les moins récemment utilisés, jusqu'à TRIM_RATIO de max_bytes:
+        # les écritures suivantes ont de la marge avant de relire le dossier
+        sizes = self._disk_entries()
+        total = sum(stat.st_size for stat in sizes.values())
+        for path in sorted(sizes, key=lambda p: sizes[p].st_mtime):
+            if total <= TRIM_RATIO * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= sizes[path].st_size
+        self._disk_bytes = total
+
+
+def _digested(mesh):
+    mesh_digest(mesh)
+    return mesh
+
+
+_MISSING = object()
+_shared = {}
+
+
+def shared_cache(folder: str = None, **options) -> ResultCache:
+    """The ResultCache of a folder, created on first use and shared by all callers."""
+    if folder not in _shared:
+        _shared[folder] = ResultCache(folder, **options)
+    return _shared[folder]
@@ -0,0 +1,107 @@
+import numpy as np
+
+__all__ = ['clip_below', 'cut_by_x_planes']
+
+
+def clip_below(corners, z, return_index: bool = False):
+    """Clips triangles against the plane Z = z and keeps the part under it.
+
+    The orientation of the triangles is preserved, so the pieces can be
+    integrated like the original mesh.
+
+    Arguments:
+    corners -- (m, 3, 3) array of triangle corners.
+    z -- Height of the clipping plane, or (m,) array of one height per triangle.
+    return_index -- Also return, for each piece, the index of its triangle.
+
+    :returns:
+        (k, 3, 3) array of the triangles (or triangle pieces) under the plane,
+        and the (k,) array of the triangle indices if return_index is True.
+    """
+    corners = np.asarray(corners, dtype=np.float64)
+    z = np.broadcast_to(np.asarray(z, dtype=np.float64), corners.shape[:1])
+    below = corners[:, :, 2] <= z[:, None]
+    nb_below = below.sum(axis=1)
+
+    pieces = [corners[nb_below == 3]]
+    index = [np.flatnonzero(nb_below == 3)]
+
+    # Un seul sommet immergé: il reste un triangle.
+    selected = np.flatnonzero(nb_below == 1)
+    if len(selected):
+        first = np.argmax(below[selected], axis=1)
+        a, b, c = _rolled(corners[selected], first)
+        z_cut = z[selected]
+        pieces.append(np.stack([a, _cut(a, b, z_cut, 2), _cut(a, c, z_cut, 2)], axis=1))
+        index.append(selected)
+
+    # Deux sommets immergés: il reste un quadrilatère, coupé en deux triangles.
+    selected = np.flatnonzero(nb_below == 2)
+    if len(selected):
+        first = np.argmin(below[selected], axis=1)
+        a, b, c = _rolled(corners[selected], first)
+        z_cut = z[selected]
+        p_ab = _cut(a, b, z_cut, 2)
+        p_ac = _cut(a, c, z_cut, 2)
+        pieces.append(np.stack([p_ab, b, c], axis=1))
+        pieces.append(np.stack([p_ab, c, p_ac], axis=1))
+        index.extend([selected, selected])
+
+    if return_index:
+        return np.concatenate(pieces), np.concatenate(index)
+    return np.concatenate(pieces)
+
+
+def cut_by_x_planes(corners, x):
+    """Cuts triangles by planes X = x into oriented segments.
+
+    The segments follow n x X (n being the triangle normal), so that the
+    segments of a consistently oriented mesh chain up into section curves
+    running in the same direction. A corner lying on a plane counts on its
+    negative side: every edge is cut once, never by both of its triangles.
+
+    Arguments:
+    corners -- (m, 3, 3) array of triangle corners.
+    x -- Position of the plane, or (m,) array of one position per triangle.
+
+    :returns:
+        (p, q, index): the (k, 3) arrays of the segment start and end points,
+        and the (k,) array of the indices of the triangles that were cut.
+    """
+    corners = np.asarray(corners, dtype=np.float64)
+    x = np.broadcast_to(np.asarray(x, dtype=np.float64), corners.shape[:1])
+    positive = corners[:, :, 0] > x[:, None]
+    nb_positive = positive.sum(axis=1)
+    index = np.flatnonzero((nb_positive == 1) | (nb_positive == 2))
+    tri = corners[index]
+    alone = np.where(nb_positive[index] == 1,
+                     np.argmax(positive[index], axis=1),
+                     np.argmin(positive[index], axis=1))
+    a, b, c = _rolled(tri, alone)
+    p = _cut(a, b, x[index], 0)
+    q = _cut(a, c, x[index], 0)
+    n = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    d = q - p
+    flip = d[:, 1] * n[:, 2] - d[:, 2] * n[:, 1] < 0
+    p[flip], q[flip] = q[flip], p[flip]
+    return p, q, index
+
+
+def _rolled(tri, first):
+    # Fait tourner les sommets (sans changer l'orientation) pour que le sommet
+    # d'indice `first` se retrouve en tête.
+    order = (first[:, None] + np.arange(3)) % 3
+    tri = np.take_along_axis(tri, order[:, :, None], axis=1)
+    return tri[:, 0], tri[:, 1], tri[:, 2]
+
+
+def _cut(p, q, value, axis: int):
+    # Point d'intersection des segments [p, q] avec le plan coordonnée[axis] = value.
+    # Les extrémités sont d'abord rangées dans un ordre fixe: les deux triangles
+    # qui partagent une arête calculent ainsi exactement le même point.
+    swap = p[:, axis] > q[:, axis]
+    p, q = np.where(swap[:, None], q, p), np.where(swap[:, None], p, q)
+    t = (value - p[:, axis]) / (q[:, axis] - p[:, axis])
+    point = p + t[:, None] * (q - p)
+    point[:, axis] = value
+    return point
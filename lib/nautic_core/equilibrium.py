@@ -0,0 +1,290 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .hydrostatics import Hydrostatics, hydrostatics
+from .mesh import HullMesh, rotation_matrix
+
+__all__ = ['DraftSolution', 'FloatingPosition', 'solve_draft', 'solve_floating_position']
+
+
+@dataclass
+class DraftSolution:
+    """Result of the search of the waterline giving a displaced volume."""
+    z_waterline: float
+    draft: float
+    residual: float            # écart relatif entre volume obtenu et volume visé
+    iterations: int
+    converged: bool
+    hydrostatics: Hydrostatics
+
+
+def solve_draft(mesh: HullMesh, volume: float, tolerance: float = 1e-6,
+                max_iterations: int = 50, z_start: float = None) -> DraftSolution:
+    """Finds the waterline at which the hull displaces the given volume.
+
+    Newton iterations on V(z) - volume, using the waterplane area as the exact
+    derivative dV/dz. Every evaluation narrows a bracket [z_low, z_high]; when a
+    Newton step leaves it (or the waterplane vanishes), the step falls back to
+    bisection, so the search always converges.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    volume -- Displaced volume to reach, in mesh units.
+    tolerance -- Relative tolerance on the displaced volume.
+    max_iterations -- Maximum number of hydrostatic evaluations.
+    z_start -- First guess for the waterline height. Mid-depth if not given.
+
+    :returns:
+        The DraftSolution. If the volume is beyond the volume of the whole
+        hull, the solution stops at the top of the mesh with converged False.
+    """
+    z_low, z_high = mesh.z_min, mesh.z_max
+    z = z_start if z_start is not None and z_low < z_start < z_high else (z_low + z_high) / 2
+
+    hydro = None
+    residual = float('inf')
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        hydro = hydrostatics(mesh, z)
+        error = hydro.volume - volume
+        residual = abs(error) / volume
+        if residual <= tolerance:
+            break
+        if error > 0:
+            z_high = z
+        else:
+            z_low = z
+        if z_high - z_low <= tolerance * (mesh.z_max - mesh.z_min):
+            break
+        if hydro.waterplane_area > 0:
+            z_next = z - error / hydro.waterplane_area
+        else:
+            z_next = z_low - 1.0
+        if not z_low < z_next < z_high:
+            z_next = (z_low + z_high) / 2
+        z = z_next
+
+    return DraftSolution(
+        z_waterline=z,
+        draft=z - mesh.z_min,
+        residual=residual,
+        iterations=iterations,
+        converged=residual <= tolerance,
+        hydrostatics=hydro,
+    )
+
+
+@dataclass
+class FloatingPosition:
+    """Free-floating attitude of a hull: waterline, heel and trim (radians).
+
+    The attitude is applied with rotation_matrix(heel, trim) around the centre
+    of gravity; the hydrostatics are those of the hull in that attitude.
+    """
+    z_waterline: float
+    heel: float
+    trim: float
+    residual: float            # plus grand résidu relatif (volume, moments)
+    heeling_moment: float      # volume x (yB - yG): moment de redressement restant
+    trimming_moment: float     # volume x (xB - xG)
+    iterations: int
+    converged: bool
+    hydrostatics: Hydrostatics
+
+
+def solve_floating_position(mesh: HullMesh, volume: float, center_of_gravity,
+                            tolerance: float = 1e-6, max_iterations: int = 50,
+                            heel: float = None, start=None) -> FloatingPosition:
+    """Finds the waterline, heel and trim at which the hull floats freely.
+
+    Newton iterations on three residuals: the displaced volume, and the
+    moments of buoyancy around the centre of gravity in both directions. The
+    Jacobian comes from the waterplane of the current attitude (area, centre,
+    second moments) and the height of the centre of buoyancy, as in the
+    hydrostatic stiffness of a floating body. Each step is shortened by
+    Armijo backtracking on the sum of squares of the scaled residuals. If no
+    step decreases it (large heel far from the start, soft stability), the
+    heel is bracketed instead: the moment is followed along solves at fixed
+    heel until it changes sign, then its root is found by regula falsi. The
+    hull is rotated around its centre of gravity, so no geometry other than
+    the mesh is needed.
+
+    Arguments:
+    mesh -- The hull surface mesh, upright.
+    volume -- Displaced volume, in mesh units.
+    center_of_gravity -- (x, y, z) of the centre of gravity of the upright hull.
+    tolerance -- Relative tolerance on the volume, and on the moments divided
+                 by volume x hull length.
+    max_iterations -- Maximum number of Newton iterations.
+    heel -- If given, the heel is held at that value and only the waterline
+            and the trim are solved (as for a righting arm curve).
+    start -- Optional (z_waterline, heel, trim) first guess.
+    """
+    g = np.asarray(center_of_gravity, dtype=np.float64)
+    low, high = mesh.bounds
+    scale = np.array([volume, volume * (high - low).max(), volume * (high - low).max()])
+    free = [0, 2] if heel is not None else [0, 1, 2]
+
+    def evaluate(x):
+        hull = mesh.transformed(rotation_matrix(x[1], x[2]), g)
+        hydro = hydrostatics(hull, x[0])
+        b = hydro.center_of_buoyancy
+        residuals = np.array([hydro.volume - volume,
+                              hydro.volume * (b[1] - g[1]),
+                              hydro.volume * (b[0] - g[0])])
+        return hull, hydro, residuals
+
+    if start is None:
+        start_heel = heel if heel is not None else 0.0
+        hull = mesh.transformed(rotation_matrix(start_heel, 0.0), g)
+        x = np.array([solve_draft(hull, volume, tolerance).z_waterline, start_heel, 0.0])
+    else:
+        x = np.array(start, dtype=np.float64)
+        if heel is not None:
+            x[1] = heel
+    x, (hull, hydro, residuals), iterations, stalled = _newton(evaluate, x, free, scale, g, tolerance, max_iterations)
+
+    if stalled and heel is None:
+        fixed = lambda phi, guess: solve_floating_position(mesh, volume, g, tolerance, max_iterations, heel=phi,
+                                                           start=(guess.z_waterline, phi, guess.trim))
+        position, extra = _bracket_heel(fixed, x, _stiffness(hydro, g)[1, 1], tolerance * scale[1] / volume)
+        iterations += extra
+        if position is not None:
+            # solution à gîte imposée de moment nul: c'est l'équilibre libre, affiné par Newton
+            x = np.array([position.z_waterline, position.heel, position.trim])
+            x, (hull, hydro, residuals), polish, _ = _newton(evaluate, x, free, scale, g, tolerance, max_iterations)
+            iterations += polish
+
+    error = np.abs(residuals / scale)[free].max()
+    return FloatingPosition(
+        z_waterline=float(x[0]),
+        heel=float(x[1]),
+        trim=float(x[2]),
+        residual=float(error),
+        heeling_moment=float(residuals[1]),
+        trimming_moment=float(residuals[2]),
+        iterations=iterations,
+        converged=bool(error <= tolerance),
+        hydrostatics=hydro,
+    )
+
+
+def _newton(evaluate, x, free, scale, g, tolerance: float, max_iterations: int):
+    # Newton amorti: pas réduit (Armijo) tant que la somme des carrés des résidus
+    # normés ne baisse pas assez. Renvoie (x, evaluate(x), itérations, bloqué).
+    state = evaluate(x)
+    hull, hydro, residuals = state
+    merit = 0.5 * np.sum((residuals / scale)[free] ** 2)
+    iterations = 0
+    while np.abs(residuals / scale)[free].max() > tolerance and iterations < max_iterations:
+        iterations += 1
+        jacobian = _stiffness(hydro, g)[np.ix_(free, free)]
+        step = np.zeros(3)
+        step[free] = np.linalg.lstsq(jacobian, -residuals[free], rcond=None)[0]
+        # pas limités: le jacobien n'est valable que localement
+        step[1:] = np.clip(step[1:], -0.2, 0.2)
+        depth = hull.z_max - hull.z_min
+        step[0] = np.clip(step[0], -0.25 * depth, 0.25 * depth)
+        # pente de la fonction de mérite dans la direction du pas (linéarisée)
+        slope = np.dot((residuals / scale)[free], (jacobian @ step[free]) / scale[free])
+        if slope >= 0:
+            return x, state, iterations, True
+        alpha = 1.0
+        for _ in range(20):
+            candidate = evaluate(x + alpha * step)
+            candidate_merit = 0.5 * np.sum((candidate[2] / scale)[free] ** 2)
+            if candidate_merit <= merit + 1e-4 * alpha * slope:
+                break
+            alpha /= 2
+        else:
+            # aucune descente (carène noyée, surface ouverte, jacobien trop loin de la réalité)
+            return x, state, iterations, True
+        x = x + alpha * step
+        state, merit = candidate, candidate_merit
+        hull, hydro, residuals = state
+    return x, state, iterations, False
+
+
+def _bracket_heel(fixed, x, stiffness: float, arm_tolerance: float, step: float = 0.1):
+    # Recherche de la gîte de moment nul par des calculs à gîte imposée (enfoncement et
+    # assiette libres): on avance d'un pas dans le sens indiqué par la raideur jusqu'au
+    # changement de signe du moment, puis regula falsi (Illinois) dans l'intervalle.
+    # Le moment est suivi comme bras de levier (moment / volume), à arm_tolerance près.
+    # Renvoie (position à gîte imposée ou None, itérations).
+    iterations = 0
+
+    def at(phi, guess):
+        nonlocal iterations
+        position = fixed(phi, guess)
+        iterations += position.iterations
+        return position, position.heeling_moment / position.hydrostatics.volume if position.hydrostatics.volume > 0 else 0.0
+
+    guess = _Guess(x[0], x[2])
+    phi_a = float(x[1])
+    position_a, m_a = at(phi_a, guess)
+    if position_a.converged and abs(m_a) <= arm_tolerance:
+        return position_a, iterations
+    direction = -np.sign(m_a * stiffness) if stiffness else -np.sign(m_a)
+    direction = direction or 1.0
+    reversed_once = False
+    phi_b, position_b, m_b = phi_a, position_a, m_a
+    while True:
+        phi_b = phi_a + direction * step
+        if abs(phi_b) > np.pi:
+            if reversed_once:
+                return None, iterations
+            direction, reversed_once = -direction, True
+            continue
+        position_b, m_b = at(phi_b, position_a)
+        if np.sign(m_b) != np.sign(m_a):
+            break
+        if abs(m_b) > abs(m_a) and not reversed_once:
+            # le moment s'éloigne de zéro: on repart dans l'autre sens
+            direction, reversed_once = -direction, True
+            continue
+        phi_a, position_a, m_a = phi_b, position_b, m_b
+
+    # regula falsi modifiée (Illinois) entre phi_a et phi_b
+    side = 0
+    position = position_b
+    for _ in range(60):
+        phi = (phi_a * m_b - phi_b * m_a) / (m_b - m_a)
+        position, m = at(phi, position)
+        if abs(m) <= arm_tolerance or abs(phi_b - phi_a) <= 1e-12:
+            break
+        if np.sign(m) == np.sign(m_b):
+            phi_b, m_b = phi, m
+            if side == -1:
+                m_a /= 2
+            side = -1
+        else:
+            phi_a, m_a = phi, m
+            if side == 1:
+                m_b /= 2
+            side = 1
+    return position, iterations
+
+
+@dataclass
+class _Guess:
+    # point de départ (flottaison, assiette) des calculs à gîte imposée
+    z_waterline: float
+    trim: float
+
+
+def _stiffness(hydro: Hydrostatics, g):
+    # Dérivées du volume et des moments autour de G par rapport à la flottaison,
+    # la gîte et l'assiette: la tranche ajoutée ou retirée à la flottaison, plus
+    # le déplacement du volume immergé par la rotation (terme V.(zB - zG)).
+    area = hydro.waterplane_area
+    dx = hydro.center_of_flotation[0] - g[0]
+    dy = hydro.center_of_flotation[1] - g[1]
+    i_yy = hydro.it + area * dy * dy
+    i_xx = hydro.il + area * dx * dx
+    i_xy = hydro.ixy + area * dx * dy
+    vertical = hydro.volume * (hydro.center_of_buoyancy[2] - g[2])
+    return np.array([[area, -area * dy, area * dx],
+                     [area * dy, -(i_yy + vertical), i_xy],
+                     [area * dx, -i_xy, i_xx + vertical]])
@@ -0,0 +1,373 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from .clipping import clip_below
+from .mesh import HullMesh
+from .sections import section_area_table
+
+__all__ = ['Hydrostatics', 'HydrostaticTable', 'WaterlineSweep', 'hydrostatics', 'hydrostatic_table']
+
+
+@dataclass
+class Hydrostatics:
+    """Hydrostatic properties of a hull floating at a given waterline, in mesh units."""
+    z_waterline: float
+    draft: float
+    volume: float              # volume de carène
+    center_of_buoyancy: tuple  # (x, y, z) du centre de carène
+    waterplane_area: float     # aire de la flottaison
+    center_of_flotation: tuple # (x, y) du centre de la flottaison
+    it: float                  # moments quadratiques de la flottaison autour de son centre:
+    il: float                  #   transversal, longitudinal
+    ixy: float                 #   et produit d'inertie
+    wetted_area: float         # surface mouillée
+    lwl: float                 # longueur à la flottaison
+    bwl: float                 # bau maxi à la flottaison
+    immersed_min: tuple        # boîte englobante de la partie immergée
+    immersed_max: tuple
+    is_flooded: bool           # un bord libre de la surface est sous la flottaison
+
+    @property
+    def bmt(self) -> float:
+        """Transverse metacentric radius It / volume (0 when nothing is immersed)."""
+        return self.it / self.volume if self.volume > 0 else 0.0
+
+    @property
+    def bml(self) -> float:
+        """Longitudinal metacentric radius Il / volume (0 when nothing is immersed)."""
+        return self.il / self.volume if self.volume > 0 else 0.0
+
+
+@dataclass
+class HydrostaticTable:
+    """Hydrostatic properties over a range of waterlines, one array entry per waterline.
+
+    Lengths, areas and volumes are in mesh units, masses are volume times the
+    density given to hydrostatic_table. The TPC is the mass needed to sink the
+    hull by one length unit, the MCT the moment needed to trim it by one length
+    unit; KB is measured from the bottom of the mesh.
+    """
+    z_waterline: np.ndarray
+    draft: np.ndarray
+    volume: np.ndarray
+    displacement: np.ndarray
+    lcb: np.ndarray
+    tcb: np.ndarray
+    kb: np.ndarray
+    waterplane_area: np.ndarray
+    lcf: np.ndarray
+    tcf: np.ndarray
+    it: np.ndarray             # moment quadratique transversal de la flottaison
+    il: np.ndarray             # moment quadratique longitudinal de la flottaison
+    bmt: np.ndarray
+    bml: np.ndarray
+    tpc: np.ndarray
+    mct: np.ndarray
+    wetted_area: np.ndarray
+    lwl: np.ndarray
+    bwl: np.ndarray
+    midship_area: np.ndarray
+    cb: np.ndarray
+    cm: np.ndarray
+    cp: np.ndarray
+    cwp: np.ndarray
+    is_flooded: np.ndarray
+
+
+# Colonnes des coefficients d'intégration de chaque triangle (voir _coefficients).
+_S, _SZ, _SZZ, _SX, _SXZ, _SY, _SYZ, _SXX, _SYY, _SXY, _AREA = range(11)
+_NB_COEFFICIENTS = 11
+
+
+def _coefficients(pieces, orientation: float):
+    # Pour chaque triangle, intégrales sur sa projection horizontale (d'aire
+    # signée s) dont on tire, pour une flottaison T quelconque au-dessus de lui:
+    #   volume       = T.s - s.z
+    #   moment en x  = T.s.x - s.xz    (idem en y)
+    #   moment en z  = (T².s - s.zz)/2
+    # et les moments de la flottaison s.x, s.y, s.xx, s.yy, s.xy.
+    # Les intégrandes sont au plus quadratiques sur chaque triangle projeté:
+    # la moyenne sur les milieux des côtés est exacte.
+    a, b, c = pieces[:, 0], pieces[:, 1], pieces[:, 2]
+    cross = np.cross(b - a, c - a)
+    s = 0.5 * cross[:, 2] * orientation
+    mid = (pieces + np.roll(pieces, -1, axis=1)) / 2
+    x, y, z = mid[:, :, 0], mid[:, :, 1], mid[:, :, 2]
+    coefficients = np.empty((len(pieces), _NB_COEFFICIENTS))
+    coefficients[:, _S] = s
+    coefficients[:, _SZ] = s * z.mean(axis=1)
+    coefficients[:, _SZZ] = s * (z * z).mean(axis=1)
+    coefficients[:, _SX] = s * x.mean(axis=1)
+    coefficients[:, _SXZ] = s * (x * z).mean(axis=1)
+    coefficients[:, _SY] = s * y.mean(axis=1)
+    coefficients[:, _SYZ] = s * (y * z).mean(axis=1)
+    coefficients[:, _SXX] = s * (x * x).mean(axis=1)
+    coefficients[:, _SYY] = s * (y * y).mean(axis=1)
+    coefficients[:, _SXY] = s * (x * y).mean(axis=1)
+    coefficients[:, _AREA] = 0.5 * np.linalg.norm(cross, axis=1)
+    return coefficients
+
+
+def _integrals(sums, z):
+    # Volume, centre de carène et propriétés de la flottaison à partir des
+    # sommes des coefficients; fonctionne aussi sur des tableaux de flottaisons.
+    z = np.asarray(z, dtype=np.float64)
+    s = sums[..., _S]
+    volume = z * s - sums[..., _SZ]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cob_x = np.where(volume > 0, (z * sums[..., _SX] - sums[..., _SXZ]) / volume, 0.0)
+        cob_y = np.where(volume > 0, (z * sums[..., _SY] - sums[..., _SYZ]) / volume, 0.0)
+        cob_z = np.where(volume > 0, (z * z * s - sums[..., _SZZ]) / 2 / volume, 0.0)
+        lcf = np.where(s > 0, sums[..., _SX] / s, 0.0)
+        tcf = np.where(s > 0, sums[..., _SY] / s, 0.0)
+    it = sums[..., _SYY] - s * tcf ** 2
+    il = sums[..., _SXX] - s * lcf ** 2
+    ixy = sums[..., _SXY] - s * lcf * tcf
+    return volume, (cob_x, cob_y, cob_z), s, (lcf, tcf), it, il, ixy
+
+
+def hydrostatics(mesh: HullMesh, z_waterline: float) -> Hydrostatics:
+    """Computes the hydrostatic properties of the hull under the plane Z = z_waterline.
+
+    The hull surface is clipped at the waterline and every triangle piece is
+    integrated analytically: the immersed volume is the sum of the vertical
+    prisms between each piece and the waterplane, so the waterplane itself
+    never has to be built.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    z_waterline -- Height of the waterline, in the mesh coordinate system.
+    """
+    z = float(z_waterline)
+    draft = z - mesh.z_min
+    pieces = clip_below(mesh.corners, z)
+
+    edges_z = mesh.vertices[mesh.boundary_edges, 2]
+    is_flooded = bool(np.any(edges_z.min(axis=1) < z)) if len(edges_z) else False
+
+    if len(pieces) == 0:
+        sums = np.zeros(_NB_COEFFICIENTS)
+        points = np.zeros((1, 3))
+    else:
+        sums = _coefficients(pieces, mesh.orientation).sum(axis=0)
+        points = pieces.reshape(-1, 3)
+    volume, center_of_buoyancy, waterplane_area, center_of_flotation, it, il, ixy = _integrals(sums, z)
+
+    waterline = points[points[:, 2] >= z]
+    if len(pieces) and len(waterline):
+        lwl = np.ptp(waterline[:, 0])
+        bwl = np.ptp(waterline[:, 1])
+    else:
+        lwl = bwl = 0.0
+
+    return Hydrostatics(
+        z_waterline=z,
+        draft=draft,
+        volume=float(volume),
+        center_of_buoyancy=tuple(float(v) for v in center_of_buoyancy),
+        waterplane_area=float(waterplane_area),
+        center_of_flotation=tuple(float(v) for v in center_of_flotation),
+        it=float(it),
+        il=float(il),
+        ixy=float(ixy),
+        wetted_area=float(sums[_AREA]),
+        lwl=float(lwl),
+        bwl=float(bwl),
+        immersed_min=tuple(float(v) for v in points.min(axis=0)),
+        immersed_max=tuple(float(v) for v in points.max(axis=0)),
+        is_flooded=is_flooded,
+    )
+
+
+class WaterlineSweep:
+    """Hydrostatics of one hull at any waterline, for many successive queries.
+
+    The integrals of the triangles are summed once, by increasing height: a
+    query reads the prefix sum of the triangles under its waterline and only
+    clips those crossing it. Moving the waterline by a small step (a slider,
+    a spin box) costs as little as the few triangles the new waterline cuts.
+    The results are the same as those of hydrostatics().
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    """
+
+    def __init__(self, mesh: HullMesh):
+        self.mesh = mesh
+        corners = mesh.corners
+        self._tri_z_max = corners[:, :, 2].max(axis=1)
+        order = np.argsort(self._tri_z_max)
+        self._sorted_z_max = self._tri_z_max[order]
+        self._cumulated = np.vstack([np.zeros((1, _NB_COEFFICIENTS)),
+                                     np.cumsum(_coefficients(corners[order], mesh.orientation), axis=0)])
+        # triangles par point bas croissant: ceux qu'une flottaison peut couper
+        tri_z_min = corners[:, :, 2].min(axis=1)
+        self._by_z_min = np.argsort(tri_z_min)
+        self._sorted_z_min = tri_z_min[self._by_z_min]
+        # boîte englobante des noeuds situés sous chaque altitude
+        vertices = mesh.vertices[np.argsort(mesh.vertices[:, 2])]
+        self._vertex_z = vertices[:, 2]
+        self._low = np.minimum.accumulate(vertices, axis=0)
+        self._high = np.maximum.accumulate(vertices, axis=0)
+        edges_z = mesh.vertices[mesh.boundary_edges, 2]
+        self._flood_z = edges_z.min() if len(edges_z) else np.inf
+
+    def crossing(self, z_waterline: float):
+        """Indices of the triangles cut by the plane Z = z_waterline."""
+        candidates = self._by_z_min[:np.searchsorted(self._sorted_z_min, z_waterline, side='right')]
+        return candidates[self._tri_z_max[candidates] > z_waterline]
+
+    def hydrostatics(self, z_waterline: float) -> Hydrostatics:
+        """Same as hydrostatics(mesh, z_waterline)."""
+        z = float(z_waterline)
+        mesh = self.mesh
+        sums = self._cumulated[np.searchsorted(self._sorted_z_max, z, side='right')].copy()
+        pieces = clip_below(mesh.corners[self.crossing(z)], z)
+        if len(pieces):
+            sums += _coefficients(pieces, mesh.orientation).sum(axis=0)
+        volume, center_of_buoyancy, waterplane_area, center_of_flotation, it, il, ixy = _integrals(sums, z)
+
+        points = pieces.reshape(-1, 3)
+        waterline = points[points[:, 2] >= z]
+        if len(waterline):
+            lwl = np.ptp(waterline[:, 0])
+            bwl = np.ptp(waterline[:, 1])
+        else:
+            lwl = bwl = 0.0
+        nb_below = np.searchsorted(self._vertex_z, z, side='right')
+        if nb_below:
+            points = np.vstack([points, self._low[nb_below - 1], self._high[nb_below - 1]])
+        if len(points) == 0:
+            points = np.zeros((1, 3))
+
+        return Hydrostatics(
+            z_waterline=z,
+            draft=z - mesh.z_min,
+            volume=float(volume),
+            center_of_buoyancy=tuple(float(v) for v in center_of_buoyancy),
+            waterplane_area=float(waterplane_area),
+            center_of_flotation=tuple(float(v) for v in center_of_flotation),
+            it=float(it),
+            il=float(il),
+            ixy=float(ixy),
+            wetted_area=float(sums[_AREA]),
+            lwl=float(lwl),
+            bwl=float(bwl),
+            immersed_min=tuple(float(v) for v in points.min(axis=0)),
+            immersed_max=tuple(float(v) for v in points.max(axis=0)),
+            is_flooded=bool(self._flood_z < z),
+        )
+
+    def waterline_segments(self, z_waterline: float):
+        """(k, 2, 3) array of the segments of the waterline: the hull cut by the plane Z = z_waterline."""
+        z = float(z_waterline)
+        corners = self.mesh.corners[self.crossing(z)]
+        following = np.roll(corners, -1, axis=1)
+        below = corners[:, :, 2] <= z
+        cut = below != np.roll(below, -1, axis=1)
+        # un triangle coupé a exactement deux côtés qui traversent le plan
+        a, b = corners[cut], following[cut]
+        t = (z - a[:, 2]) / (b[:, 2] - a[:, 2])
+        return (a + t[:, None] * (b - a)).reshape(-1, 2, 3)
+
+
+def hydrostatic_table(mesh: HullMesh, z_waterlines, density: float = 1.0,
+                      x_midship: float = None, chunk_size: int = 1 << 22) -> HydrostaticTable:
+    """Computes the hydrostatic properties for every waterline in a single pass.
+
+    The triangles lying entirely under a waterline contribute polynomials in
+    the waterline height: they are summed once, sorted by height, and each
+    waterline just reads a prefix sum. Only the triangles crossing a waterline
+    are clipped, all waterlines together.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    z_waterlines -- Heights of the waterlines, in the mesh coordinate system.
+    density -- Water density, in mass per cubic mesh unit.
+    x_midship -- Position of the midship section used by Cm and Cp. Defaults
+                 to the middle of the mesh length.
+    chunk_size -- Maximum number of (triangle, waterline) pairs tested at once,
+                  to bound the memory used.
+    """
+    z = np.atleast_1d(np.asarray(z_waterlines, dtype=np.float64))
+    nb = len(z)
+    corners = mesh.corners
+    coefficients = _coefficients(corners, mesh.orientation)
+    tri_z_min = corners[:, :, 2].min(axis=1)
+    tri_z_max = corners[:, :, 2].max(axis=1)
+
+    # triangles entièrement immergés: sommes cumulées par altitude croissante
+    order = np.argsort(tri_z_max)
+    cumulated = np.vstack([np.zeros((1, _NB_COEFFICIENTS)), np.cumsum(coefficients[order], axis=0)])
+    sums = cumulated[np.searchsorted(tri_z_max[order], z, side='right')]
+
+    # triangles coupés par une flottaison, traités par paquets de flottaisons
+    wl_min = np.full((nb, 2), np.inf)
+    wl_max = np.full((nb, 2), -np.inf)
+    step = max(1, chunk_size // max(1, len(corners)))
+    for start in range(0, nb, step):
+        z_chunk = z[start:start + step]
+        crossing = (tri_z_min[:, None] <= z_chunk) & (tri_z_max[:, None] > z_chunk)
+        tri_index, wl_index = np.nonzero(crossing)
+        wl_index += start
+        pieces, origin = clip_below(corners[tri_index], z[wl_index], return_index=True)
+        wl_index = wl_index[origin]
+        np.add.at(sums, wl_index, _coefficients(pieces, mesh.orientation))
+        on_waterline = pieces[:, :, 2] >= z[wl_index][:, None]
+        rows = np.repeat(wl_index, 3)[on_waterline.ravel()]
+        points = pieces[on_waterline][:, :2]
+        np.minimum.at(wl_min, rows, points)
+        np.maximum.at(wl_max, rows, points)
+
+    volume, (cob_x, cob_y, cob_z), waterplane_area, (lcf, tcf), it, il, _ = _integrals(sums, z)
+    wetted = np.isfinite(wl_min[:, 0])
+    lwl = np.where(wetted, wl_max[:, 0] - wl_min[:, 0], 0.0)
+    bwl = np.where(wetted, wl_max[:, 1] - wl_min[:, 1], 0.0)
+
+    if x_midship is None:
+        x_min, x_max = corners[:, :, 0].min(), corners[:, :, 0].max()
+        x_midship = (x_min + x_max) / 2
+    midship_area = section_area_table(mesh, x_midship, z)
+
+    draft = z - mesh.z_min
+    displacement = density * volume
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bmt = np.where(volume > 0, it / volume, 0.0)
+        bml = np.where(volume > 0, il / volume, 0.0)
+        mct = np.where(lwl > 0, displacement * bml / lwl, 0.0)
+        cb = np.where(lwl * bwl * draft > 0, volume / (lwl * bwl * draft), 0.0)
+        cm = np.where(bwl * draft > 0, midship_area / (bwl * draft), 0.0)
+        cp = np.where(midship_area * lwl > 0, volume / (midship_area * lwl), 0.0)
+        cwp = np.where(lwl * bwl > 0, waterplane_area / (lwl * bwl), 0.0)
+
+    edges_z = mesh.vertices[mesh.boundary_edges, 2]
+    flood_z = edges_z.min() if len(edges_z) else np.inf
+
+    return HydrostaticTable(
+        z_waterline=z,
+        draft=draft,
+        volume=volume,
+        displacement=displacement,
+        lcb=cob_x,
+        tcb=cob_y,
+        kb=np.where(volume > 0, cob_z - mesh.z_min, 0.0),
+        waterplane_area=waterplane_area,
+        lcf=lcf,
+        tcf=tcf,
+        it=it,
+        il=il,
+        bmt=bmt,
+        bml=bml,
+        tpc=density * waterplane_area,
+        mct=mct,
+        wetted_area=sums[:, _AREA],
+        lwl=lwl,
+        bwl=bwl,
+        midship_area=midship_area,
+        cb=cb,
+        cm=cm,
+        cp=cp,
+        cwp=cwp,
+        is_flooded=z > flood_z,
+    )
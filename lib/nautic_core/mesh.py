@@ -0,0 +1,137 @@
+import numpy as np
+
+__all__ = ['HullMesh', 'rotation_matrix']
+
+
+class HullMesh:
+    """Triangle mesh of a hull surface, in the units of the model (cm in Fusion).
+
+    The triangles must be consistently oriented (all normals pointing outwards,
+    or all inwards): the hydrostatic integrals rely on it, whichever the direction.
+
+    Arguments:
+    vertices -- (n, 3) array of node coordinates.
+    triangles -- (m, 3) array of node indices.
+    """
+
+    def __init__(self, vertices, triangles):
+        self.vertices = np.ascontiguousarray(vertices, dtype=np.float64).reshape(-1, 3)
+        self.triangles = np.ascontiguousarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self._corners = None
+        self._boundary_edges = None
+        self._orientation = None
+        self._digest = None        # empreinte de la géométrie, voir cache.mesh_digest
+
+    def __getstate__(self):
+        # les coins se recalculent à la demande: inutile de les sérialiser (cache disque, processus)
+        state = self.__dict__.copy()
+        state['_corners'] = None
+        return state
+
+    @classmethod
+    def from_flat(cls, coordinates, indices, weld_tolerance: float = 1e-6):
+        """Builds a mesh from the flat lists returned by a Fusion TriangleMesh.
+
+        Arguments:
+        coordinates -- Flat sequence of node coordinates (x0, y0, z0, x1, ...).
+        indices -- Flat sequence of node indices, three per triangle.
+        weld_tolerance -- Distance under which two nodes are merged. Fusion
+                          duplicates the nodes along face boundaries, merging
+                          them gives a connected mesh.
+        """
+        vertices = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+        triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        if weld_tolerance > 0 and len(vertices):
+            keys = np.round(vertices / weld_tolerance).astype(np.int64)
+            keys, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+            vertices = vertices[first]
+            triangles = inverse.reshape(-1)[triangles]
+            # élimine les triangles dégénérés par la fusion des noeuds
+            valid = ((triangles[:, 0] != triangles[:, 1])
+                     & (triangles[:, 1] != triangles[:, 2])
+                     & (triangles[:, 2] != triangles[:, 0]))
+            triangles = triangles[valid]
+        return cls(vertices, triangles)
+
+    def transformed(self, rotation, pivot=(0.0, 0.0, 0.0)):
+        """Returns a copy of the mesh rotated around a pivot point.
+
+        The topology is unchanged, so the free edges and the orientation of the
+        original mesh are reused instead of being computed again.
+
+        Arguments:
+        rotation -- (3, 3) rotation matrix, see rotation_matrix.
+        pivot -- Point that stays in place.
+        """
+        pivot = np.asarray(pivot, dtype=np.float64)
+        mesh = HullMesh((self.vertices - pivot) @ np.asarray(rotation).T + pivot, self.triangles)
+        mesh._boundary_edges = self._boundary_edges
+        mesh._orientation = self.orientation
+        return mesh
+
+    @property
+    def corners(self):
+        """(m, 3, 3) array holding the coordinates of the three corners of each triangle."""
+        if self._corners is None:
+            self._corners = self.vertices[self.triangles]
+        return self._corners
+
+    @property
+    def boundary_edges(self):
+        """(k, 2) array of the node indices of the edges used by a single triangle.
+
+        For a hull surface these are the free edges (sheer line, open transom...):
+        if one of them is under the waterline, the hull takes water.
+        """
+        if self._boundary_edges is None:
+            edges = np.concatenate([self.triangles[:, [0, 1]],
+                                    self.triangles[:, [1, 2]],
+                                    self.triangles[:, [2, 0]]])
+            edges.sort(axis=1)
+            edges, counts = np.unique(edges, axis=0, return_counts=True)
+            self._boundary_edges = edges[counts == 1]
+        return self._boundary_edges
+
+    @property
+    def orientation(self) -> float:
+        """+1.0 if the triangle normals point into the hull, -1.0 if they point outwards.
+
+        Given by the sign of the volume enclosed between the surface and the
+        plane at the top of the mesh.
+        """
+        if self._orientation is None:
+            a, b, c = self.corners[:, 0], self.corners[:, 1], self.corners[:, 2]
+            s_xy = np.cross(b - a, c - a)[:, 2]
+            raw_volume = np.sum(s_xy * (self.z_max - (a[:, 2] + b[:, 2] + c[:, 2]) / 3))
+            self._orientation = 1.0 if raw_volume >= 0 else -1.0
+        return self._orientation
+
+    @property
+    def bounds(self):
+        """(min point, max point) of the mesh bounding box."""
+        return self.vertices.min(axis=0), self.vertices.max(axis=0)
+
+    @property
+    def z_min(self) -> float:
+        return float(self.vertices[:, 2].min())
+
+    @property
+    def z_max(self) -> float:
+        return float(self.vertices[:, 2].max())
+
+
+def rotation_matrix(heel: float, trim: float):
+    """Rotation of the hull by a heel angle, then a trim angle, in radians.
+
+    The heel turns the hull around the X axis and sinks its -Y side, the trim
+    turns it around the Y axis and sinks its +X end.
+    """
+    cos_heel, sin_heel = np.cos(heel), np.sin(heel)
+    cos_trim, sin_trim = np.cos(trim), np.sin(trim)
+    rot_x = np.array([[1.0, 0.0, 0.0],
+                      [0.0, cos_heel, -sin_heel],
+                      [0.0, sin_heel, cos_heel]])
+    rot_y = np.array([[cos_trim, 0.0, sin_trim],
+                      [0.0, 1.0, 0.0],
+                      [-sin_trim, 0.0, cos_trim]])
+    return rot_y @ rot_x
@@ -0,0 +1,340 @@
+import re
+from array import array
+from dataclasses import dataclass, field
+from itertools import compress
+
+import numpy as np
+
+__all__ = ['OffsetError', 'OffsetTable', 'OffsetHydrostatics', 'read_offsets', 'offset_hydrostatics']
+
+
+@dataclass
+class OffsetError:
+    """A line of the offset file that could not be read."""
+    line: int                  # numéro de ligne dans le fichier, à partir de 1
+    text: str
+    message: str
+
+
+@dataclass
+class OffsetTable:
+    """Points of an offset table, grouped by station (X coordinate).
+
+    The points are sorted by station, in file order within a station: the
+    points of station i are points[starts[i]:starts[i + 1]].
+    """
+    points: np.ndarray         # (n, 3)
+    stations: np.ndarray       # (k,) abscisse de chaque station
+    starts: np.ndarray         # (k + 1,) premier point de chaque station, puis n
+    errors: list = field(default_factory=list)
+    nb_errors: int = 0         # toutes les erreurs, même au-delà de celles conservées dans errors
+    nb_lines: int = 0
+
+    def station(self, i: int) -> np.ndarray:
+        """(m, 3) array of the points of station i."""
+        return self.points[self.starts[i]:self.starts[i + 1]]
+
+
+def read_offsets(file, delimiter: str = None, chunk_size: int = 1 << 22,
+                 station_tolerance: float = 0.0, max_errors: int = 100) -> OffsetTable:
+    """Reads an offset table: one point per line, as x, y, z columns.
+
+    The file is read by blocks of about chunk_size characters, each block being
+    converted in one go into a compact buffer of doubles, so that the memory
+    used besides the points themselves does not depend on the size of the file.
+    A line that cannot be read is recorded with its number and skipped. A first
+    line that is not numeric is taken as a header.
+
+    Arguments:
+    file -- Path of the file, or text file object.
+    delimiter -- Column separator. Detected from the first line if not given:
+                 ';' or tab (decimal comma allowed), else ','.
+    chunk_size -- Number of characters converted at once.
+    station_tolerance -- Points whose X differ by no more than this belong to the
+                         same station (0: exact equality, as in the file).
+    max_errors -- Number of errors kept in OffsetTable.errors.
+    """
+    if isinstance(file, str):
+        with open(file, 'r', encoding='utf-8-sig') as f:
+            return read_offsets(f, delimiter, chunk_size, station_tolerance, max_errors)
+
+    values = array('d')        # x, y, z à la suite: 24 octets par point
+    numbers = array('q')       # numéro de ligne de chaque point
+    errors = []
+    nb_errors = 0
+    line_number = 1
+
+    first_line = file.readline()
+    if delimiter is None:
+        delimiter = _detect_delimiter(first_line)
+    remainder = first_line
+    if first_line.strip() and _parse_lines([first_line], [1], delimiter, array('d'), array('q')):
+        remainder = ''  # en-tête
+        line_number = 2
+
+    while True:
+        data = file.read(chunk_size)
+        text, remainder = remainder + data, ''
+        if not data:
+            if not text:
+                break
+            block = text  # fin de fichier: dernière ligne, même sans retour à la ligne
+        else:
+            # la dernière ligne, incomplète, passe au bloc suivant
+            end = text.rfind('\n') + 1
+            block, remainder = text[:end], text[end:]
+        lines = block.split('\n')
+        if lines[-1] == '':
+            lines.pop()
+        bad = _parse_lines(lines, range(line_number, line_number + len(lines)), delimiter, values, numbers)
+        line_number += len(lines)
+        nb_errors += len(bad)
+        errors.extend(bad[:max_errors - len(errors)])
+        if not data:
+            break
+
+    points = np.frombuffer(values, dtype=np.float64).reshape(-1, 3)
+    lines = np.frombuffer(numbers, dtype=np.int64)
+    # regroupement des stations par tri, l'ordre du fichier étant conservé dans une station
+    sort = np.lexsort((lines, points[:, 0]))
+    points = points[sort]
+    new_station = np.diff(points[:, 0]) > station_tolerance
+    starts = np.concatenate([[0], np.flatnonzero(new_station) + 1, [len(points)]] if len(points) else [[0]]).astype(np.int64)
+    return OffsetTable(points=points, stations=points[starts[:-1], 0], starts=starts,
+                       errors=errors, nb_errors=nb_errors, nb_lines=line_number - 1)
+
+
+def _detect_delimiter(line: str) -> str:
+    for delimiter in (';', '\t'):
+        if delimiter in line:
+            return delimiter
+    return ','
+
+
+# Nombre décimal, tel que float() le lit (sans nan ni inf)
+_NUMBER = r'[+-]?(?:\d+(?:{0}\d*)?|{0}\d+)(?:[eE][+-]?\d+)?'
+_BLANK = '[ \t]*'
+_line_patterns = {}
+
+
+def _line_pattern(delimiter: str, decimal_comma: bool):
+    # Expression d'une ligne de trois nombres, compilée une fois par séparateur
+    if (delimiter, decimal_comma) not in _line_patterns:
+        number = _NUMBER.format('[.,]' if decimal_comma else '[.]')
+        separator = _BLANK + re.escape(delimiter) + _BLANK
+        ends = '[' + re.escape(delimiter) + ' \t\r\n]*'
+        _line_patterns[delimiter, decimal_comma] = re.compile(
+            _BLANK + number + separator + number + separator + number + ends)
+    return _line_patterns[delimiter, decimal_comma]
+
+
+def _parse_lines(lines, line_numbers, delimiter: str, values: array, numbers: array):
+    # Conversion d'un paquet de lignes. Les lignes vides ou qui n'ont pas trois
+    # colonnes sont écartées, les autres converties d'un coup par NumPy; si une
+    # valeur n'est pas un nombre, une expression régulière trie ces lignes et les
+    # bonnes sont converties d'un coup. Seules les lignes écartées sont reprises
+    # une à une, pour le message d'erreur. Renvoie la liste des erreurs.
+    if not lines:
+        return []
+    decimal_comma = delimiter != ','
+    ends = delimiter + '\r\n \t'
+    line_numbers = np.asarray(line_numbers, dtype=np.int64)
+    stripped = [line.rstrip(ends) for line in lines]
+    good = np.fromiter((line.count(delimiter) == 2 for line in stripped), dtype=bool, count=len(lines))
+    selected = list(compress(stripped, good))
+    converted = _convert(selected, delimiter, decimal_comma)
+    if converted is None:
+        match = _line_pattern(delimiter, decimal_comma).fullmatch
+        numeric = [match(line) is not None for line in selected]
+        good[good] = numeric
+        converted = _convert([line for line, ok in zip(selected, numeric) if ok], delimiter, decimal_comma)
+    # dépassements (1e999): repris ligne à ligne comme valeurs non finies
+    finite = np.isfinite(converted).all(axis=1)
+    values.frombytes(converted[finite].tobytes())
+    numbers.frombytes(line_numbers[good][finite].tobytes())
+    good[np.flatnonzero(good)[~finite]] = False
+
+    errors = []
+    for i in np.flatnonzero(~good).tolist():
+        line, number = lines[i], int(line_numbers[i])
+        if not line.strip():
+            continue
+        fields = stripped[i].split(delimiter)
+        if len(fields) != 3:
+            errors.append(OffsetError(number, line.rstrip('\r\n'), f'3 colonnes attendues, {len(fields)} trouvées'))
+            continue
+        try:
+            point = [float(f.replace(',', '.') if decimal_comma else f) for f in fields]
+        except ValueError:
+            errors.append(OffsetError(number, line.rstrip('\r\n'), 'valeur non numérique'))
+            continue
+        if not all(np.isfinite(point)):
+            errors.append(OffsetError(number, line.rstrip('\r\n'), 'valeur non finie'))
+            continue
+        # nombre que float() accepte mais que l'expression ne reconnaît pas ('1_000')
+        values.extend(point)
+        numbers.append(number)
+    return errors
+
+
+def _convert(lines, delimiter: str, decimal_comma: bool):
+    # (n, 3) valeurs de lignes de trois colonnes, ou None si une valeur n'est pas un nombre
+    text = delimiter.join(lines)
+    if decimal_comma:
+        text = text.replace(',', '.')
+    try:
+        return np.array(text.split(delimiter) if lines else [], dtype=np.float64).reshape(-1, 3)
+    except ValueError:
+        return None
+
+
+@dataclass
+class OffsetHydrostatics:
+    """Hydrostatics computed from the station polygons of an offset table.
+
+    One entry per waterline; section_areas holds the sectional-area curve of
+    each waterline, one column per station.
+    """
+    z_waterline: np.ndarray
+    draft: np.ndarray
+    volume: np.ndarray
+    displacement: np.ndarray
+    lcb: np.ndarray
+    kb: np.ndarray             # hauteur du centre de carène au-dessus du point le plus bas
+    waterplane_area: np.ndarray
+    lcf: np.ndarray
+    stations: np.ndarray
+    section_areas: np.ndarray  # (nombre de flottaisons, nombre de stations)
+    breadths: np.ndarray       # largeurs à la flottaison, même forme
+
+
+def offset_hydrostatics(table: OffsetTable, z_waterlines, half_breadths: bool = True,
+                        density: float = 1.0, rule: str = 'simpson',
+                        chunk_size: int = 1 << 22) -> OffsetHydrostatics:
+    """Computes the hydrostatics of the hull straight from its offset table.
+
+    The points of each station, in file order, describe the section contour.
+    Each contour is clipped at the waterline and its area and vertical moment
+    come from the line integrals of y dz and y z dz along it (the closing
+    segments, on the waterline and the centreline, add nothing to them). The
+    section properties are then integrated along X. Everything is computed for
+    every station and every waterline at once. A waterline above the top of a
+    station is taken at that top: the whole section is immersed and its
+    waterline breadth is its breadth at the top.
+
+    Arguments:
+    table -- The offset table, see read_offsets.
+    z_waterlines -- Heights of the waterlines.
+    half_breadths -- True if the stations only describe one side of the hull
+                     (half-breadths), which is then mirrored.
+    density -- Water density, for the displacement.
+    rule -- 'simpson' (unevenly spaced stations allowed) or 'trapezoid'.
+    chunk_size -- Maximum number of (waterline, segment) pairs computed at once.
+    """
+    z_waterlines = np.atleast_1d(np.asarray(z_waterlines, dtype=np.float64))
+    stations = table.stations
+    nb_stations = len(stations)
+    points = table.points
+    # segments entre points successifs d'une même station
+    station_of_point = np.repeat(np.arange(nb_stations), np.diff(table.starts))
+    keep = np.flatnonzero(station_of_point[1:] == station_of_point[:-1])
+    a, b = points[keep, 1:], points[keep + 1, 1:]
+    station_of_segment = station_of_point[keep]
+    # sommet de chaque station: au-dessus, la flottaison y est ramenée (section
+    # entière, largeur prise au sommet)
+    z_top = np.full(nb_stations, -np.inf)
+    np.maximum.at(z_top, station_of_point, points[:, 2])
+    z_top = z_top[station_of_segment]
+
+    areas = np.zeros((len(z_waterlines), nb_stations))
+    moments = np.zeros_like(areas)
+    breadths = np.zeros_like(areas)
+    ya, za, yb, zb = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(zb != za, (yb - ya) / (zb - za), 0.0)  # dy/dz le long du segment
+    step = max(1, chunk_size // max(1, len(keep)))
+    for first in range(0, len(z_waterlines), step):
+        z = np.minimum(z_waterlines[first:first + step, None], z_top)
+        # partie du segment sous la flottaison, parcourue dans le même sens
+        z0, z1 = np.minimum(za, z), np.minimum(zb, z)
+        y0, y1 = ya + (z0 - za) * slope, ya + (z1 - za) * slope
+        dz = z1 - z0
+        area = dz * (y0 + y1) / 2
+        moment = dz * (2 * y0 * z0 + y0 * z1 + y1 * z0 + 2 * y1 * z1) / 6
+        # points de la flottaison: segments qui la traversent ou la touchent par un
+        # bout (sommet de la station compris); un segment posé dessus donne ses deux bouts
+        touching = (np.minimum(za, zb) <= z) & (z <= np.maximum(za, zb))
+        y_cross = np.where(touching, ya + (z - za) * slope, np.nan)
+        y_end = np.where(touching & (za == zb), yb, np.nan)
+        for i in range(len(z)):
+            areas[first + i] = np.bincount(station_of_segment, area[i], nb_stations)
+            moments[first + i] = np.bincount(station_of_segment, moment[i], nb_stations)
+            breadths[first + i] = _breadths(np.concatenate([y_cross[i], y_end[i]]), station_of_segment,
+                                            nb_stations, half_breadths)
+
+    sign = np.sign(areas.sum(axis=1, keepdims=True))
+    sign[sign == 0] = 1.0
+    areas *= sign
+    moments *= sign
+    if half_breadths:
+        areas *= 2
+        moments *= 2
+
+    volume = _integrate(areas, stations, rule)
+    waterplane_area = _integrate(breadths, stations, rule)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lcb = np.where(volume > 0, _integrate(areas * stations, stations, rule) / volume, 0.0)
+        kb = np.where(volume > 0, _integrate(moments, stations, rule) / volume, 0.0)
+        lcf = np.where(waterplane_area > 0, _integrate(breadths * stations, stations, rule) / waterplane_area, 0.0)
+    z_keel = points[:, 2].min() if len(points) else 0.0
+    return OffsetHydrostatics(
+        z_waterline=z_waterlines,
+        draft=z_waterlines - z_keel,
+        volume=volume,
+        displacement=volume * density,
+        lcb=lcb,
+        kb=np.where(volume > 0, kb - z_keel, 0.0),
+        waterplane_area=waterplane_area,
+        lcf=lcf,
+        stations=stations,
+        section_areas=areas,
+        breadths=breadths,
+    )
+
+
+def _breadths(y_cross, station_of_segment, nb_stations: int, half_breadths: bool):
+    # Largeur à la flottaison de chaque station, d'après les points où le contour la traverse.
+    # y_cross peut porter plusieurs points par segment, à la suite: (n x segments).
+    valid = ~np.isnan(y_cross)
+    index = np.resize(station_of_segment, len(y_cross))[valid]
+    y = y_cross[valid]
+    high = np.full(nb_stations, -np.inf)
+    low = np.full(nb_stations, np.inf)
+    np.maximum.at(high, index, y)
+    np.minimum.at(low, index, y)
+    if half_breadths:
+        breadth = 2 * np.maximum(high, -low)
+    else:
+        breadth = high - low
+    return np.where(np.isfinite(breadth), breadth, 0.0)
+
+
+def _integrate(values, x, rule: str):
+    # Intégrale selon X (dernier axe) par la méthode des trapèzes ou de Simpson.
+    # Simpson est appliqué par paires d'intervalles, même inégaux; s'il reste un
+    # intervalle seul à la fin, il est intégré par un trapèze.
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < 2:
+        return np.zeros(values.shape[:-1])
+    h = np.diff(x)
+    if rule == 'trapezoid' or len(x) < 3:
+        return np.sum(h * (values[..., 1:] + values[..., :-1]) / 2, axis=-1)
+    if rule != 'simpson':
+        raise ValueError(f'Unknown integration rule: {rule}')
+    nb_pairs = (len(x) - 1) // 2
+    h0, h1 = h[0:2 * nb_pairs:2], h[1:2 * nb_pairs:2]
+    f0, f1, f2 = values[..., 0:2 * nb_pairs:2], values[..., 1:2 * nb_pairs:2], values[..., 2:2 * nb_pairs + 1:2]
+    total = np.sum((h0 + h1) / 6 * ((2 - h1 / h0) * f0 + (h0 + h1) ** 2 / (h0 * h1) * f1 + (2 - h0 / h1) * f2), axis=-1)
+    if (len(x) - 1) % 2:
+        total = total + h[-1] * (values[..., -1] + values[..., -2]) / 2
+    return total
@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .mesh import HullMesh
+
+__all__ = ['SharedMesh', 'run_on_mesh']
+
+
+class SharedMesh:
+    """Copy of a hull mesh in shared memory, readable by every worker process.
+
+    The workers attach to the buffer instead of receiving a pickled copy of
+    the mesh with each task. Use it as a context manager so the shared block
+    is always released.
+
+    Arguments:
+    mesh -- The hull mesh to share.
+    """
+
+    def __init__(self, mesh: HullMesh):
+        vertices, triangles = mesh.vertices, mesh.triangles
+        self._memory = shared_memory.SharedMemory(create=True, size=max(1, vertices.nbytes + triangles.nbytes))
+        buffer = self._memory.buf
+        np.ndarray(vertices.shape, np.float64, buffer)[:] = vertices
+        np.ndarray(triangles.shape, np.int64, buffer, offset=vertices.nbytes)[:] = triangles
+        # ce qu'il faut aux processus pour relire le maillage (pickle léger)
+        self.descriptor = (self._memory.name, len(vertices), len(triangles), mesh.orientation)
+
+    def close(self):
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Maillage partagé tel que vu par le processus courant (un par processus de travail).
+_worker_memory = None
+_worker_mesh = None
+
+
+def _attach(descriptor):
+    # Initialisation de chaque processus: vue en lecture seule sur le maillage partagé.
+    global _worker_memory, _worker_mesh
+    name, nb_vertices, nb_triangles, orientation = descriptor
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    vertices = np.ndarray((nb_vertices, 3), np.float64, _worker_memory.buf)
+    triangles = np.ndarray((nb_triangles, 3), np.int64, _worker_memory.buf, offset=vertices.nbytes)
+    vertices.flags.writeable = False
+    triangles.flags.writeable = False
+    _worker_mesh = HullMesh(vertices, triangles)
+    _worker_mesh._orientation = orientation
+
+
+def _run(task, arguments):
+    return task(_worker_mesh, *arguments)
+
+
+def run_on_mesh(task, mesh: HullMesh, arguments, workers: int = None, executable: str = None):
+    """Runs task(mesh, *args) for every args of arguments, on a process pool.
+
+    The mesh is put once in shared memory; results are yielded as soon as each
+    task finishes, as (index in arguments, result) pairs, in completion order.
+    task must be a module-level function so that the workers can import it.
+    If the caller stops iterating early (an exception, a cancelled job), the
+    tasks not yet started are dropped instead of being run to no purpose.
+
+    Arguments:
+    task -- Function called as task(mesh, *args).
+    mesh -- The hull mesh.
+    arguments -- Sequence of argument tuples, one per task.
+    workers -- Number of processes. Defaults to the number of CPUs; with 1 the
+               tasks run one after the other in the current process.
+    executable -- Python interpreter used to start the workers, for hosts
+                  (such as Fusion 360) whose sys.executable is not Python.
+    """
+    arguments = list(arguments)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(arguments) <= 1:
+        for index, args in enumerate(arguments):
+            yield index, task(mesh, *args)
+        return
+
+    import multiprocessing
+    context = multiprocessing.get_context('spawn')
+    if executable:
+        context.set_executable(executable)
+    with SharedMesh(mesh) as shared:
+        with ProcessPoolExecutor(max_workers=min(workers, len(arguments)), mp_context=context,
+                                 initializer=_attach, initargs=(shared.descriptor,)) as pool:
+            futures = {pool.submit(_run, task, args): index for index, args in enumerate(arguments)}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                # arrêt anticipé (annulation, erreur): les tâches pas encore commencées sont abandonnées
+                pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,194 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from .mesh import HullMesh
+
+__all__ = ['ReferenceHull', 'ReferenceHydrostatics', 'box_barge', 'wigley_hull', 'series60_like']
+
+
+@dataclass
+class ReferenceHydrostatics:
+    """Exact hydrostatics of a ReferenceHull at a given waterline."""
+    z_waterline: float
+    volume: float
+    center_of_buoyancy: tuple
+    waterplane_area: float
+    lcf: float
+    it: float                  # moments quadratiques de la flottaison autour de son centre
+    il: float
+    bmt: float
+    bml: float
+    max_section_area: float
+
+
+# Points de Gauss-Legendre: exacts pour les polynômes jusqu'au degré 39.
+_GAUSS_POINTS, _GAUSS_WEIGHTS = np.polynomial.legendre.leggauss(20)
+
+
+def _integral(f, a: float, b: float) -> float:
+    # Intégrale de Gauss sur [a, b]: exacte pour les formes polynomiales ci-dessous.
+    x = (a + b) / 2 + (b - a) / 2 * _GAUSS_POINTS
+    return float((b - a) / 2 * np.dot(_GAUSS_WEIGHTS, f(x)))
+
+
+class ReferenceHull:
+    """Hull whose half-breadth is the product of a waterline shape and a section shape.
+
+        y(x, z) = beam/2 . waterline(2x/length) . section(z/draft)
+
+    with x from -length/2 to length/2, the keel at z = 0 and both shapes
+    polynomial on each side of their break point (0 along the hull, 1 on the
+    vertical). Above the design draft the sides are vertical, up to a closed
+    deck at z = depth. The hydrostatics of such a hull are integrals of the two
+    shapes, computed exactly by Gauss quadrature: they are the reference values
+    the mesh engines are measured against.
+
+    Arguments:
+    name -- Name of the form, used in the benchmark reports.
+    length, beam, draft, depth -- Main dimensions, in mesh units.
+    waterline -- Vectorized function of xi in [-1, 1], 1 at its widest.
+    section -- Vectorized function of zeta in [0, 1], 1 at the design draft.
+    """
+
+    def __init__(self, name: str, length: float, beam: float, draft: float, depth: float,
+                 waterline, section):
+        self.name = name
+        self.length = float(length)
+        self.beam = float(beam)
+        self.draft = float(draft)
+        self.depth = float(depth)
+        self.waterline = waterline
+        self.section = lambda zeta: section(np.minimum(zeta, 1.0))
+        # intégrales de la forme de flottaison, par moitié (formes définies par morceaux)
+        halves = ((-1.0, 0.0), (0.0, 1.0))
+        self._f0 = sum(_integral(waterline, a, b) for a, b in halves)
+        self._f1 = sum(_integral(lambda xi: xi * waterline(xi), a, b) for a, b in halves)
+        self._f2 = sum(_integral(lambda xi: xi * xi * waterline(xi), a, b) for a, b in halves)
+        self._f3 = sum(_integral(lambda xi: waterline(xi) ** 3, a, b) for a, b in halves)
+        self._f_max = float(waterline(np.linspace(-1.0, 1.0, 2001)).max())
+
+    def half_breadth(self, x, z):
+        """Exact half-breadth at (x, z)."""
+        xi = 2 * np.asarray(x, dtype=np.float64) / self.length
+        zeta = np.asarray(z, dtype=np.float64) / self.draft
+        return self.beam / 2 * self.waterline(xi) * self.section(zeta)
+
+    def mesh(self, nb_stations: int, nb_waterlines: int = None) -> HullMesh:
+        """Closed triangle mesh of the hull, deck included.
+
+        Arguments:
+        nb_stations -- Number of intervals along the length.
+        nb_waterlines -- Number of intervals from the keel to the design draft
+                         (which is always a mesh line). Defaults to nb_stations/4.
+        """
+        nb_waterlines = nb_waterlines or max(2, nb_stations // 4)
+        x = np.linspace(-self.length / 2, self.length / 2, nb_stations + 1)
+        below = np.linspace(0.0, self.draft, nb_waterlines + 1)
+        nb_above = math.ceil(nb_waterlines * (self.depth - self.draft) / self.draft)
+        z = np.concatenate([below, np.linspace(self.draft, self.depth, nb_above + 1)[1:]])
+        y = self.half_breadth(x[:, None], z[None, :])
+
+        # un contour fermé par station: tribord du pont à la quille, puis bâbord
+        # de la quille au pont, refermé par le pont
+        nb_z = len(z)
+        ring_y = np.concatenate([y[:, ::-1], -y], axis=1)
+        ring_z = np.concatenate([z[::-1], z])
+        vertices = np.stack([np.repeat(x, 2 * nb_z), ring_y.ravel(), np.tile(ring_z, len(x))], axis=1)
+        nb_ring = 2 * nb_z
+        i, k = np.meshgrid(np.arange(nb_stations), np.arange(nb_ring), indexing='ij')
+        a = i * nb_ring + k
+        b = a + nb_ring
+        c = (i + 1) * nb_ring + (k + 1) % nb_ring
+        d = i * nb_ring + (k + 1) % nb_ring
+        triangles = [np.stack([a, b, c], axis=-1).reshape(-1, 3), np.stack([a, c, d], axis=-1).reshape(-1, 3)]
+        # extrémités planes (tableau, bout du caisson) quand la forme ne s'y referme pas
+        fan = np.arange(1, nb_ring - 1)
+        if np.any(y[0] > 0):
+            triangles.append(np.stack([np.zeros_like(fan), fan, fan + 1], axis=1))
+        if np.any(y[-1] > 0):
+            last = nb_stations * nb_ring
+            triangles.append(np.stack([np.full_like(fan, last), last + fan + 1, last + fan], axis=1))
+        # les noeuds confondus (quille, étraves pointues) sont fusionnés par from_flat
+        return HullMesh.from_flat(vertices.ravel(), np.concatenate(triangles).ravel())
+
+    def hydrostatics(self, z_waterline: float = None) -> ReferenceHydrostatics:
+        """Exact hydrostatics at a waterline between the keel and the deck (design draft by default)."""
+        t = self.draft if z_waterline is None else float(z_waterline)
+        tau = t / self.draft
+        g0 = _integral(self.section, 0.0, min(tau, 1.0)) + max(tau - 1.0, 0.0)
+        g1 = (_integral(lambda zeta: zeta * self.section(zeta), 0.0, min(tau, 1.0))
+              + max(tau * tau - 1.0, 0.0) / 2)
+        g_wl = float(self.section(np.array(tau)))
+        half_length = self.length / 2
+
+        volume = self.beam * half_length * self._f0 * self.draft * g0
+        lcb = half_length * self._f1 / self._f0
+        vcb = self.draft * g1 / g0 if g0 > 0 else 0.0
+        area = self.beam * g_wl * half_length * self._f0
+        lcf = lcb
+        it = 2 / 3 * (self.beam / 2 * g_wl) ** 3 * half_length * self._f3
+        il = self.beam * g_wl * half_length ** 3 * self._f2 - area * lcf ** 2
+        return ReferenceHydrostatics(
+            z_waterline=t,
+            volume=volume,
+            center_of_buoyancy=(lcb, 0.0, vcb),
+            waterplane_area=area,
+            lcf=lcf,
+            it=it,
+            il=il,
+            bmt=it / volume if volume > 0 else 0.0,
+            bml=il / volume if volume > 0 else 0.0,
+            max_section_area=self.beam * self._f_max * self.draft * g0,
+        )
+
+    def section_areas(self, stations, z_waterline: float = None):
+        """Exact immersed area of the sections X = station."""
+        t = self.draft if z_waterline is None else float(z_waterline)
+        tau = t / self.draft
+        g0 = _integral(self.section, 0.0, min(tau, 1.0)) + max(tau - 1.0, 0.0)
+        xi = 2 * np.asarray(stations, dtype=np.float64) / self.length
+        return self.beam * self.waterline(np.clip(xi, -1.0, 1.0)) * self.draft * g0
+
+    def righting_arm(self, heel: float, z_center_of_gravity: float, z_waterline: float = None):
+        """Exact righting arm of a wall-sided hull, None if not wall-sided.
+
+        GZ = sin(heel).(GM + BMt/2.tan²(heel)) holds as long as the sides are
+        vertical where the waterline crosses them: here, for a box whose deck
+        edge and bilge both stay clear of the water.
+        """
+        if self.waterline(np.array([-1.0]))[0] < 1 or self.section(np.array([0.0]))[0] < 1:
+            return None
+        hydro = self.hydrostatics(z_waterline)
+        t = hydro.z_waterline
+        if abs(math.tan(heel)) * self.beam / 2 > min(t, self.depth - t):
+            return None
+        gm = hydro.center_of_buoyancy[2] + hydro.bmt - z_center_of_gravity
+        return math.sin(heel) * (gm + hydro.bmt / 2 * math.tan(heel) ** 2)
+
+
+def box_barge(length: float = 1000.0, beam: float = 400.0, draft: float = 150.0,
+              depth: float = 300.0) -> ReferenceHull:
+    """Rectangular barge: every hydrostatic property has a closed form, GZ included."""
+    return ReferenceHull('box', length, beam, draft, depth,
+                         lambda xi: np.ones_like(xi), lambda zeta: np.ones_like(zeta))
+
+
+def wigley_hull(length: float = 1000.0, beam: float = 100.0, draft: float = 62.5,
+                depth: float = 100.0) -> ReferenceHull:
+    """Wigley hull, y = B/2.(1 - (2x/L)²).(1 - (z/T - 1)²): Cb = 4/9."""
+    return ReferenceHull('wigley', length, beam, draft, depth,
+                         lambda xi: 1 - xi ** 2, lambda zeta: 1 - (1 - zeta) ** 2)
+
+
+def series60_like(length: float = 1000.0, beam: float = 133.0, draft: float = 53.0,
+                  depth: float = 90.0) -> ReferenceHull:
+    """Cargo-ship form close to a Series 60 parent (Cb 0.65, Cm 0.92, fuller aft body).
+
+    Fine entry 1 - xi², fuller run 1 - |xi|³, and a hard bilge section
+    1 - (1 - zeta)^12: polynomial shapes, so that the reference values are exact.
+    """
+    return ReferenceHull('series60', length, beam, draft, depth,
+                         lambda xi: np.where(xi >= 0, 1 - xi ** 2, 1 - np.abs(xi) ** 3),
+                         lambda zeta: 1 - (1 - zeta) ** 12)
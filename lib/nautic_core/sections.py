@@ -0,0 +1,450 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from .clipping import clip_below, cut_by_x_planes
+from .mesh import HullMesh
+
+__all__ = ['Sections', 'MaxSection', 'AreaCurve', 'slice_sections', 'section_areas', 'section_area_table',
+           'max_section', 'area_curve', 'PROGRESS_STATIONS']
+
+# Stations coupées par passe quand area_curve suit sa progression: assez pour
+# garder le calcul vectorisé, assez peu pour pouvoir l'arrêter rapidement.
+PROGRESS_STATIONS = 16
+
+
+@dataclass
+class Sections:
+    """Immersed transverse sections of a hull, cut at several stations.
+
+    The section curves are stored as oriented (y, z) segments; polygons()
+    chains them into closed polygons when the outline itself is needed.
+    """
+    stations: np.ndarray       # positions X des sections
+    areas: np.ndarray          # aire immergée de chaque section
+    z_waterline: float
+    starts: np.ndarray         # (k, 2) origine (y, z) de chaque segment
+    ends: np.ndarray           # (k, 2) extrémité (y, z) de chaque segment
+    station_index: np.ndarray  # (k,) section à laquelle appartient chaque segment
+
+    def polygons(self, i: int):
+        """Chains the segments of section i into polygons.
+
+        :returns:
+            A list of (n, 2) arrays of (y, z) points. A polygon whose first and
+            last points lie on the waterline is closed by the waterline itself.
+        """
+        selected = np.flatnonzero(self.station_index == i)
+        starts = [tuple(point) for point in self.starts[selected]]
+        ends = [tuple(point) for point in self.ends[selected]]
+        next_segment = {start: k for k, start in enumerate(starts)}
+        end_points = set(ends)
+        # les contours ouverts partent de la flottaison, on les parcourt en premier
+        first = [k for k, start in enumerate(starts) if start not in end_points]
+        first += [k for k in range(len(starts)) if k not in first]
+        visited = set()
+        polygons = []
+        for k in first:
+            if k in visited:
+                continue
+            points = [starts[k]]
+            while k is not None and k not in visited:
+                visited.add(k)
+                points.append(ends[k])
+                k = next_segment.get(ends[k])
+            polygons.append(np.array(points))
+        return polygons
+
+
+def slice_sections(mesh: HullMesh, z_waterline: float, stations) -> Sections:
+    """Cuts the immersed part of the hull by all the planes X = station at once.
+
+    Every (triangle, station) pair whose triangle spans the station is found
+    from the sorted stations, and all the pairs are cut in one vectorized
+    pass. The areas come from the shoelace formula summed segment by segment,
+    plus the waterline segments closing the open contours.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    z_waterline -- Height of the waterline.
+    stations -- X positions of the sections, in any order.
+    """
+    z = float(z_waterline)
+    stations = np.atleast_1d(np.asarray(stations, dtype=np.float64))
+    nb = len(stations)
+    pieces = clip_below(mesh.corners, z)
+
+    # paires (triangle, section) telles que x_min <= station < x_max
+    order = np.argsort(stations)
+    sorted_stations = stations[order]
+    low = np.searchsorted(sorted_stations, pieces[:, :, 0].min(axis=1), side='left')
+    high = np.searchsorted(sorted_stations, pieces[:, :, 0].max(axis=1), side='left')
+    counts = high - low
+    triangle = np.repeat(np.arange(len(pieces)), counts)
+    rank = np.repeat(low - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+    pair_station = order[rank]
+
+    p, q, kept = cut_by_x_planes(pieces[triangle], stations[pair_station])
+    # les segments de longueur nulle (sommet posé sur la flottaison) ne servent à rien
+    useful = np.any(p != q, axis=1)
+    station_index = pair_station[kept][useful]
+    starts, ends = p[useful, 1:], q[useful, 1:]
+
+    # formule des trapèzes croisés (shoelace) segment par segment
+    shoelace = 0.5 * (starts[:, 0] * ends[:, 1] - ends[:, 0] * starts[:, 1])
+    # (astype: sans aucun segment, bincount renvoie des entiers)
+    areas = np.bincount(station_index, shoelace, minlength=nb).astype(np.float64)
+    # contours ouverts: ils se referment par la flottaison, de leur fin vers leur
+    # début, ce qui ajoute z.(y_fin - y_début)/2. Sommé sur tous les segments,
+    # les extrémités communes à deux segments s'annulent: il ne reste que celles
+    # des contours ouverts, sans avoir à chaîner les segments.
+    areas += 0.5 * z * np.bincount(station_index, ends[:, 0] - starts[:, 0], minlength=nb)
+
+    return Sections(
+        stations=stations,
+        areas=mesh.orientation * areas,
+        z_waterline=z,
+        starts=starts,
+        ends=ends,
+        station_index=station_index,
+    )
+
+
+def section_areas(mesh: HullMesh, z_waterline: float, stations):
+    """Computes the immersed area of the transverse sections X = station.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    z_waterline -- Height of the waterline.
+    stations -- X positions of the sections.
+
+    :returns:
+        Array of the section areas, one per station.
+    """
+    return slice_sections(mesh, z_waterline, stations).areas
+
+
+def section_area_table(mesh: HullMesh, x: float, z_waterlines):
+    """Computes the immersed area of the section X = x for several waterlines.
+
+    The section is cut once, then its segments are truncated at each waterline
+    and integrated as the sum of (T - z) dy.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    x -- Position of the section.
+    z_waterlines -- Heights of the waterlines.
+
+    :returns:
+        Array of the section areas, one per waterline.
+    """
+    p, q, _ = cut_by_x_planes(mesh.corners, x)
+    z = np.atleast_1d(np.asarray(z_waterlines, dtype=np.float64))[:, None]
+    # on ramène chaque segment à sa partie sous la flottaison
+    low = np.where(p[:, 2] <= q[:, 2], 0.0, 1.0)
+    z_low = np.minimum(p[:, 2], q[:, 2])
+    z_high = np.maximum(p[:, 2], q[:, 2])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.clip(np.where(z_high > z_low, (z - z_low) / (z_high - z_low), 1.0), 0.0, 1.0)
+    fraction = np.where(z >= z_low, fraction, 0.0)
+    # extrémités du morceau immergé, paramétrées depuis le point bas
+    t0 = low
+    t1 = low + (1 - 2 * low) * fraction
+    y0 = p[:, 1] + t0 * (q[:, 1] - p[:, 1])
+    y1 = p[:, 1] + t1 * (q[:, 1] - p[:, 1])
+    z0 = p[:, 2] + t0 * (q[:, 2] - p[:, 2])
+    z1 = p[:, 2] + t1 * (q[:, 2] - p[:, 2])
+    # le morceau est parcouru du point bas vers le haut: on rétablit le sens du segment
+    sense = 1 - 2 * low
+    return mesh.orientation * np.sum(sense * (y1 - y0) * (z - (z0 + z1) / 2), axis=1)
+
+
+@dataclass
+class MaxSection:
+    """Position and area of the largest immersed section."""
+    position: float
+    area: float
+    position_error: float      # demi-largeur de l'intervalle final contenant le maximum
+    area_error: float          # écart d'aire correspondant, estimé par la courbure
+    evaluations: int           # nombre de coupes réelles faites pendant l'affinage
+
+
+def max_section(mesh: HullMesh, z_waterline: float, stations, areas=None,
+                tolerance: float = None) -> MaxSection:
+    """Finds the largest immersed section without creating any geometry.
+
+    A monotone cubic (PCHIP) interpolant of the area curve gives a first
+    estimate of the maximum between the neighbours of the largest sample.
+    A bounded Brent search, started from that estimate, then refines it with
+    real slices of the mesh inside that interval only.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    z_waterline -- Height of the waterline.
+    stations -- X positions of the sampled sections, in increasing order.
+    areas -- Areas of these sections, if already computed.
+    tolerance -- Wanted precision on the position. Defaults to 1e-4 of the
+                 sampled length.
+
+    :returns:
+        The MaxSection. The errors assume a single maximum between the
+        neighbours of the largest sample, and do not include the mesh error.
+    """
+    stations = np.asarray(stations, dtype=np.float64)
+    if areas is None:
+        areas = section_areas(mesh, z_waterline, stations)
+    areas = np.asarray(areas, dtype=np.float64)
+    if tolerance is None:
+        tolerance = 1e-4 * (stations[-1] - stations[0])
+
+    i = int(np.argmax(areas))
+    low, high = stations[max(i - 1, 0)], stations[min(i + 1, len(stations) - 1)]
+    spline = _pchip(stations, areas)
+    x_start, _, _, _ = _bounded_maximum(lambda x: float(spline(x)), low, high, stations[i], tolerance)
+
+    slice_area = lambda x: float(section_areas(mesh, z_waterline, [x])[0])
+    position, area, (low, high), evaluations = _bounded_maximum(slice_area, low, high, x_start, tolerance)
+
+    # près du maximum, A(x) ~ A_max - |A''|.dx²/2
+    step = (high - low) / 2
+    h = max(step, tolerance)
+    curvature = abs(float(spline(position - h)) - 2 * float(spline(position)) + float(spline(position + h))) / h ** 2
+    return MaxSection(
+        position=float(position),
+        area=float(area),
+        position_error=float(step),
+        area_error=float(0.5 * curvature * step ** 2),
+        evaluations=evaluations,
+    )
+
+
+@dataclass
+class AreaCurve:
+    """Sectional-area curve of the immersed hull, with its largest section.
+
+    volume is the integral of the curve (trapezoidal rule on evenly spaced
+    stations, Simpson's rule on adaptive ones); compared with the volume of
+    the mesh, it checks that the stations are close enough. volume_error is,
+    for adaptive stations only, the difference between the Simpson and
+    trapezoidal volumes: a conservative estimate, the Simpson volume is
+    usually much closer.
+    """
+    stations: np.ndarray
+    areas: np.ndarray
+    max_section: MaxSection
+    volume: float = None
+    volume_error: float = None
+
+
+def area_curve(mesh: HullMesh, z_waterline: float, nb_sections: int, tolerance: float = None,
+               initial_sections: int = 8, progress=None) -> AreaCurve:
+    """Computes the sectional-area curve over the immersed length of the hull.
+
+    Without tolerance the stations are evenly spaced. With a tolerance, the
+    curve starts from a coarse grid and only the intervals that are not
+    accurate enough are bisected, until both errors of every interval are
+    within the tolerance:
+    - volume: the trapezoidal and Simpson volumes of the interval differ by
+      less than tolerance x (volume share of the interval, by length);
+    - shape: the area at the middle of the interval is within
+      tolerance x (largest area) of the chord of its ends.
+    Stations then gather where the area changes fastest (bow, stern, bilge
+    keels...) and the curve needs far fewer slices for the same accuracy.
+    All the midpoints of one bisection round are sliced in one pass.
+
+    Arguments:
+    mesh -- The hull surface mesh.
+    z_waterline -- Height of the waterline.
+    nb_sections -- Number of intervals: nb_sections + 1 evenly spaced stations
+                   from the aft to the fore end of the immersed hull. With a
+                   tolerance, the maximum number of intervals: the ones with
+                   the largest errors are refined first.
+    tolerance -- Relative tolerance of the adaptive placement, None for evenly
+                 spaced stations.
+    initial_sections -- Number of intervals of the starting grid, with a tolerance.
+    progress -- Optional function called as progress(done, total) after each
+                pass of slices, done stations out of at most total. The
+                stations are then sliced PROGRESS_STATIONS at a time. An
+                exception it raises stops the computation and is passed on.
+    """
+    immersed = clip_below(mesh.corners, z_waterline).reshape(-1, 3)
+    if len(immersed) == 0:
+        raise ValueError('The hull is not immersed at this waterline')
+    x_aft, x_fore = float(immersed[:, 0].min()), float(immersed[:, 0].max())
+    # une section exactement sur le bout avant ne coupe aucun triangle: elle
+    # est prise juste en deçà, pour la bonne aire d'un tableau avant
+    inside = 1e-9 * (x_fore - x_aft)
+
+    total = nb_sections + 1
+    done = 0
+
+    def areas_at(x):
+        nonlocal done
+        x = np.minimum(x, x_fore - inside)
+        if progress is None:
+            return section_areas(mesh, z_waterline, x)
+        areas = []
+        for first in range(0, len(x), PROGRESS_STATIONS):
+            areas.append(section_areas(mesh, z_waterline, x[first:first + PROGRESS_STATIONS]))
+            done += len(areas[-1])
+            progress(min(done, total), total)
+        return np.concatenate(areas)
+
+    if tolerance is None:
+        stations = np.linspace(x_aft, x_fore, nb_sections + 1)
+        areas = areas_at(stations)
+        volume = float(np.sum(np.diff(stations) * (areas[1:] + areas[:-1]) / 2))
+        return AreaCurve(stations, areas, max_section(mesh, z_waterline, stations, areas), volume)
+
+    stations, areas, volume, volume_error = _adaptive_stations(
+        areas_at, x_aft, x_fore, max(1, min(initial_sections, nb_sections // 2)), nb_sections, tolerance)
+    return AreaCurve(stations, areas, max_section(mesh, z_waterline, stations, areas), volume, volume_error)
+
+
+def _adaptive_stations(areas_at, x_aft: float, x_fore: float, initial: int, max_sections: int, tolerance: float):
+    # Bisection adaptative (Simpson): à chaque tour, le milieu de chaque
+    # intervalle encore à vérifier est coupé (toutes les coupes du tour en une
+    # passe), puis l'intervalle est accepté ou partagé en deux.
+    # Renvoie (stations triées, aires, volume, estimation de l'erreur sur le volume).
+    length = x_fore - x_aft
+    x = np.linspace(x_aft, x_fore, initial + 1)
+    y = areas_at(x)
+    all_x, all_y = [x], [y]
+    a, b, fa, fb = x[:-1], x[1:], y[:-1], y[1:]
+    budget = max_sections - initial
+    volume = volume_error = 0.0
+    while len(a):
+        if len(a) > budget:
+            # plus assez de coupes pour tout vérifier: les intervalles restants sont gardés tels quels
+            volume += float(np.sum((b - a) * (fa + fb) / 2))
+            break
+        m = (a + b) / 2
+        fm = areas_at(m)
+        all_x.append(m)
+        all_y.append(fm)
+        budget -= len(a)
+        width = b - a
+        trapezoid = width / 4 * (fa + 2 * fm + fb)
+        simpson = width / 6 * (fa + 4 * fm + fb)
+        # références: volume (trapèzes) et aire maxi de tout ce qui est déjà coupé
+        xs, ys = np.concatenate(all_x), np.concatenate(all_y)
+        order = np.argsort(xs)
+        reference_volume = float(np.sum(np.diff(xs[order]) * (ys[order][1:] + ys[order][:-1]) / 2))
+        reference_area = float(ys.max())
+        volume_excess = np.abs(simpson - trapezoid) / (tolerance * max(reference_volume, 1e-300) * width / length)
+        shape_excess = np.abs(fm - (fa + fb) / 2) / (tolerance * max(reference_area, 1e-300))
+        excess = np.maximum(volume_excess, shape_excess)
+        refine = excess > 1
+        if np.count_nonzero(refine) * 2 > budget:
+            # budget limité: on partage d'abord les intervalles les plus en erreur
+            worst = np.argsort(-excess)[:budget // 2]
+            refine = np.zeros_like(refine)
+            refine[worst] = excess[worst] > 1
+        accepted = ~refine
+        volume += float(np.sum(simpson[accepted]))
+        volume_error += float(np.sum(np.abs(simpson - trapezoid)[accepted]))
+        a, b, fa, fb, m, fm = a[refine], b[refine], fa[refine], fb[refine], m[refine], fm[refine]
+        a, b = np.concatenate([a, m]), np.concatenate([m, b])
+        fa, fb = np.concatenate([fa, fm]), np.concatenate([fm, fb])
+    xs, ys = np.concatenate(all_x), np.concatenate(all_y)
+    order = np.argsort(xs)
+    return xs[order], ys[order], volume, volume_error
+
+
+def _pchip(x, y):
+    # Interpolation cubique monotone par morceaux (Fritsch-Carlson): pas de
+    # dépassement entre les points, le maximum reste près des échantillons.
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    slopes = np.zeros(len(x))
+    if len(x) > 2:
+        w1 = 2 * h[1:] + h[:-1]
+        w2 = h[1:] + 2 * h[:-1]
+        same_sign = delta[:-1] * delta[1:] > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+        slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+        slopes[0] = _pchip_end_slope(h[0], h[1], delta[0], delta[1])
+        slopes[-1] = _pchip_end_slope(h[-1], h[-2], delta[-1], delta[-2])
+    elif len(x) == 2:
+        slopes[:] = delta[0]
+
+    def evaluate(t):
+        k = np.clip(np.searchsorted(x, t, side='right') - 1, 0, len(x) - 2)
+        s = (t - x[k]) / h[k]
+        h00 = (1 + 2 * s) * (1 - s) ** 2
+        h10 = s * (1 - s) ** 2
+        h01 = s * s * (3 - 2 * s)
+        h11 = s * s * (s - 1)
+        return h00 * y[k] + h10 * h[k] * slopes[k] + h01 * y[k + 1] + h11 * h[k] * slopes[k + 1]
+    return evaluate
+
+
+def _pchip_end_slope(h0, h1, delta0, delta1):
+    # Pente d'extrémité à trois points, ramenée à zéro ou bornée si elle
+    # casserait la monotonie.
+    slope = ((2 * h0 + h1) * delta0 - h0 * delta1) / (h0 + h1)
+    if slope * delta0 <= 0:
+        return 0.0
+    if delta0 * delta1 <= 0 and abs(slope) > abs(3 * delta0):
+        return 3 * delta0
+    return slope
+
+
+def _bounded_maximum(f, a: float, b: float, x0: float, tolerance: float, max_iterations: int = 100):
+    # Méthode de Brent (section dorée + interpolation parabolique) pour le
+    # maximum de f sur [a, b], à partir du point x0.
+    # Renvoie (x, f(x), intervalle final, nombre d'évaluations de f).
+    golden = 0.5 * (3 - 5 ** 0.5)
+    x = w = v = min(max(x0, a), b)
+    fx = fw = fv = -f(x)
+    evaluations = 1
+    d = e = 0.0
+    for _ in range(max_iterations):
+        middle = (a + b) / 2
+        tol1 = tolerance / 2 + 1e-12 * abs(x)
+        tol2 = 2 * tol1
+        if abs(x - middle) <= tol2 - (b - a) / 2:
+            break
+        if abs(e) > tol1:
+            r = (x - w) * (fx - fv)
+            q = (x - v) * (fx - fw)
+            p = (x - v) * q - (x - w) * r
+            q = 2 * (q - r)
+            if q > 0:
+                p = -p
+            q = abs(q)
+            previous_e, e = e, d
+            if abs(p) >= abs(0.5 * q * previous_e) or p <= q * (a - x) or p >= q * (b - x):
+                # pas parabolique refusé: on prend la section dorée
+                e = (a - x) if x >= middle else (b - x)
+                d = golden * e
+            else:
+                d = p / q
+                if x + d - a < tol2 or b - (x + d) < tol2:
+                    d = math.copysign(tol1, middle - x)
+        else:
+            e = (a - x) if x >= middle else (b - x)
+            d = golden * e
+        u = x + d if abs(d) >= tol1 else x + math.copysign(tol1, d)
+        fu = -f(u)
+        evaluations += 1
+        if fu <= fx:
+            if u < x:
+                b = x
+            else:
+                a = x
+            v, w, x = w, x, u
+            fv, fw, fx = fw, fx, fu
+        else:
+            if u < x:
+                a = u
+            else:
+                b = u
+            if fu <= fw or w == x:
+                v, w = w, u
+                fv, fw = fw, fu
+            elif fu <= fv or v == x or v == w:
+                v, fv = u, fu
+    return x, -fx, (a, b), evaluations
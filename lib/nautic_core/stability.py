@@ -0,0 +1,223 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from .equilibrium import solve_draft, solve_floating_position
+from .mesh import HullMesh
+from .parallel import run_on_mesh
+
+__all__ = ['RightingArmCurve', 'CrossCurves', 'heel_grid', 'righting_arm', 'gz_curve', 'kn_run', 'cross_curves']
+
+
+@dataclass
+class RightingArmCurve:
+    """Righting arm (GZ) curve, one array entry per heel angle (radians).
+
+    A positive GZ brings the hull back upright. The curve is only meaningful
+    while is_flooded is False: past that angle a free edge of the surface
+    (deck edge, open transom) is under water.
+    """
+    heels: np.ndarray
+    gz: np.ndarray
+    z_waterline: np.ndarray
+    trim: np.ndarray
+    converged: np.ndarray
+    is_flooded: np.ndarray
+
+    @property
+    def max_gz(self):
+        """(heel, gz) of the largest righting arm before flooding, or None."""
+        valid = np.flatnonzero(~self.is_flooded)
+        if len(valid) == 0:
+            return None
+        i = valid[np.argmax(self.gz[valid])]
+        return float(self.heels[i]), float(self.gz[i])
+
+    @property
+    def flooding_angle(self):
+        """First heel at which the hull takes water, or None."""
+        flooded = np.flatnonzero(self.is_flooded)
+        return float(self.heels[flooded[0]]) if len(flooded) else None
+
+    @property
+    def vanishing_angle(self):
+        """Angle of vanishing stability: first heel past upright where GZ turns negative
+        (interpolated between the two computed heels), or None."""
+        negative = np.flatnonzero((self.gz < 0) & (self.heels > 0))
+        if len(negative) == 0:
+            return None
+        i = negative[0]
+        if i == 0 or self.gz[i - 1] < 0:
+            return float(self.heels[i])
+        h0, h1, g0, g1 = self.heels[i - 1], self.heels[i], self.gz[i - 1], self.gz[i]
+        return float(h0 + (h1 - h0) * g0 / (g0 - g1))
+
+
+def heel_grid(heel_max: float, heel_step: float) -> np.ndarray:
+    """Heel angles from 0 to heel_max by heel_step, heel_max included.
+
+    The grid never goes past heel_max: when heel_max is not a multiple of the
+    step, it is added as the last angle.
+    """
+    # tolérance relative: 30° / 5° tombe juste malgré les arrondis des radians
+    nb_steps = int(np.floor(heel_max / heel_step + 1e-9))
+    heels = heel_step * np.arange(nb_steps + 1, dtype=np.float64)
+    if heel_max - heels[-1] > 1e-9 * heel_step:
+        heels = np.append(heels, heel_max)
+    return heels
+
+
+def righting_arm(mesh: HullMesh, volume: float, center_of_gravity, heel: float, tolerance: float = 1e-6):
+    """Solves sinkage and trim at a fixed heel and returns the righting arm.
+
+    :returns:
+        (gz, z_waterline, trim, converged, is_flooded)
+    """
+    position = solve_floating_position(mesh, volume, center_of_gravity, tolerance, heel=heel)
+    return (-position.heeling_moment / volume, position.z_waterline, position.trim,
+            position.converged, position.hydrostatics.is_flooded)
+
+
+def gz_curve(mesh: HullMesh, volume: float, center_of_gravity, heels, tolerance: float = 1e-6,
+             workers: int = None, executable: str = None, progress=None) -> RightingArmCurve:
+    """Computes the righting arm curve over a set of heel angles.
+
+    The heel angles are independent: they are spread over a process pool
+    sharing a single read-only copy of the mesh (see run_on_mesh).
+
+    Arguments:
+    mesh -- The hull surface mesh, upright.
+    volume -- Displaced volume, in mesh units.
+    center_of_gravity -- (x, y, z) of the centre of gravity of the upright hull.
+    heels -- Heel angles, in radians.
+    tolerance -- Relative tolerance of each equilibrium.
+    workers -- Number of processes, see run_on_mesh.
+    executable -- Python interpreter for the workers, see run_on_mesh.
+    progress -- Optional function called as progress(done, total) after each heel.
+                An exception it raises stops the computation (the remaining
+                heels are dropped) and is passed on.
+    """
+    heels = np.atleast_1d(np.asarray(heels, dtype=np.float64))
+    g = tuple(float(v) for v in center_of_gravity)
+    results = [None] * len(heels)
+    arguments = [(volume, g, float(heel), tolerance) for heel in heels]
+    for done, (index, result) in enumerate(run_on_mesh(righting_arm, mesh, arguments, workers, executable), 1):
+        results[index] = result
+        if progress:
+            progress(done, len(heels))
+    gz, z_waterline, trim, converged, is_flooded = (np.array(column) for column in zip(*results))
+    return RightingArmCurve(heels, gz, z_waterline, trim, converged, is_flooded)
+
+
+@dataclass
+class CrossCurves:
+    """Cross curves of stability: KN for every displacement (rows) and heel (columns).
+
+    KN is the righting arm of a centre of gravity at the pole K, on the
+    centreline at the bottom of the mesh and at the longitudinal position lcg
+    of its row: for a real centre of gravity at height KG above K,
+    GZ = KN - KG.sin(heel). Cells still being computed hold NaN.
+    """
+    volumes: np.ndarray        # (n,) volumes de carène
+    heels: np.ndarray          # (m,) gîtes, en radians
+    lcg: np.ndarray            # (n,) abscisse du pôle (centre de carène droit par défaut)
+    z_pole: float              # altitude du pôle K
+    kn: np.ndarray             # (n, m)
+    z_waterline: np.ndarray    # (n, m)
+    trim: np.ndarray           # (n, m)
+    converged: np.ndarray      # (n, m)
+    is_flooded: np.ndarray     # (n, m)
+
+    def gz(self, kg: float) -> np.ndarray:
+        """Righting arms (n, m) of a centre of gravity at height kg above the pole."""
+        return self.kn - kg * np.sin(self.heels)[None, :]
+
+
+def kn_run(mesh: HullMesh, volume: float, pole, heels, tolerance: float = 1e-6, start=None):
+    """Solves a run of consecutive heels at one displacement, each started from the previous one.
+
+    Arguments:
+    mesh -- The hull surface mesh, upright.
+    volume -- Displaced volume.
+    pole -- (x, y, z) of the pole K, used as centre of gravity.
+    heels -- Heel angles of the run, in radians, in order.
+    tolerance -- Relative tolerance of each equilibrium.
+    start -- Optional (z_waterline, trim) first guess of the first heel.
+
+    :returns:
+        (kn, z_waterline, trim, converged, is_flooded), one list entry per heel.
+    """
+    results = []
+    for heel in heels:
+        position = solve_floating_position(mesh, volume, pole, tolerance, heel=heel,
+                                           start=None if start is None else (start[0], heel, start[1]))
+        results.append((-position.heeling_moment / volume, position.z_waterline, position.trim,
+                        position.converged, position.hydrostatics.is_flooded))
+        # le voisin résolu sert de point de départ: quelques itérations de Newton suffisent
+        if position.converged:
+            start = (position.z_waterline, position.trim)
+    return [list(column) for column in zip(*results)]
+
+
+def cross_curves(mesh: HullMesh, volumes, heels, lcg=None, tolerance: float = 1e-6,
+                 workers: int = None, executable: str = None, progress=None) -> CrossCurves:
+    """Computes the KN cross curves over a grid of displacements x heel angles.
+
+    The heels of each displacement are split into runs of consecutive angles;
+    in a run every cell starts its Newton iterations from the solution of its
+    neighbour, which needs far fewer iterations than a cold start. The runs
+    are spread over a process pool sharing a single copy of the mesh (see
+    run_on_mesh), and written into the table as soon as each one finishes.
+
+    Arguments:
+    mesh -- The hull surface mesh, upright.
+    volumes -- Displaced volumes, in mesh units.
+    heels -- Heel angles, in radians, in increasing order.
+    lcg -- Longitudinal position of the pole, one value or one per volume.
+           Defaults to the upright centre of buoyancy of each volume (the trim
+           of each cell is then free, as usual for cross curves).
+    tolerance -- Relative tolerance of each equilibrium.
+    workers -- Number of processes, see run_on_mesh.
+    executable -- Python interpreter for the workers, see run_on_mesh.
+    progress -- Optional function called as progress(done, total, curves)
+                after each run, curves being the table filled so far. An
+                exception it raises stops the computation and is passed on.
+    """
+    volumes = np.atleast_1d(np.asarray(volumes, dtype=np.float64))
+    heels = np.atleast_1d(np.asarray(heels, dtype=np.float64))
+    nb_volumes, nb_heels = len(volumes), len(heels)
+    # départ de chaque déplacement: flottaison droite, qui donne aussi le LCB
+    uprights = [solve_draft(mesh, volume, tolerance) for volume in volumes]
+    if lcg is None:
+        lcg = [upright.hydrostatics.center_of_buoyancy[0] for upright in uprights]
+    lcg = np.broadcast_to(np.asarray(lcg, dtype=np.float64), (nb_volumes,)).copy()
+    z_pole = float(mesh.z_min)
+
+    # assez de séries pour occuper tous les processus, chacune aussi longue que possible
+    workers = workers or os.cpu_count() or 1
+    nb_runs = min(nb_heels, max(1, -(-2 * workers // nb_volumes))) if workers > 1 else 1
+    bounds = np.linspace(0, nb_heels, nb_runs + 1).round().astype(int)
+    tasks, arguments = [], []
+    for i, volume in enumerate(volumes):
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            if last > first:
+                tasks.append((i, first, last))
+                start = (uprights[i].z_waterline, 0.0) if heels[first] == 0 else None
+                arguments.append((float(volume), (float(lcg[i]), 0.0, z_pole),
+                                  heels[first:last].tolist(), tolerance, start))
+
+    shape = (nb_volumes, nb_heels)
+    curves = CrossCurves(volumes, heels, lcg, z_pole, np.full(shape, np.nan), np.full(shape, np.nan),
+                         np.full(shape, np.nan), np.zeros(shape, dtype=bool), np.zeros(shape, dtype=bool))
+    for done, (index, result) in enumerate(run_on_mesh(kn_run, mesh, arguments, workers, executable), 1):
+        i, first, last = tasks[index]
+        kn, z_waterline, trim, converged, is_flooded = result
+        curves.kn[i, first:last] = kn
+        curves.z_waterline[i, first:last] = z_waterline
+        curves.trim[i, first:last] = trim
+        curves.converged[i, first:last] = converged
+        curves.is_flooded[i, first:last] = is_flooded
+        if progress:
+            progress(done, len(tasks), curves)
+    return curves
@@ -0,0 +1,326 @@
+import csv
+import math
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+__all__ = ['UNCLASSIFIED', 'WeightSummary', 'WeightTree', 'WeightTable', 'classify', 'inertia_tensor', 'weight_summary']
+
+UNCLASSIFIED = '000'  # groupe des corps qui n'ont pas pu être classés
+
+
+@dataclass
+class WeightSummary:
+    """Total mass, centre of gravity and inertia of a set of bodies."""
+    mass: float
+    center_of_gravity: tuple
+    inertia: np.ndarray        # (3, 3) tenseur d'inertie autour du centre de gravité
+    nb_bodies: int
+
+
+def inertia_tensor(xx, yy, zz, xy, yz, xz):
+    """(..., 3, 3) inertia tensors from their six components.
+
+    The products are taken as tensor components (-∫xy dm), as returned by
+    Fusion's getXYZMomentsOfInertia.
+    """
+    xx, yy, zz, xy, yz, xz = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (xx, yy, zz, xy, yz, xz)))
+    return np.stack([np.stack([xx, xy, xz], axis=-1),
+                     np.stack([xy, yy, yz], axis=-1),
+                     np.stack([xz, yz, zz], axis=-1)], axis=-2)
+
+
+def weight_summary(masses, centers, inertias=None) -> WeightSummary:
+    """Adds up the masses of many bodies.
+
+    The moments are summed around a reference point close to the result (the
+    mean of the centres), with compensated sums, so that thousands of small
+    parts far from the origin do not lose precision.
+
+    Arguments:
+    masses -- (n,) masses.
+    centers -- (n, 3) centres of gravity.
+    inertias -- Optional (n, 3, 3) inertia tensors of the bodies around the
+                origin; the total is returned around the centre of gravity.
+    """
+    masses = np.asarray(masses, dtype=np.float64).reshape(-1)
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    mass = math.fsum(masses)
+    if len(masses) == 0 or mass == 0:
+        return WeightSummary(mass, (0.0, 0.0, 0.0), np.zeros((3, 3)), len(masses))
+    reference = centers.mean(axis=0)
+    moments = masses[:, None] * (centers - reference)
+    center = reference + np.array([math.fsum(moments[:, i]) for i in range(3)]) / mass
+
+    inertia = np.zeros((3, 3))
+    if inertias is not None:
+        inertias = np.asarray(inertias, dtype=np.float64).reshape(-1, 3, 3)
+        total = np.array([[math.fsum(inertias[:, i, j]) for j in range(3)] for i in range(3)])
+        # théorème de Huygens: passage de l'origine au centre de gravité
+        inertia = total - mass * (np.dot(center, center) * np.eye(3) - np.outer(center, center))
+    return WeightSummary(mass, tuple(float(v) for v in center), inertia, len(masses))
+
+
+class _WeightNode:
+    __slots__ = ('key', 'name', 'parent', 'children', 'mass', 'moment', 'inertia', 'nb_bodies', 'is_body')
+
+    def __init__(self, key, name, parent, is_body):
+        self.key = key
+        self.name = name
+        self.parent = parent
+        self.children = set()
+        self.mass = 0.0
+        self.moment = np.zeros(3)           # somme des m x CdG
+        self.inertia = np.zeros((3, 3))     # autour de l'origine
+        self.nb_bodies = 0
+        self.is_body = is_body
+
+
+class WeightTree:
+    """Weight breakdown kept up to date body by body.
+
+    Every node (assembly, component, occurrence, body) caches the mass, first
+    moment and inertia around the origin of everything under it. These sums are
+    additive: when a body changes, only the difference is carried up to its
+    ancestors, so a change costs O(depth) whatever the number of bodies.
+    Bodies can be marked dirty as they are edited, and refreshed in one go.
+
+    Arguments:
+    root_name -- Name of the root node, whose key is None.
+    """
+
+    def __init__(self, root_name: str = 'root'):
+        self._nodes = {None: _WeightNode(None, root_name, None, False)}
+        self.dirty = set()
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def __len__(self):
+        return len(self._nodes) - 1
+
+    def add_group(self, key, name: str = None, parent=None):
+        """Adds a node grouping other nodes (component, occurrence...)."""
+        self._add(key, name, parent, False)
+
+    def set_body(self, key, mass: float, center, inertia=None, name: str = None, parent=None):
+        """Adds a body, or updates its mass properties (parent is then ignored).
+
+        Arguments:
+        key -- Identifier of the body.
+        mass -- Mass of the body.
+        center -- Its centre of gravity.
+        inertia -- Its (3, 3) inertia tensor around the origin. A point mass if not given.
+        """
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._add(key, name, parent, True)
+            self._propagate(node, 0.0, 0.0, 0.0, 1)
+        center = np.asarray(center, dtype=np.float64)
+        moment = mass * center
+        if inertia is None:
+            inertia = mass * (np.dot(center, center) * np.eye(3) - np.outer(center, center))
+        self._propagate(node, mass - node.mass, moment - node.moment, np.asarray(inertia, dtype=np.float64) - node.inertia)
+        self.dirty.discard(key)
+
+    def remove(self, key):
+        """Removes a node and everything under it."""
+        node = self._nodes[key]
+        self._propagate(node, -node.mass, -node.moment, -node.inertia, -node.nb_bodies)
+        node.parent.children.discard(node)
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            del self._nodes[node.key]
+            self.dirty.discard(node.key)
+            stack.extend(node.children)
+
+    def mark_dirty(self, key):
+        """Records that the mass properties of a body have to be read again."""
+        if key in self._nodes:
+            self.dirty.add(key)
+
+    def refresh(self, fetch) -> int:
+        """Updates the dirty bodies.
+
+        Arguments:
+        fetch -- Function called as fetch(key), returning (mass, center,
+                 inertia) or None if the body no longer exists.
+
+        :returns:
+            The number of bodies read again.
+        """
+        dirty, self.dirty = self.dirty, set()
+        for key in dirty:
+            if key not in self._nodes:
+                continue
+            properties = fetch(key)
+            if properties is None:
+                self.remove(key)
+            else:
+                self.set_body(key, *properties)
+        return len(dirty)
+
+    def summary(self, key=None) -> WeightSummary:
+        """Mass, centre of gravity and inertia around it of a node (the whole tree by default)."""
+        node = self._nodes[key]
+        if node.mass == 0:
+            return WeightSummary(0.0, (0.0, 0.0, 0.0), np.zeros((3, 3)), node.nb_bodies)
+        center = node.moment / node.mass
+        inertia = node.inertia - node.mass * (np.dot(center, center) * np.eye(3) - np.outer(center, center))
+        return WeightSummary(float(node.mass), tuple(float(v) for v in center), inertia, node.nb_bodies)
+
+    def children(self, key=None):
+        """Keys and names of the nodes directly under a node."""
+        return [(child.key, child.name) for child in self._nodes[key].children]
+
+    def bodies(self, key=None):
+        """Keys of all the bodies under a node."""
+        stack, keys = [self._nodes[key]], []
+        while stack:
+            node = stack.pop()
+            if node.is_body:
+                keys.append(node.key)
+            stack.extend(node.children)
+        return keys
+
+    def body_weights(self, key=None):
+        """Keys, names, masses and centres of gravity of the bodies under a node, as arrays."""
+        nodes = [self._nodes[body] for body in self.bodies(key)]
+        masses = np.array([node.mass for node in nodes])
+        centers = np.array([node.moment / node.mass if node.mass else np.zeros(3) for node in nodes]).reshape(-1, 3)
+        return [node.key for node in nodes], [node.name for node in nodes], masses, centers
+
+    def _add(self, key, name, parent, is_body):
+        if key in self._nodes:
+            raise KeyError(f'Node already in the weight tree: {key}')
+        parent_node = self._nodes[parent]
+        node = _WeightNode(key, name if name is not None else str(key), parent_node, is_body)
+        parent_node.children.add(node)
+        self._nodes[key] = node
+        return node
+
+    def _propagate(self, node, mass, moment, inertia, nb_bodies: int = 0):
+        # la différence est ajoutée au noeud et à tous ses ancêtres
+        while node is not None:
+            node.mass += mass
+            node.moment += moment
+            node.inertia += inertia
+            node.nb_bodies += nb_bodies
+            node = node.parent
+
+
+def classify(name: str, rules, default: str = UNCLASSIFIED) -> str:
+    """Weight group of a body from its name: code of the first matching rule.
+
+    Arguments:
+    name -- Name of the body (or its full path in the assembly).
+    rules -- Sequence of (regular expression, group code) pairs.
+    default -- Code given when no rule matches.
+    """
+    for pattern, code in rules:
+        if re.search(pattern, name, re.IGNORECASE):
+            return code
+    return default
+
+
+class WeightTable:
+    """Columnar table of body weights, indexed by weight group, deck and zone.
+
+    Each index maps a value to the sorted array of its rows, built once, so a
+    filtered roll-up only touches the rows it sums. Group codes are
+    hierarchical (as SWBS: '1', '12', '123'): a query on a group prefix takes
+    every group under it.
+
+    Arguments:
+    names -- (n,) body names.
+    masses -- (n,) masses.
+    centers -- (n, 3) centres of gravity.
+    groups -- (n,) weight group codes.
+    decks -- (n,) deck names, or None to find them from z and deck_heights.
+    deck_heights -- Sorted heights of the decks: a body belongs to the highest deck under its CoG.
+    zone_limits -- Sorted x of the zone limits (bulkheads): zone i lies between limits i-1 and i.
+    """
+
+    COLUMNS = ('name', 'group', 'deck', 'zone', 'mass', 'x', 'y', 'z')
+
+    def __init__(self, names, masses, centers, groups, decks=None, deck_heights=(), zone_limits=()):
+        self.names = np.asarray(names, dtype=object)
+        self.masses = np.asarray(masses, dtype=np.float64).reshape(-1)
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        self.groups = np.asarray(groups, dtype=object)
+        if decks is None:
+            deck_index = np.searchsorted(np.asarray(deck_heights, dtype=np.float64), self.centers[:, 2], side='right')
+            decks = np.array(['below'] + [f'deck {i + 1}' for i in range(len(deck_heights))], dtype=object)[deck_index]
+        self.decks = np.asarray(decks, dtype=object)
+        self.zones = np.searchsorted(np.asarray(zone_limits, dtype=np.float64), self.centers[:, 0], side='right')
+        self._group_index = _index(self.groups)
+        self._deck_index = _index(self.decks)
+        self._zone_index = _index(self.zones)
+        self._rollups = {}
+
+    def __len__(self):
+        return len(self.masses)
+
+    def rows(self, group: str = None, deck=None, zone: int = None) -> np.ndarray:
+        """Sorted indices of the rows matching all the given filters."""
+        selected = None
+        if group is not None:
+            parts = [rows for code, rows in self._group_index.items() if str(code).startswith(group)]
+            selected = np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+        for index, value in ((self._deck_index, deck), (self._zone_index, zone)):
+            if value is None:
+                continue
+            rows = index.get(value, np.zeros(0, dtype=np.int64))
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        return np.arange(len(self)) if selected is None else selected
+
+    def rollup(self, group: str = None, deck=None, zone: int = None) -> WeightSummary:
+        """Mass and centre of gravity of the rows matching the filters (inertia left at zero).
+
+        The table does not change once built: every result is kept, and asking
+        again for the same filters costs a dictionary lookup.
+        """
+        query = (group, deck, zone)
+        if query not in self._rollups:
+            rows = self.rows(group, deck, zone)
+            masses = self.masses[rows]
+            mass = float(masses.sum())
+            center = masses @ self.centers[rows] / mass if mass else np.zeros(3)
+            self._rollups[query] = WeightSummary(mass, tuple(float(v) for v in center), np.zeros((3, 3)), len(rows))
+        return self._rollups[query]
+
+    def group_totals(self, level: int = 1):
+        """Mass and CoG of every group, with codes cut to their first `level` characters.
+
+        :returns:
+            (codes, masses, centers) arrays, sorted by code.
+        """
+        codes, inverse = np.unique(np.array([str(g)[:level] for g in self.groups], dtype=object), return_inverse=True)
+        masses = np.bincount(inverse, self.masses, len(codes))
+        moments = np.stack([np.bincount(inverse, self.masses * self.centers[:, i], len(codes)) for i in range(3)], axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centers = np.where(masses[:, None] > 0, moments / masses[:, None], 0.0)
+        return codes, masses, centers
+
+    def to_csv(self, file, delimiter: str = ';'):
+        """Writes one line per body, with the columns of WeightTable.COLUMNS."""
+        if isinstance(file, str):
+            with open(file, 'w', encoding='utf-8', newline='') as f:
+                return self.to_csv(f, delimiter)
+        writer = csv.writer(file, delimiter=delimiter)
+        writer.writerow(self.COLUMNS)
+        for i in range(len(self)):
+            x, y, z = self.centers[i].tolist()
+            writer.writerow([self.names[i], self.groups[i], self.decks[i], int(self.zones[i]),
+                             round(float(self.masses[i]), 6), round(x, 6), round(y, 6), round(z, 6)])
+
+
+def _index(values):
+    # valeur -> indices (triés) des lignes qui l'ont
+    keys, inverse = np.unique(np.asarray(values).astype(str), return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+    firsts = {key: values[order[bounds[i]]] for i, key in enumerate(keys)}
+    return {firsts[key]: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(keys)}
@@ -0,0 +1,6 @@
+# Les tests ne portent que sur nautic_core, qui n'importe jamais adsk:
+# ils tournent hors de Fusion 360, avec NumPy seul.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib'))
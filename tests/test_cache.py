@@ -0,0 +1,159 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+import nautic_core as nc
+
+
+@pytest.fixture
+def mesh():
+    return nc.box_barge().mesh(4)
+
+
+def test_mesh_digest_depends_on_geometry_only(mesh):
+    assert nc.mesh_digest(mesh) == nc.mesh_digest(nc.box_barge().mesh(4))
+    assert nc.mesh_digest(mesh) != nc.mesh_digest(nc.box_barge(draft=151.0).mesh(4))
+
+
+def test_key_is_stable():
+    cache = nc.ResultCache()
+    key = cache.key('digest', 'hydrostatics', {'z': 0.1, 'heels': [0.0, 0.5], 'n': 3})
+    # ordre des paramètres et bruit d'arrondi sans effet
+    assert cache.key('digest', 'hydrostatics', {'n': 3, 'heels': np.array([0.0, 0.5]), 'z': 0.1 + 1e-12}) == key
+    assert nc.ResultCache().key('digest', 'hydrostatics', {'z': 0.1, 'heels': [0.0, 0.5], 'n': 3}) == key
+
+
+@pytest.mark.parametrize('change', [
+    ('other', 'hydrostatics', {'z': 0.1, 'n': 3}),
+    ('digest', 'area_curve', {'z': 0.1, 'n': 3}),
+    ('digest', 'hydrostatics', {'z': 0.2, 'n': 3}),
+    ('digest', 'hydrostatics', {'z': 0.1, 'n': 4}),
+    ('digest', 'hydrostatics', {'z': 0.1}),
+    ('digest', 'hydrostatics', {'z': 0.1, 'n': 3, 'tolerance': None}),
+])
+def test_key_changes_with_its_inputs(change):
+    cache = nc.ResultCache()
+    assert cache.key(*change) != cache.key('digest', 'hydrostatics', {'z': 0.1, 'n': 3})
+
+
+def test_key_changes_with_the_cache_version(monkeypatch):
+    cache = nc.ResultCache()
+    key = cache.key('digest', 'area_curve', {'z': 0.1})
+    monkeypatch.setattr(sys.modules['nautic_core.cache'], 'CACHE_VERSION', nc.CACHE_VERSION + 1)
+    assert cache.key('digest', 'area_curve', {'z': 0.1}) != key
+
+
+def test_results_of_another_version_are_not_reused(tmp_path, mesh, monkeypatch):
+    folder = str(tmp_path)
+    nc.ResultCache(folder).cached('test', mesh, lambda: 'old', z=1.0)
+    monkeypatch.setattr(sys.modules['nautic_core.cache'], 'CACHE_VERSION', nc.CACHE_VERSION + 1)
+    assert nc.ResultCache(folder).cached('test', mesh, lambda: 'new', z=1.0) == 'new'
+
+
+def test_cached_computes_once(mesh):
+    cache = nc.ResultCache()
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+    assert cache.cached('test', mesh, compute, z=1.0) == 1
+    assert cache.cached('test', mesh, compute, z=1.0) == 1
+    assert cache.cached('test', mesh, compute, z=2.0) == 2
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_memory_is_lru():
+    cache = nc.ResultCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_disk_store_survives_a_restart(tmp_path, mesh):
+    folder = str(tmp_path)
+    nc.ResultCache(folder).cached('hydrostatics', mesh, lambda: nc.hydrostatics(mesh, 100.0), z=100.0)
+    cache = nc.ResultCache(folder)
+    hydro = cache.cached('hydrostatics', mesh, lambda: pytest.fail('computed again'), z=100.0)
+    assert hydro.volume == pytest.approx(1000.0 * 400.0 * 100.0)
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_corrupted_file_is_a_miss(tmp_path):
+    cache = nc.ResultCache(str(tmp_path))
+    cache.put('key', [1, 2, 3])
+    with open(os.path.join(str(tmp_path), 'key.pkl'), 'wb') as file:
+        file.write(b'not a pickle')
+    assert nc.ResultCache(str(tmp_path)).get('key', 'missing') == 'missing'
+
+
+class Result:
+    pass
+
+
+def test_changed_class_is_a_miss(tmp_path, monkeypatch):
+    cache = nc.ResultCache(str(tmp_path))
+    cache.put('key', Result())
+    # la classe n'existe plus quand le fichier est relu
+    monkeypatch.delattr(sys.modules[__name__], 'Result')
+    assert nc.ResultCache(str(tmp_path)).get('key', 'missing') == 'missing'
+    with open(os.path.join(str(tmp_path), 'key.pkl'), 'rb') as file:
+        with pytest.raises(AttributeError):
+            pickle.load(file)
+
+
+def test_disk_store_is_trimmed(tmp_path):
+    cache = nc.ResultCache(str(tmp_path), max_bytes=5000)
+    for i in range(10):
+        cache.put(f'key{i}', np.zeros(100))
+    size = sum(entry.stat().st_size for entry in os.scandir(str(tmp_path)))
+    assert size <= 5000
+    assert cache.get('key9') is not None
+
+
+def test_mesh_is_reused():
+    cache = nc.ResultCache()
+    coordinates = [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 1]
+    indices = [0, 2, 1, 0, 1, 3, 0, 3, 2, 1, 2, 3]
+    first = cache.mesh(coordinates, indices, tolerance=0.1)
+    assert cache.mesh(coordinates, indices, tolerance=0.1) is first
+    assert cache.mesh(coordinates, indices, tolerance=0.2) is not first
+
+
+def test_meshes_stay_in_memory(tmp_path):
+    cache = nc.ResultCache(str(tmp_path))
+    hull = nc.box_barge().mesh(4)
+    coordinates, indices = hull.vertices.ravel(), hull.triangles.ravel()
+    first = cache.mesh(coordinates, indices, tolerance=0.1)
+    assert cache.mesh(coordinates, indices, tolerance=0.1) is first
+    assert not os.listdir(str(tmp_path))
+
+
+def test_disk_hit_survives_a_failed_touch(tmp_path, monkeypatch):
+    nc.ResultCache(str(tmp_path)).put('key', [1, 2, 3])
+
+    def utime(path, *args, **kwargs):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(os, 'utime', utime)
+    cache = nc.ResultCache(str(tmp_path))
+    assert cache.get('key') == [1, 2, 3]
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_disk_store_is_only_scanned_beyond_its_budget(tmp_path, monkeypatch):
+    cache = nc.ResultCache(str(tmp_path), max_bytes=5000)
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or scandir(path))
+    for i in range(10):
+        cache.put(f'key{i}', np.zeros(100))
+    # chaque fichier fait ~1 ko: un nettoyage toutes les deux ou trois écritures au plus
+    assert 0 < len(scans) < 5
+    size = sum(entry.stat().st_size for entry in scandir(str(tmp_path)))
+    assert size <= 5000
+    assert cache._disk_bytes == size
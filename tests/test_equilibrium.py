@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pytest
+
+import nautic_core as nc
+
+
+def _assert_floating(mesh, volume, center_of_gravity, position):
+    # la carène tournée autour de G déplace le volume visé, son centre à la verticale de G
+    assert position.converged
+    g = np.asarray(center_of_gravity, dtype=np.float64)
+    rotated = mesh.transformed(nc.rotation_matrix(position.heel, position.trim), pivot=g)
+    hydro = nc.hydrostatics(rotated, position.z_waterline)
+    length = (mesh.bounds[1] - mesh.bounds[0]).max()
+    assert hydro.volume == pytest.approx(volume, rel=1e-5)
+    np.testing.assert_allclose(hydro.center_of_buoyancy[:2], g[:2], atol=1e-5 * length)
+
+
+@pytest.mark.parametrize('fraction', [0.3, 1.0, 1.7])
+def test_solve_draft_box(fraction):
+    hull = nc.box_barge()
+    mesh = hull.mesh(8)
+    volume = hull.length * hull.beam * hull.draft * fraction
+    solution = nc.solve_draft(mesh, volume)
+    assert solution.converged
+    assert solution.draft == pytest.approx(hull.draft * fraction, rel=1e-6)
+
+
+def test_solve_draft_beyond_the_hull():
+    hull = nc.box_barge()
+    mesh = hull.mesh(4)
+    solution = nc.solve_draft(mesh, 2 * hull.length * hull.beam * hull.depth)
+    assert not solution.converged
+    assert solution.z_waterline == pytest.approx(mesh.z_max, rel=1e-5)
+
+
+def test_upright_box():
+    hull = nc.box_barge()
+    mesh = hull.mesh(8)
+    volume = hull.hydrostatics().volume
+    position = nc.solve_floating_position(mesh, volume, (0.0, 0.0, 150.0))
+    assert position.converged
+    assert position.heel == pytest.approx(0.0, abs=1e-9)
+    assert position.trim == pytest.approx(0.0, abs=1e-9)
+    assert position.z_waterline == pytest.approx(hull.draft)
+
+
+@pytest.mark.parametrize('offset', [2.0, 10.0, 20.0])
+def test_box_heel_is_wall_sided(offset):
+    # caisson à murailles droites: yG = tan(gîte).(GM + BMt/2.tan²(gîte))
+    hull = nc.box_barge()
+    mesh = hull.mesh(8)
+    reference = hull.hydrostatics()
+    kg = 150.0
+    gm = reference.center_of_buoyancy[2] + reference.bmt - kg
+    center_of_gravity = (0.0, offset, kg)
+    position = nc.solve_floating_position(mesh, reference.volume, center_of_gravity)
+    _assert_floating(mesh, reference.volume, center_of_gravity, position)
+    t = math.tan(-position.heel)
+    assert t * (gm + reference.bmt / 2 * t * t) == pytest.approx(offset, rel=1e-5)
+
+
+@pytest.mark.parametrize('form', [nc.box_barge, nc.wigley_hull, nc.series60_like])
+@pytest.mark.parametrize('dx, dy, kg', [(0.0, 0.0, 0.5), (0.05, 0.0, 0.8), (-0.05, 0.02, 0.8), (0.03, 0.05, 0.5)])
+def test_free_floating_positions(form, dx, dy, kg):
+    # décalages du centre de gravité en fractions de L, B et T
+    hull = form()
+    mesh = hull.mesh(40)
+    reference = hull.hydrostatics()
+    volume = nc.hydrostatics(mesh, hull.draft).volume
+    center_of_gravity = (reference.center_of_buoyancy[0] + dx * hull.length, dy * hull.beam, kg * hull.draft)
+    position = nc.solve_floating_position(mesh, volume, center_of_gravity)
+    _assert_floating(mesh, volume, center_of_gravity, position)
+
+
+def test_large_heel_far_from_the_start():
+    # le Newton amorti s'arrêtait vers -2.5° sans converger: l'équilibre est vers -26.8°
+    hull = nc.wigley_hull()
+    mesh = hull.mesh(40)
+    volume = nc.hydrostatics(mesh, hull.draft).volume
+    center_of_gravity = (hull.hydrostatics().center_of_buoyancy[0] + 10.0, 5.0, 0.7 * hull.draft)
+    position = nc.solve_floating_position(mesh, volume, center_of_gravity)
+    _assert_floating(mesh, volume, center_of_gravity, position)
+    assert math.degrees(position.heel) == pytest.approx(-26.8, abs=0.5)
+
+
+def test_fixed_heel_keeps_the_heel():
+    hull = nc.wigley_hull()
+    mesh = hull.mesh(40)
+    volume = hull.hydrostatics().volume
+    heel = math.radians(20)
+    position = nc.solve_floating_position(mesh, volume, (0.0, 0.0, 40.0), heel=heel)
+    assert position.converged
+    assert position.heel == heel
+    # seul le moment de gîte reste: c'est le bras de redressement
+    assert position.trimming_moment == pytest.approx(0.0, abs=1e-5 * volume * hull.length)
+    assert position.heeling_moment < 0
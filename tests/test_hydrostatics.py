@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import nautic_core as nc
+
+# (forme, nombre de stations du maillage, tolérance relative): l'erreur d'un
+# maillage décroît comme 1/n², le caisson est exact quel que soit n
+HULLS = [(nc.box_barge, 8, 1e-12), (nc.wigley_hull, 80, 2e-3), (nc.series60_like, 80, 1e-2)]
+
+
+def _close(value, expected, tolerance, scale):
+    assert abs(value - expected) <= tolerance * scale, (value, expected)
+
+
+@pytest.mark.parametrize('form, nb_stations, tolerance', HULLS)
+@pytest.mark.parametrize('fraction', [0.5, 1.0, 1.2])
+def test_hydrostatics_match_closed_forms(form, nb_stations, tolerance, fraction):
+    hull = form()
+    mesh = hull.mesh(nb_stations)
+    reference = hull.hydrostatics(fraction * hull.draft)
+    hydro = nc.hydrostatics(mesh, reference.z_waterline)
+
+    _close(hydro.volume, reference.volume, tolerance, reference.volume)
+    _close(hydro.center_of_buoyancy[0], reference.center_of_buoyancy[0], tolerance, hull.length)
+    _close(hydro.center_of_buoyancy[1], 0.0, tolerance, hull.beam)
+    _close(hydro.center_of_buoyancy[2], reference.center_of_buoyancy[2], tolerance, reference.center_of_buoyancy[2])
+    _close(hydro.waterplane_area, reference.waterplane_area, tolerance, reference.waterplane_area)
+    _close(hydro.bmt, reference.bmt, tolerance, reference.bmt)
+    _close(hydro.bml, reference.bml, tolerance, reference.bml)
+    assert hydro.draft == pytest.approx(reference.z_waterline)
+    assert not hydro.is_flooded
+
+
+def test_box_closed_forms():
+    # caisson L x B x T: V = LBT, KB = T/2, BMt = B²/12T, BMl = L²/12T
+    length, beam, draft = 1000.0, 400.0, 150.0
+    hydro = nc.hydrostatics(nc.box_barge(length, beam, draft).mesh(4), draft)
+    assert hydro.volume == pytest.approx(length * beam * draft)
+    assert hydro.center_of_buoyancy[2] == pytest.approx(draft / 2)
+    assert hydro.bmt == pytest.approx(beam ** 2 / (12 * draft))
+    assert hydro.bml == pytest.approx(length ** 2 / (12 * draft))
+
+
+def test_wigley_block_coefficient():
+    hull = nc.wigley_hull()
+    reference = hull.hydrostatics()
+    assert reference.volume / (hull.length * hull.beam * hull.draft) == pytest.approx(4 / 9)
+
+
+def test_nothing_immersed():
+    mesh = nc.box_barge().mesh(4)
+    hydro = nc.hydrostatics(mesh, mesh.z_min - 1.0)
+    assert hydro.volume == 0
+    assert hydro.bmt == 0 and hydro.bml == 0
+
+
+def test_hydrostatic_table_matches_hydrostatics():
+    mesh = nc.wigley_hull().mesh(40)
+    heights = np.linspace(10.0, 90.0, 9)
+    table = nc.hydrostatic_table(mesh, heights)
+    for i, z in enumerate(heights):
+        hydro = nc.hydrostatics(mesh, z)
+        assert table.volume[i] == pytest.approx(hydro.volume, rel=1e-9)
+        assert table.lcb[i] == pytest.approx(hydro.center_of_buoyancy[0], abs=1e-6)
+
+
+@pytest.mark.parametrize('form', [nc.box_barge, nc.wigley_hull, nc.series60_like])
+def test_waterline_sweep_matches_hydrostatics(form):
+    hull = form()
+    mesh = hull.mesh(40)
+    sweep = nc.WaterlineSweep(mesh)
+    # ordre de grandeur des moments quadratiques: les écarts d'arrondi s'y rapportent
+    it_scale, il_scale = hull.length * hull.beam ** 3, hull.length ** 3 * hull.beam
+    # hauteurs quelconques, sur des lignes du maillage et au-delà du pont
+    for z in np.concatenate([np.linspace(-10.0, hull.depth + 10.0, 23), [hull.draft, 0.0, hull.depth]]):
+        expected = nc.hydrostatics(mesh, z)
+        hydro = sweep.hydrostatics(z)
+        scale = max(expected.volume, 1.0)
+        assert abs(hydro.volume - expected.volume) <= 1e-9 * scale
+        np.testing.assert_allclose(hydro.center_of_buoyancy, expected.center_of_buoyancy, atol=1e-9 * hull.length)
+        assert hydro.waterplane_area == pytest.approx(expected.waterplane_area, rel=1e-9, abs=1e-9)
+        assert abs(hydro.it - expected.it) <= 1e-12 * it_scale
+        assert abs(hydro.il - expected.il) <= 1e-12 * il_scale
+        assert hydro.is_flooded == expected.is_flooded
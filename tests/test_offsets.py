@@ -0,0 +1,125 @@
+import io
+
+import numpy as np
+import pytest
+
+import nautic_core as nc
+
+
+def _read(text, **options):
+    return nc.read_offsets(io.StringIO(text), **options)
+
+
+def test_header_and_stations():
+    table = _read('x,y,z\n0,1,2\n10,1,0\n0,3,4\n10,2,5\n')
+    assert table.nb_lines == 5
+    assert table.nb_errors == 0
+    np.testing.assert_array_equal(table.stations, [0.0, 10.0])
+    # points regroupés par station, dans l'ordre du fichier
+    np.testing.assert_array_equal(table.station(0), [[0, 1, 2], [0, 3, 4]])
+    np.testing.assert_array_equal(table.station(1), [[10, 1, 0], [10, 2, 5]])
+
+
+def test_semicolon_and_decimal_comma():
+    table = _read('0,5;1,25;2\r\n0,5;-1;3,75\r\n')
+    assert table.nb_errors == 0
+    np.testing.assert_array_equal(table.points, [[0.5, 1.25, 2.0], [0.5, -1.0, 3.75]])
+
+
+def test_last_line_without_newline():
+    table = _read('1 2 3\n4 5 6', delimiter=' ')
+    assert len(table.points) == 2
+
+
+def test_blank_lines_are_skipped():
+    table = _read('0,0,0\n\n1,1,1\n   \n2,2,2\n')
+    assert table.nb_errors == 0
+    assert len(table.points) == 3
+
+
+def test_malformed_lines_are_reported():
+    text = '0,0,0\n1,1\nx,y,z\n2,2,2\n3,3,nan\n4,4,4,4\n5,5,5\n'
+    table = _read(text)
+    assert [error.line for error in table.errors] == [2, 3, 5, 6]
+    assert table.nb_errors == 4
+    assert table.errors[0].text == '1,1'
+    np.testing.assert_array_equal(table.points[:, 0], [0, 2, 5])
+
+
+def test_bad_fields_do_not_offset_each_other():
+    # un champ vide et un champ de trop: autant de valeurs au total, mais deux lignes fausses
+    table = _read('0,0,0\n,1,2\n1 2,3,4\n5,5,5\n')
+    assert [error.line for error in table.errors] == [2, 3]
+    assert len(table.points) == 2
+
+
+def test_numbers_outside_the_fast_path():
+    table = _read('1_000,2,3\n1e999,0,0\n+1.,-.5,2e3\n')
+    assert [(error.line, error.message) for error in table.errors] == [(2, 'valeur non finie')]
+    np.testing.assert_array_equal(table.points, [[1.0, -0.5, 2000.0], [1000.0, 2.0, 3.0]])
+
+
+@pytest.mark.parametrize('chunk_size', [7, 64, 1 << 22])
+def test_chunk_size_does_not_change_the_result(chunk_size):
+    rng = np.random.default_rng(1)
+    points = np.round(rng.uniform(-100, 100, (300, 3)), 3)
+    lines = [f'{x},{y},{z}' for x, y, z in points]
+    lines[17] = ''
+    lines[123] = 'bad line'
+    table = _read('\n'.join(lines) + '\n', chunk_size=chunk_size)
+    assert [error.line for error in table.errors] == [124]
+    expected = np.delete(points, [17, 123], axis=0)
+    assert len(table.points) == len(expected)
+    np.testing.assert_array_equal(np.unique(table.points, axis=0), np.unique(expected, axis=0))
+
+
+def test_max_errors():
+    table = _read('a,b,c\n' + 'bad\n' * 10 + '1,2,3\n', max_errors=3)
+    assert len(table.errors) == 3
+    assert table.nb_errors == 10
+    assert len(table.points) == 1
+
+
+def test_station_tolerance():
+    table = _read('0,1,1\n0.001,2,2\n5,1,1\n', station_tolerance=0.01)
+    assert len(table.stations) == 2
+    assert len(table.station(0)) == 2
+
+
+def _hull_table(hull, nb_stations, z_top, nb_points=41):
+    # tableau de cotes en demi-largeurs, de la quille à z_top, station par station
+    stations = np.linspace(-hull.length / 2, hull.length / 2, nb_stations)
+    z = np.linspace(0.0, z_top, nb_points)
+    x, z = np.repeat(stations, nb_points), np.tile(z, nb_stations)
+    points = np.stack([x, hull.half_breadth(x, z), z], axis=1)
+    return nc.OffsetTable(points, stations, np.arange(nb_stations + 1) * nb_points)
+
+
+@pytest.mark.parametrize('form, tolerance', [(nc.box_barge, 1e-12), (nc.wigley_hull, 1e-3)])
+@pytest.mark.parametrize('fraction', [0.5, 1.0])
+def test_offset_hydrostatics_match_closed_forms(form, tolerance, fraction):
+    hull = form()
+    table = _hull_table(hull, 21, hull.depth)
+    reference = hull.hydrostatics(fraction * hull.draft)
+    hydro = nc.offset_hydrostatics(table, reference.z_waterline)
+    assert hydro.volume[0] == pytest.approx(reference.volume, rel=tolerance)
+    assert hydro.lcb[0] == pytest.approx(reference.center_of_buoyancy[0], abs=tolerance * hull.length)
+    assert hydro.kb[0] == pytest.approx(reference.center_of_buoyancy[2], rel=tolerance)
+    assert hydro.waterplane_area[0] == pytest.approx(reference.waterplane_area, rel=tolerance)
+    assert hydro.lcf[0] == pytest.approx(reference.lcf, abs=tolerance * hull.length)
+    np.testing.assert_allclose(hydro.section_areas[0], hull.section_areas(table.stations, reference.z_waterline),
+                               rtol=tolerance, atol=tolerance * reference.max_section_area)
+
+
+@pytest.mark.parametrize('form', [nc.box_barge, nc.wigley_hull])
+def test_offset_hydrostatics_at_and_above_the_top_of_the_table(form):
+    # tableau arrêté au tirant d'eau: au-delà, la carène reste celle du sommet des stations
+    hull = form()
+    table = _hull_table(hull, 21, hull.draft)
+    heights = [hull.draft * (1 - 1e-9), hull.draft, hull.draft * 1.2]
+    hydro = nc.offset_hydrostatics(table, heights)
+    for name in ('volume', 'lcb', 'kb', 'waterplane_area', 'lcf'):
+        values = getattr(hydro, name)
+        assert values[1] == pytest.approx(values[0], rel=1e-6, abs=1e-6), name
+        assert values[2] == values[1], name
+    assert hydro.waterplane_area[1] == pytest.approx(hull.hydrostatics().waterplane_area, rel=1e-3)
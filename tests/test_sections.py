@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import nautic_core as nc
+
+
+def test_box_sections_are_exact():
+    hull = nc.box_barge()
+    mesh = hull.mesh(8)
+    stations = np.linspace(-400.0, 400.0, 9)
+    sections = nc.slice_sections(mesh, hull.draft, stations)
+    np.testing.assert_allclose(sections.areas, hull.beam * hull.draft, rtol=1e-12)
+    # un seul contour par section, ouvert sur la flottaison
+    polygons = sections.polygons(3)
+    assert len(polygons) == 1
+    assert polygons[0][0][1] == pytest.approx(hull.draft)
+    assert polygons[0][-1][1] == pytest.approx(hull.draft)
+
+
+@pytest.mark.parametrize('fraction', [0.6, 1.0])
+def test_wigley_sections_match_closed_form(fraction):
+    hull = nc.wigley_hull()
+    mesh = hull.mesh(80)
+    z = fraction * hull.draft
+    # stations dans le désordre: les aires suivent l'ordre donné
+    stations = np.array([0.0, -300.0, 450.0, 125.0, -490.0])
+    areas = nc.section_areas(mesh, z, stations)
+    expected = hull.section_areas(stations, z)
+    np.testing.assert_allclose(areas, expected, rtol=2e-3, atol=2e-3 * expected.max())
+
+
+def test_stations_outside_the_hull_are_empty():
+    hull = nc.wigley_hull()
+    areas = nc.section_areas(hull.mesh(20), hull.draft, [-600.0, 600.0])
+    np.testing.assert_array_equal(areas, 0.0)
+
+
+def test_max_section_of_wigley_is_amidships():
+    hull = nc.wigley_hull()
+    mesh = hull.mesh(80)
+    stations = np.linspace(-450.0, 450.0, 10)
+    result = nc.max_section(mesh, hull.draft, stations)
+    reference = hull.hydrostatics()
+    assert abs(result.position) <= result.position_error + hull.length / 80
+    assert result.area == pytest.approx(reference.max_section_area, rel=2e-3)
+
+
+@pytest.mark.parametrize('form', [nc.box_barge, nc.wigley_hull, nc.series60_like])
+def test_area_curve_volume(form):
+    hull = form()
+    mesh = hull.mesh(80)
+    volume = nc.hydrostatics(mesh, hull.draft).volume
+    even = nc.area_curve(mesh, hull.draft, 64)
+    assert len(even.stations) == 65
+    assert even.volume == pytest.approx(volume, rel=5e-3)
+    adaptive = nc.area_curve(mesh, hull.draft, 64, tolerance=1e-3)
+    assert len(adaptive.stations) <= 65
+    assert np.all(np.diff(adaptive.stations) > 0)
+    assert adaptive.volume == pytest.approx(volume, rel=5e-3)
+    assert adaptive.volume_error is not None
+    # le bout avant est pris juste en deçà: un tableau (caisson) y garde son aire
+    if form is nc.box_barge:
+        assert adaptive.areas[0] == pytest.approx(hull.beam * hull.draft)
+        assert adaptive.areas[-1] == pytest.approx(hull.beam * hull.draft)
+
+
+def test_area_curve_above_the_hull():
+    mesh = nc.box_barge().mesh(4)
+    with pytest.raises(ValueError):
+        nc.area_curve(mesh, mesh.z_min - 1.0, 10)
+
+
+@pytest.mark.parametrize('tolerance', [None, 1e-3])
+def test_area_curve_progress(tolerance):
+    hull = nc.wigley_hull()
+    mesh = hull.mesh(40)
+    calls = []
+    curve = nc.area_curve(mesh, hull.draft, 64, tolerance, progress=lambda done, total: calls.append((done, total)))
+    reference = nc.area_curve(mesh, hull.draft, 64, tolerance)
+    np.testing.assert_array_equal(curve.areas, reference.areas)
+    assert len(calls) > 1
+    assert all(total == 65 for _, total in calls)
+    assert [done for done, _ in calls] == sorted(done for done, _ in calls)
+    assert calls[-1][0] == min(len(curve.stations), 65)
+
+
+def test_area_curve_progress_can_stop():
+    hull = nc.wigley_hull()
+    calls = []
+
+    def progress(done, total):
+        calls.append(done)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        nc.area_curve(hull.mesh(40), hull.draft, 64, progress=progress)
+    assert calls == [nc.PROGRESS_STATIONS]
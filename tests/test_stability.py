@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+
+import nautic_core as nc
+
+
+def test_box_righting_arms_are_wall_sided():
+    hull = nc.box_barge()
+    mesh = hull.mesh(8)
+    reference = hull.hydrostatics()
+    kg = 200.0
+    heels = np.radians([0.0, 5.0, 10.0, 20.0, 30.0])
+    curve = nc.gz_curve(mesh, reference.volume, (0.0, 0.0, kg), heels, workers=1)
+    assert curve.converged.all()
+    assert not curve.is_flooded.any()
+    expected = [hull.righting_arm(heel, kg) for heel in heels]
+    np.testing.assert_allclose(curve.gz, expected, atol=1e-6 * hull.beam)
+
+
+def test_gz_curve_pool_matches_serial():
+    hull = nc.wigley_hull()
+    mesh = hull.mesh(24)
+    volume = hull.hydrostatics().volume
+    heels = np.radians(np.arange(0.0, 91.0, 15.0))
+    serial = nc.gz_curve(mesh, volume, (0.0, 0.0, 40.0), heels, workers=1)
+    pooled = nc.gz_curve(mesh, volume, (0.0, 0.0, 40.0), heels, workers=2)
+    # mêmes calculs, dans un autre processus: résultats identiques, dans l'ordre des gîtes
+    np.testing.assert_array_equal(pooled.heels, serial.heels)
+    np.testing.assert_array_equal(pooled.gz, serial.gz)
+    np.testing.assert_array_equal(pooled.z_waterline, serial.z_waterline)
+    np.testing.assert_array_equal(pooled.converged, serial.converged)
+
+
+def test_gz_curve_progress_can_stop():
+    hull = nc.wigley_hull()
+    mesh = hull.mesh(16)
+    calls = []
+
+    def progress(done, total):
+        calls.append((done, total))
+        if done == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        nc.gz_curve(mesh, hull.hydrostatics().volume, (0.0, 0.0, 40.0), np.radians([0, 10, 20, 30]),
+                    workers=1, progress=progress)
+    assert calls == [(1, 4), (2, 4)]
+
+
+def test_curve_properties():
+    heels = np.radians([0.0, 30.0, 60.0, 90.0])
+    curve = nc.RightingArmCurve(heels, np.array([0.0, 2.0, 1.0, -1.0]), np.zeros(4), np.zeros(4),
+                                np.ones(4, dtype=bool), np.array([False, False, False, True]))
+    assert curve.max_gz == (pytest.approx(heels[1]), 2.0)
+    assert curve.flooding_angle == pytest.approx(heels[3])
+    assert curve.vanishing_angle == pytest.approx(math.radians(75.0))
+
+
+def test_box_cross_curves():
+    # KN d'un caisson à murailles droites: GZ du pôle K (KG = 0)
+    hull = nc.box_barge()
+    mesh = hull.mesh(8)
+    drafts = np.array([120.0, 150.0])
+    volumes = hull.length * hull.beam * drafts
+    heels = np.radians([0.0, 10.0, 20.0])
+    curves = nc.cross_curves(mesh, volumes, heels, workers=1)
+    assert curves.converged.all()
+    for i, draft in enumerate(drafts):
+        expected = [hull.righting_arm(heel, 0.0, draft) for heel in heels]
+        np.testing.assert_allclose(curves.kn[i], expected, atol=1e-6 * hull.beam)
+    kg = 180.0
+    np.testing.assert_allclose(curves.gz(kg)[1], [hull.righting_arm(heel, kg) for heel in heels],
+                               atol=1e-6 * hull.beam)
+
+
+@pytest.mark.parametrize('heel_max, heel_step, expected', [
+    (30.0, 5.0, [0, 5, 10, 15, 20, 25, 30]),
+    (32.0, 5.0, [0, 5, 10, 15, 20, 25, 30, 32]),
+    (4.0, 5.0, [0, 4]),
+    (0.0, 5.0, [0]),
+])
+def test_heel_grid_stops_at_heel_max(heel_max, heel_step, expected):
+    heels = nc.heel_grid(math.radians(heel_max), math.radians(heel_step))
+    np.testing.assert_allclose(np.degrees(heels), expected, atol=1e-9)
+    assert heels[-1] <= math.radians(heel_max)
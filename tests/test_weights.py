@@ -0,0 +1,132 @@
+import io
+
+import numpy as np
+import pytest
+
+import nautic_core as nc
+
+
+def test_weight_summary():
+    masses = [1.0, 3.0]
+    centers = [[0.0, 0.0, 0.0], [4.0, 0.0, 0.0]]
+    summary = nc.weight_summary(masses, centers)
+    assert summary.mass == 4.0
+    assert summary.center_of_gravity == pytest.approx((3.0, 0.0, 0.0))
+    assert summary.nb_bodies == 2
+
+
+def test_weight_summary_inertia_of_point_masses():
+    masses = np.array([1.0, 1.0])
+    centers = np.array([[1.0, 0.0, 0.0], [-1.0, 0.0, 0.0]]) + [100.0, 0.0, 0.0]
+    # masses ponctuelles autour de l'origine
+    inertias = [m * (np.dot(c, c) * np.eye(3) - np.outer(c, c)) for m, c in zip(masses, centers)]
+    summary = nc.weight_summary(masses, centers, inertias)
+    np.testing.assert_allclose(summary.inertia, np.diag([0.0, 2.0, 2.0]), atol=1e-9)
+
+
+def test_empty_summary():
+    summary = nc.weight_summary([], np.zeros((0, 3)))
+    assert summary.mass == 0 and summary.nb_bodies == 0
+
+
+def test_inertia_tensor_is_symmetric():
+    tensor = nc.inertia_tensor(1, 2, 3, 4, 5, 6)
+    np.testing.assert_array_equal(tensor, [[1, 4, 6], [4, 2, 5], [6, 5, 3]])
+
+
+def _tree():
+    tree = nc.WeightTree('boat')
+    tree.add_group('hull')
+    tree.add_group('deck')
+    tree.set_body('plate', 10.0, (1.0, 0.0, 0.0), parent='hull')
+    tree.set_body('keel', 30.0, (1.0, 0.0, -2.0), parent='hull')
+    tree.set_body('mast', 5.0, (0.0, 0.0, 10.0), parent='deck')
+    return tree
+
+
+def test_tree_rollup():
+    tree = _tree()
+    assert len(tree) == 5
+    hull = tree.summary('hull')
+    assert hull.mass == 40.0 and hull.nb_bodies == 2
+    assert hull.center_of_gravity == pytest.approx((1.0, 0.0, -1.5))
+    total = tree.summary()
+    assert total.mass == 45.0 and total.nb_bodies == 3
+    assert total.center_of_gravity[2] == pytest.approx((30 * -2.0 + 5 * 10.0) / 45)
+    assert sorted(tree.bodies()) == ['keel', 'mast', 'plate']
+
+
+def test_tree_update_matches_a_rebuild():
+    tree = _tree()
+    tree.set_body('keel', 20.0, (1.5, 0.0, -2.0))
+    tree.remove('deck')
+    keys, names, masses, centers = tree.body_weights()
+    expected = nc.weight_summary(masses, centers)
+    total = tree.summary()
+    assert total.mass == pytest.approx(expected.mass)
+    assert total.center_of_gravity == pytest.approx(expected.center_of_gravity)
+    assert 'mast' not in tree and total.nb_bodies == 2
+
+
+def test_tree_refresh_dirty_bodies():
+    tree = _tree()
+    tree.mark_dirty('plate')
+    tree.mark_dirty('mast')
+    tree.mark_dirty('unknown')
+    fetched = {'plate': (12.0, (1.0, 0.0, 0.0), None), 'mast': None}
+    assert tree.refresh(fetched.get) == 2
+    assert not tree.dirty
+    assert 'mast' not in tree
+    assert tree.summary().mass == 42.0
+
+
+def test_tree_rejects_duplicate_groups():
+    tree = _tree()
+    with pytest.raises(KeyError):
+        tree.add_group('hull')
+
+
+def test_classify():
+    rules = [(r'^quille', '1'), (r'mât|mat', '7')]
+    assert nc.classify('Quille lestée', rules) == '1'
+    assert nc.classify('Grand mât', rules) == '7'
+    assert nc.classify('Winch', rules) == nc.UNCLASSIFIED
+
+
+def _table():
+    return nc.WeightTable(
+        names=['a', 'b', 'c', 'd'],
+        masses=[1.0, 2.0, 3.0, 4.0],
+        centers=[[0.0, 0.0, 0.5], [5.0, 0.0, 1.5], [10.0, 0.0, 2.5], [15.0, 0.0, 0.5]],
+        groups=['11', '12', '21', '112'],
+        deck_heights=[1.0, 2.0],
+        zone_limits=[7.5],
+    )
+
+
+def test_table_rollups():
+    table = _table()
+    assert table.rollup().mass == 10.0
+    assert table.rollup(group='1').mass == 7.0
+    assert table.rollup(group='11').mass == 5.0
+    assert table.rollup(deck='below').mass == 5.0
+    assert table.rollup(zone=1).mass == 7.0
+    assert table.rollup(group='1', zone=0).center_of_gravity == pytest.approx((10 / 3, 0.0, 7 / 6))
+    assert table.rollup(group='3').mass == 0
+    # même requête: même objet, gardé en mémoire
+    assert table.rollup(group='1') is table.rollup(group='1')
+
+
+def test_table_group_totals():
+    codes, masses, centers = _table().group_totals()
+    assert list(codes) == ['1', '2']
+    np.testing.assert_allclose(masses, [7.0, 3.0])
+    np.testing.assert_allclose(centers[1], [10.0, 0.0, 2.5])
+
+
+def test_table_csv():
+    output = io.StringIO()
+    _table().to_csv(output)
+    lines = output.getvalue().splitlines()
+    assert lines[0] == ';'.join(nc.WeightTable.COLUMNS)
+    assert lines[2] == 'b;12;deck 1;0;2.0;5.0;0.0;1.5'